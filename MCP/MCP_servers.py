@@ -1,23 +1,61 @@
-from fastmcp import FastMCP
+import json
 from pathlib import Path
+from typing import Optional
+
+from fastmcp import FastMCP
+
+try:
+    from MCP.file_index import get_file_index
+    from MCP.file_reader import file_stat, read_head, read_lines, read_range, read_tail
+except ImportError:  # started as a script: python MCP/MCP_servers.py
+    from file_index import get_file_index
+    from file_reader import file_stat, read_head, read_lines, read_range, read_tail
 
 app = FastMCP("AgentFoundry-MCP")
 
 @app.tool
-def file_search(root: str = ".", pattern: str = "*.md") -> str:
-    #Return a newline separated list of matching file paths
+def file_search(root: str = ".", pattern: str = "*.md", limit: int = 200, offset: int = 0) -> str:
+    #Return a newline separated list of matching file paths (paginated, .gitignore aware)
     root_path = Path(root)
-    matches = list(root_path.rglob(pattern))
-    return "\n".join(str(m) for m in matches)
+    if not root_path.is_dir():
+        return ""
+    page, total = get_file_index(root).search(pattern, limit=max(0, limit), offset=max(0, offset))
+    lines = [str(root_path / rel) for rel in page]
+    shown = max(0, offset) + len(page)
+    if shown < total:
+        lines.append(f"... {total - shown} more of {total} matches (use offset={shown})")
+    return "\n".join(lines)
 
 @app.tool
-def read_file(path: str, max_chars: int = 5000) -> str:
+def read_file(
+    path: str,
+    max_chars: int = 5000,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    tail: Optional[int] = None,
+    stat: bool = False,
+) -> str:
+    # Read part of a text file without loading all of it. Modes, first match wins:
+    # stat=True (size/mtime as JSON), tail=N (last N lines), start_line/end_line
+    # (1-based, inclusive), offset/length (bytes), otherwise the first max_chars characters.
     p = Path(path)
     if not p.exists() or not p.is_file():      # Read the contents of a text file 
         return f"[Error] File not found: {path}"
     try:
-        content = p.read_text(encoding="utf-8")
-        return content[:max_chars] + ("..." if len(content) > max_chars else "")
+        if stat:
+            return json.dumps(file_stat(path))
+        if tail is not None:
+            return read_tail(path, tail, max_chars)
+        if start_line is not None or end_line is not None:
+            text, last, more = read_lines(path, start_line or 1, end_line, max_chars)
+            return text + (f"\n... [more lines follow; next start_line={last + 1}]" if more else "")
+        if offset is not None or length is not None:
+            text, next_offset, size = read_range(path, offset or 0, min(length or max_chars, max_chars * 4))
+            return text + (f"\n... [{size - next_offset} more bytes; next offset={next_offset}]" if next_offset < size else "")
+        content, truncated = read_head(path, max_chars)
+        return content + ("..." if truncated else "")
     except Exception as e:
         return f"[Error] Could not read {path}: {e}"
 
@@ -0,0 +1,272 @@
+"""In-memory file index behind the MCP ``file_search`` tool.
+
+``Path(root).rglob`` walks the whole tree on every call, including ``.git``,
+virtualenvs and ``rag_db``. ``FileIndex`` keeps one listing per directory
+instead and refreshes it incrementally: a directory is only re-listed when
+its mtime (entries added, removed or renamed) or one of the ``.gitignore``
+files above it changed. Within ``MCP_INDEX_TTL`` seconds of the last refresh
+searches are answered without touching the disk at all.
+"""
+import fnmatch
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_EXCLUDES = (
+    ".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea", ".vscode", "*.egg-info", "rag_db", ".cache",
+)
+MCP_INDEX_TTL = float(os.getenv("MCP_INDEX_TTL", "2"))
+MCP_INDEX_EXCLUDES = tuple(p.strip() for p in os.getenv("MCP_INDEX_EXCLUDES", "").split(",") if p.strip())
+MCP_INDEX_MAX_ROOTS = int(os.getenv("MCP_INDEX_MAX_ROOTS", "8"))
+
+
+# ---- ignore rules --------------------------------------------------------
+
+def _glob_to_regex(pattern: str) -> str:
+    """gitignore-style glob: ``*``/``?`` stay within one path segment, ``**`` spans segments."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+@dataclass
+class _Rule:
+    regex: "re.Pattern"
+    negate: bool
+    dir_only: bool
+
+
+def parse_gitignore(text: str) -> List[_Rule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.strip("/") if dir_only else line
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory.
+        anchored = "/" in line
+        body = _glob_to_regex(line.lstrip("/"))
+        rules.append(_Rule(re.compile(("^" if anchored else "(?:^|.*/)") + body + "$"), negate, dir_only))
+    return rules
+
+
+@dataclass
+class _RuleSet:
+    """Rules of one .gitignore, matched against paths relative to ``base``."""
+    base: str  # relative to the index root, "" for the root itself
+    rules: List[_Rule]
+
+    def verdict(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(rel_path):
+                result = not rule.negate
+        return result
+
+
+# ---- index ---------------------------------------------------------------
+
+@dataclass
+class _Dir:
+    mtime: float
+    signature: Tuple  # .gitignore mtimes from the root down to this directory
+    files: List[str] = field(default_factory=list)
+    subdirs: List[str] = field(default_factory=list)
+
+
+class FileIndex:
+    """Incrementally refreshed listing of every non-ignored file under ``root``."""
+
+    def __init__(self, root: str, excludes=DEFAULT_EXCLUDES + MCP_INDEX_EXCLUDES, ttl: float = MCP_INDEX_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._exclude_regex = re.compile("|".join(fnmatch.translate(p) for p in excludes) or "(?!)")
+        self._dirs: Dict[str, _Dir] = {}
+        self._files: List[str] = []
+        self._gitignores: Dict[str, Tuple[float, _RuleSet]] = {}
+        self._refreshed_at = 0.0
+        self._generation = 0
+        self._results: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"searches": 0, "result_cache_hits": 0, "refreshes": 0, "dirs_listed": 0, "dirs_reused": 0}
+
+    # ---- refresh ---------------------------------------------------------
+
+    def _gitignore(self, rel_dir: str, abs_dir: str) -> Tuple[float, Optional[_RuleSet]]:
+        path = os.path.join(abs_dir, ".gitignore")
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._gitignores.pop(rel_dir, None)
+            return 0.0, None
+        cached = self._gitignores.get(rel_dir)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    cached = (mtime, _RuleSet(rel_dir, parse_gitignore(f.read())))
+            except OSError:
+                return 0.0, None
+            self._gitignores[rel_dir] = cached
+        return cached
+
+    def _ignored(self, name: str, rel_path: str, is_dir: bool, rulesets: List[_RuleSet]) -> bool:
+        if self._exclude_regex.match(name):
+            return True
+        ignored = False
+        for ruleset in rulesets:  # outermost first, so nested .gitignore files win
+            verdict = ruleset.verdict(rel_path, is_dir)
+            if verdict is not None:
+                ignored = verdict
+        return ignored
+
+    def _list(self, rel_dir: str, abs_dir: str, entry: _Dir, rulesets: List[_RuleSet]):
+        files, subdirs = [], []
+        try:
+            with os.scandir(abs_dir) as it:
+                for e in it:
+                    rel = f"{rel_dir}/{e.name}" if rel_dir else e.name
+                    try:
+                        is_dir = e.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if self._ignored(e.name, rel, is_dir, rulesets):
+                        continue
+                    (subdirs if is_dir else files).append(e.name)
+        except OSError:
+            pass
+        entry.files, entry.subdirs = sorted(files), sorted(subdirs)
+
+    def refresh(self, force: bool = False):
+        """Re-list directories whose mtime or governing .gitignore changed."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._dirs and now - self._refreshed_at < self.ttl:
+                return
+            changed = False
+            seen = set()
+            files: List[str] = []
+
+            def walk(rel_dir: str, rulesets: List[_RuleSet], signature: Tuple):
+                nonlocal changed
+                abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+                try:
+                    mtime = os.stat(abs_dir).st_mtime
+                except OSError:
+                    return
+                gi_mtime, ruleset = self._gitignore(rel_dir, abs_dir)
+                if ruleset is not None:
+                    rulesets = rulesets + [ruleset]
+                signature = signature + (gi_mtime,)
+                seen.add(rel_dir)
+                entry = self._dirs.get(rel_dir)
+                if entry is None or entry.mtime != mtime or entry.signature != signature:
+                    entry = self._dirs[rel_dir] = _Dir(mtime, signature)
+                    self._list(rel_dir, abs_dir, entry, rulesets)
+                    self.stats["dirs_listed"] += 1
+                    changed = True
+                else:
+                    self.stats["dirs_reused"] += 1
+                prefix = f"{rel_dir}/" if rel_dir else ""
+                files.extend(prefix + name for name in entry.files)
+                for name in entry.subdirs:
+                    walk(prefix + name, rulesets, signature)
+
+            walk("", [], ())
+            for gone in set(self._dirs) - seen:
+                del self._dirs[gone]
+                changed = True
+            if changed:
+                self._files = files
+                self._generation += 1
+                self._results.clear()
+            self._refreshed_at = now
+            self.stats["refreshes"] += 1
+
+    # ---- search ----------------------------------------------------------
+
+    def _match(self, pattern: str) -> List[str]:
+        with self._lock:
+            self.stats["searches"] += 1
+            cached = self._results.get(pattern)
+            if cached is not None:
+                self._results.move_to_end(pattern)
+                self.stats["result_cache_hits"] += 1
+                return cached
+            files = self._files
+        if "/" in pattern:
+            # Like rglob: the pattern matches the trailing segments of the path.
+            regex = re.compile("(?:^|.*/)" + _glob_to_regex(pattern.lstrip("/")) + "$")
+            matches = [f for f in files if regex.match(f)]
+        else:
+            regex = re.compile(fnmatch.translate(pattern))
+            matches = [f for f in files if regex.match(f.rsplit("/", 1)[-1])]
+        with self._lock:
+            self._results[pattern] = matches
+            while len(self._results) > 64:
+                self._results.popitem(last=False)
+        return matches
+
+    def search(self, pattern: str, limit: Optional[int] = None, offset: int = 0) -> Tuple[List[str], int]:
+        """``(page of relative paths, total matches)``, in sorted tree order."""
+        self.refresh()
+        matches = self._match(pattern)
+        end = None if limit is None else offset + limit
+        return matches[offset:end], len(matches)
+
+
+_INDEXES: "OrderedDict[str, FileIndex]" = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_file_index(root: str) -> FileIndex:
+    """Shared index for ``root``; the least recently used roots are dropped first."""
+    key = os.path.realpath(root)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = FileIndex(key)
+            while len(_INDEXES) > MCP_INDEX_MAX_ROOTS:
+                _INDEXES.popitem(last=False)
+        _INDEXES.move_to_end(key)
+        return index
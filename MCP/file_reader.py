@@ -0,0 +1,204 @@
+"""Ranged reads behind the MCP ``read_file`` tool.
+
+Every helper here opens the file, memory-maps it and touches only the bytes
+it returns (plus, for line ranges, the newlines before them), so latency and
+memory depend on the slice size rather than the file size. Offsets are byte
+offsets; slices that start or end inside a UTF-8 character are trimmed to
+the nearest character boundary.
+"""
+import mmap
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+# Bytes sniffed for NUL to guess whether a file is binary.
+_SNIFF_BYTES = 8192
+# Line-start offsets at least this many lines apart are remembered for faster seeks.
+_CHECKPOINT_EVERY = 1024
+_MAX_LINE_INDEXES = 32
+_SCAN_CHUNK = 1 << 20
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[Tuple[object, int]]:
+    """``(buffer, size)``; empty and unmappable files fall back to a plain read."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            yield b"", 0
+            return
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            data = f.read()
+            yield data, len(data)
+            return
+        try:
+            yield mm, size
+        finally:
+            mm.close()
+
+
+def _char_start(buf, pos: int, size: int) -> int:
+    """Move ``pos`` forward past UTF-8 continuation bytes."""
+    while pos < size and pos > 0 and (buf[pos] & 0xC0) == 0x80:
+        pos += 1
+    return pos
+
+
+def _char_end(buf, pos: int, size: int) -> int:
+    """Move ``pos`` back so the slice does not end inside a character."""
+    if pos >= size:
+        return size
+    end = pos
+    while end > 0 and (buf[end] & 0xC0) == 0x80:
+        end -= 1
+    return end if end > pos - 4 else pos
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def file_stat(path: str) -> dict:
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        head = f.read(_SNIFF_BYTES)
+    return {
+        "path": os.path.abspath(path),
+        "size_bytes": st.st_size,
+        "modified": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(st.st_mtime)),
+        "binary": b"\0" in head,
+    }
+
+
+def read_range(path: str, offset: int = 0, length: int = 5000) -> Tuple[str, int, int]:
+    """``(text, next_offset, size)`` for up to ``length`` bytes starting at ``offset``."""
+    with _mapped(path) as (buf, size):
+        start = _char_start(buf, min(max(0, offset), size), size)
+        end = _char_end(buf, min(size, start + max(0, length)), size)
+        return _decode(buf[start:end]), end, size
+
+
+def read_head(path: str, max_chars: int = 5000) -> Tuple[str, bool]:
+    """First ``max_chars`` characters and whether the file continues past them."""
+    # A character is at most 4 bytes, so this many bytes always suffice.
+    text, next_offset, size = read_range(path, 0, max_chars * 4)
+    return text[:max_chars], len(text) > max_chars or next_offset < size
+
+
+class _LineIndex:
+    """Byte offsets of line starts at least ``_CHECKPOINT_EVERY`` lines apart, filled in as lines are read."""
+
+    def __init__(self, mtime: float, size: int):
+        self.mtime = mtime
+        self.size = size
+        self.lines: List[int] = [1]
+        self.offsets: List[int] = [0]
+        self.lock = threading.Lock()
+
+    def nearest(self, line: int) -> Tuple[int, int]:
+        with self.lock:
+            i = bisect_right(self.lines, line) - 1
+            return self.lines[i], self.offsets[i]
+
+    def remember(self, line: int, offset: int):
+        if line < self.lines[-1] + _CHECKPOINT_EVERY:
+            return
+        with self.lock:
+            if line >= self.lines[-1] + _CHECKPOINT_EVERY:
+                self.lines.append(line)
+                self.offsets.append(offset)
+
+
+_LINE_INDEXES: "OrderedDict[str, _LineIndex]" = OrderedDict()
+_LINE_INDEXES_LOCK = threading.Lock()
+
+
+def _line_index(path: str) -> _LineIndex:
+    st = os.stat(path)
+    key = os.path.realpath(path)
+    with _LINE_INDEXES_LOCK:
+        index = _LINE_INDEXES.get(key)
+        if index is None or index.mtime != st.st_mtime or index.size != st.st_size:
+            index = _LINE_INDEXES[key] = _LineIndex(st.st_mtime, st.st_size)
+        _LINE_INDEXES.move_to_end(key)
+        while len(_LINE_INDEXES) > _MAX_LINE_INDEXES:
+            _LINE_INDEXES.popitem(last=False)
+        return index
+
+
+def read_lines(path: str, start_line: int = 1, end_line: Optional[int] = None,
+               max_chars: int = 5000) -> Tuple[str, int, bool]:
+    """Lines ``start_line``..``end_line`` (1-based, inclusive), capped at ``max_chars`` characters.
+
+    Returns ``(text, last line returned, whether more lines follow)``. Text cut
+    short by ``max_chars`` ends on a line boundary, so paging from ``last + 1``
+    skips nothing; only a single line longer than ``max_chars`` is returned cut.
+    """
+    start_line = max(1, start_line)
+    if end_line is not None and end_line < start_line:
+        return "", start_line - 1, False
+    index = _line_index(path)
+    with _mapped(path) as (buf, size):
+        line, pos = index.nearest(start_line)
+        scan = pos
+        while line < start_line and scan < size:
+            # Count newlines a chunk at a time instead of one find() per line.
+            chunk = buf[scan:scan + _SCAN_CHUNK]
+            n = chunk.count(b"\n")
+            if line + n < start_line:
+                if n:
+                    line, pos = line + n, scan + chunk.rfind(b"\n") + 1
+                    index.remember(line, pos)
+                scan += len(chunk)
+                continue
+            for _ in range(start_line - line):
+                scan = buf.find(b"\n", scan) + 1
+            line, pos = start_line, scan
+            index.remember(line, pos)
+        if line < start_line or pos >= size:
+            return "", start_line - 1, False
+
+        start, end, last = pos, pos, line - 1
+        limit = min(size, start + max_chars * 4)
+        while end < limit and (end_line is None or last < end_line):
+            nl = buf.find(b"\n", end, limit)
+            last += 1  # lines scanned; ``last`` is recounted from the text returned
+            if nl == -1:
+                end = limit
+            else:
+                end = nl + 1
+                index.remember(last + 1, end)
+        end = _char_end(buf, end, size)
+        text = _decode(buf[start:end])
+        more = end < size
+        if len(text) > max_chars:
+            text, more = text[:max_chars], True
+        if more and not text.endswith("\n") and "\n" in text:
+            text = text[:text.rfind("\n") + 1]  # drop the partial last line
+        last = start_line - 1 + text.count("\n") + (0 if text.endswith("\n") else 1)
+        return text, last, more
+
+
+def read_tail(path: str, lines: int = 50, max_chars: int = 5000) -> str:
+    """The last ``lines`` lines (at most ``max_chars`` characters, keeping the end)."""
+    with _mapped(path) as (buf, size):
+        if lines <= 0 or size == 0:
+            return ""
+        floor = max(0, size - max_chars * 4)
+        start = size - 1 if buf[size - 1] == 0x0A else size  # ignore the final newline
+        for _ in range(lines):
+            nl = buf.rfind(b"\n", floor, start)
+            if nl == -1:
+                start = _char_start(buf, floor, size)
+                break
+            start = nl
+        else:
+            start += 1
+        text = _decode(buf[start:size])
+        return text[-max_chars:] if len(text) > max_chars else text
@@ -0,0 +1,218 @@
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+import tracing
+
+SERVER_PATH = str((Path(__file__).parent / "MCP_servers.py").resolve())
+
+
+class _Slot:
+    """One warm stdio session and the task that owns its context managers."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session = None
+        self.last_used = 0.0
+        self.stop: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class MCPSessionManager:
+    """Pool of initialized MCP stdio sessions running on a background event loop.
+
+    Sync callers hand work to the loop through ``call_tool``/``list_tools``. Each
+    call checks out an idle session, so up to ``pool_size`` calls are in flight
+    at once. Sessions idle longer than ``health_check_interval`` are pinged
+    before reuse, and a session whose server died is respawned in the background.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        server_path: str = SERVER_PATH,
+        call_timeout: float = 60.0,
+        health_check_interval: float = 30.0,
+        respawn_delay: float = 1.0,
+    ):
+        self.pool_size = max(1, pool_size or int(os.getenv("MCP_POOL_SIZE", "2")))
+        self.server_path = server_path
+        self.call_timeout = call_timeout
+        self.health_check_interval = health_check_interval
+        self.respawn_delay = respawn_delay
+        self.stats = {"calls": 0, "errors": 0, "respawns": 0, "health_failures": 0}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: list[_Slot] = []
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        self._closing = False
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._closing = False
+            self._started.clear()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="mcp-session-pool", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._idle = asyncio.Queue()
+        self._slots = []
+        for i in range(self.pool_size):
+            slot = _Slot(i)
+            slot.task = self._loop.create_task(self._own_session(slot))
+            self._slots.append(slot)
+        self._loop.call_soon(self._started.set)
+        self._loop.run_forever()
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None:
+                return
+            self._loop, self._thread = None, None
+
+        async def _close():
+            self._closing = True
+            for slot in self._slots:
+                if slot.stop is not None:
+                    slot.stop.set()
+            tasks = [s.task for s in self._slots if s.task is not None]
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=timeout)
+                for task in pending:
+                    task.cancel()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), loop).result(timeout + 1)
+        except Exception as e:
+            print(f"[MCP] Error while closing sessions: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    async def _own_session(self, slot: _Slot):
+        # The stdio/ClientSession contexts must be entered and exited by the same
+        # task, so each slot keeps one long-lived task that owns them.
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        params = StdioServerParameters(command=sys.executable, args=[self.server_path])
+        while not self._closing:
+            slot.stop = asyncio.Event()
+            spawn_start = time.time()
+            try:
+                async with AsyncExitStack() as stack:
+                    read, write = await stack.enter_async_context(stdio_client(params))
+                    session = await stack.enter_async_context(ClientSession(read, write))
+                    await session.initialize()
+                    # Server start-up cost gets its own trace; it is paid outside any request
+                    tracing.record_span("mcp.spawn", "tool", spawn_start, time.time(), slot=slot.index)
+                    slot.session = session
+                    slot.last_used = time.monotonic()
+                    self._idle.put_nowait(slot)
+                    await slot.stop.wait()
+            except Exception as e:
+                print(f"[MCP] Session {slot.index} failed: {e}")
+            slot.session = None
+            if not self._closing:
+                self.stats["respawns"] += 1
+                await asyncio.sleep(self.respawn_delay)
+
+    # ---- checkout --------------------------------------------------------
+
+    async def _acquire(self) -> _Slot:
+        while True:
+            slot = await self._idle.get()
+            if slot.session is None or slot.stop.is_set():
+                continue  # died while idle; its owner task is respawning it
+            if time.monotonic() - slot.last_used > self.health_check_interval:
+                try:
+                    await asyncio.wait_for(slot.session.send_ping(), timeout=5.0)
+                except asyncio.CancelledError:
+                    self._idle.put_nowait(slot)
+                    raise
+                except Exception:
+                    self.stats["health_failures"] += 1
+                    slot.stop.set()
+                    continue
+            return slot
+
+    def _release(self, slot: _Slot, healthy: bool = True):
+        slot.last_used = time.monotonic()
+        if healthy and not slot.stop.is_set():
+            self._idle.put_nowait(slot)
+        else:
+            slot.stop.set()
+
+    async def _with_session(self, fn: Callable[[Any], Awaitable[Any]], span=None):
+        try:
+            from mcp.shared.exceptions import McpError
+        except ImportError:  # renamed in newer mcp releases
+            from mcp.shared.exceptions import MCPError as McpError
+
+        wait_start = time.monotonic()
+        slot = await asyncio.wait_for(self._acquire(), self.call_timeout)
+        if span is not None:
+            span.attrs["pool_wait_ms"] = round((time.monotonic() - wait_start) * 1000, 3)
+        try:
+            result = await asyncio.wait_for(fn(slot.session), self.call_timeout)
+        except McpError:
+            # Protocol-level error reported by the server; the session is still fine.
+            self._release(slot)
+            raise
+        except BaseException:
+            self._release(slot, healthy=False)
+            raise
+        self._release(slot)
+        return result
+
+    def _submit(self, fn: Callable[[Any], Awaitable[Any]], span=None):
+        self.start()
+        with self._lock:
+            self.stats["calls"] += 1
+        future = asyncio.run_coroutine_threadsafe(self._with_session(fn, span), self._loop)
+        try:
+            return future.result()
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+
+    # ---- public API ------------------------------------------------------
+
+    def call_tool(self, name: str, arguments: dict):
+        with tracing.span("mcp.call_tool", "tool", tool=name) as span:
+            return self._submit(lambda session: session.call_tool(name, arguments), span)
+
+    def list_tools(self):
+        with tracing.span("mcp.list_tools", "tool") as span:
+            return self._submit(lambda session: session.list_tools(), span)
+
+
+_MANAGER: Optional[MCPSessionManager] = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_session_manager() -> MCPSessionManager:
+    """Return the process-wide session manager, creating it on first use."""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = MCPSessionManager()
+            atexit.register(_MANAGER.shutdown)
+        return _MANAGER
@@ -1,17 +1,8 @@
-import os
-from langchain.tools import Tool
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain_google_genai import ChatGoogleGenerativeAI
-from rag_tool import rag_tool
-from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-
-load_dotenv()
-
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not found. Add it to your .env file.")
-os.environ["GOOGLE_API_KEY"] = api_key
+from langchain_core.tools import Tool
+from langchain_core.prompts import PromptTemplate
+from central import make_llm
+from RAG.rag_tool import rag_tool
+from startup import Lazy
 
 rag_search_tool = Tool(
     name="RAG Search",
@@ -19,8 +10,6 @@ rag_search_tool = Tool(
     description="Use this tool to search the document knowledge base and get relevant context for a user query."
 )
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temp=0)
-
 # ReAct agent
 tools = [rag_search_tool]
 prompt = PromptTemplate.from_template("""
@@ -46,10 +35,22 @@ Begin!
 Question: {input}
 {agent_scratchpad}
 """)
-agent = create_react_agent(llm=llm, tools=tools, prompt=prompt)
+def _build_agent_executor():
+    from langchain.agents import AgentExecutor, create_react_agent
+
+    llm = make_llm(0, caller="agentic_rag")
+    agent = create_react_agent(llm=llm, tools=tools, prompt=prompt)
+    # Wrap in AgentExecutor
+    return AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True) #why
+
+
+# Built on first use so importing this module stays cheap
+_AGENT_EXECUTOR = Lazy("agentic_rag.executor", _build_agent_executor)
+
+
+def get_agent_executor():
+    return _AGENT_EXECUTOR.get()
 
-# Wrap in AgentExecutor
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True) #why
 
 if __name__ == "__main__":
     print("\nAgentic RAG (Gemini) ready! Ask anything about your docs.\n")
@@ -57,6 +58,6 @@ if __name__ == "__main__":
         query = input("You: ")
         if query.lower() in ["exit", "quit"]:
             break
-        response = agent_executor.invoke({"input": query})
+        response = get_agent_executor().invoke({"input": query})
         print("Agent:", response["output"])
  
\ No newline at end of file
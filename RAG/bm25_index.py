@@ -0,0 +1,140 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Compound identifiers (file names, dotted paths, error codes) are indexed whole
+# and by their alphanumeric parts, so "load_docs.py" is found by exact queries
+# as well as by "load docs" or "py".
+_TOKEN_RE = re.compile(r"[a-z0-9_]+(?:[./\-:][a-z0-9_]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        parts = _PART_RE.findall(match)
+        if len(parts) > 1 or (parts and parts[0] != match):
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Compact on-disk inverted index (SQLite) scored with Okapi BM25.
+
+    Postings are stored as ``(term, doc_id, tf)`` rows clustered by term, so a
+    query reads only the posting lists of its own terms.
+    """
+
+    FILE_NAME = "bm25.sqlite3"
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = str(path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._stats: Optional[Tuple[int, float]] = None
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id TEXT PRIMARY KEY, source TEXT, length INTEGER NOT NULL,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS docs_source ON docs(source);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);"
+        )
+        self._db.commit()
+
+    @classmethod
+    def for_store(cls, store_directory: str) -> "BM25Index":
+        return cls(str(Path(store_directory) / cls.FILE_NAME))
+
+    # ---- writes ----------------------------------------------------------
+
+    def _delete_locked(self, doc_ids: List[str]):
+        for i in range(0, len(doc_ids), 500):
+            batch = doc_ids[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            self._db.execute(f"DELETE FROM postings WHERE doc_id IN ({marks})", batch)
+            self._db.execute(f"DELETE FROM docs WHERE doc_id IN ({marks})", batch)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None):
+        metadatas = metadatas or [{} for _ in ids]
+        doc_rows, posting_rows = [], []
+        for doc_id, text, meta in zip(ids, texts, metadatas):
+            counts = Counter(tokenize(text))
+            doc_rows.append((doc_id, (meta or {}).get("source"), sum(counts.values()), text, json.dumps(meta or {})))
+            posting_rows.extend((term, doc_id, tf) for term, tf in counts.items())
+        with self._lock:
+            self._delete_locked(list(ids))
+            self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)", doc_rows)
+            self._db.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", posting_rows)
+            self._db.commit()
+            self._stats = None
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._delete_locked(list(ids))
+            self._db.commit()
+            self._stats = None
+
+    def delete_source(self, source: str):
+        with self._lock:
+            ids = [r[0] for r in self._db.execute("SELECT doc_id FROM docs WHERE source = ?", (source,))]
+            self._delete_locked(ids)
+            self._db.commit()
+            self._stats = None
+
+    # ---- reads -----------------------------------------------------------
+
+    def count(self) -> int:
+        return self._corpus_stats()[0]
+
+    def _corpus_stats(self) -> Tuple[int, float]:
+        with self._lock:
+            if self._stats is None:
+                n, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+                self._stats = (n, (total / n) if n else 0.0)
+            return self._stats
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float, str, dict]]:
+        """Return up to ``k`` ``(doc_id, score, text, metadata)`` tuples, best first."""
+        n_docs, avg_len = self._corpus_stats()
+        terms = set(tokenize(query))
+        if not n_docs or not terms:
+            return []
+        scores: Dict[str, float] = {}
+        with self._lock:
+            for term in terms:
+                postings = self._db.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id"
+                    " WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = self.k1 * (1 - self.b + self.b * length / (avg_len or 1))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+            if not top:
+                return []
+            marks = ",".join("?" * len(top))
+            rows = {
+                r[0]: (r[1], json.loads(r[2]))
+                for r in self._db.execute(
+                    f"SELECT doc_id, text, metadata FROM docs WHERE doc_id IN ({marks})",
+                    [doc_id for doc_id, _ in top],
+                )
+            }
+        return [(doc_id, score, *rows[doc_id]) for doc_id, score in top if doc_id in rows]
@@ -0,0 +1,151 @@
+"""Token-budgeted context assembly for RAG prompts.
+
+The stuff chain pastes every retrieved chunk into the prompt verbatim. Chunks
+from the same file share ``chunk_overlap`` characters, and most sentences in a
+chunk have nothing to do with the question. ``ContextAssembler`` stitches
+neighbouring chunks back together, drops repeated sentences, scores the rest
+against the query and keeps the best ones until the token budget is spent.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from RAG.bm25_index import tokenize
+
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "400"))
+
+# Sentence ends, or blank lines (headings, list items and code have no periods).
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    # Same rough 4 characters per token as the LLM scheduler's estimate.
+    return len(text) // 4 + 1 if text else 0
+
+
+def _stitch(left: str, right: str, max_overlap: int = 200) -> str:
+    """Join two consecutive chunks, removing the text they share."""
+    for size in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + "\n" + right
+
+
+def _merge_chunks(docs: Sequence) -> List[Tuple[str, str]]:
+    """``(source, text)`` per run of consecutive chunks, in retrieval order."""
+    groups: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+    for rank, doc in enumerate(docs):
+        meta = doc.metadata or {}
+        source = str(meta.get("source", f"doc{rank}"))
+        chunk = meta.get("chunk")
+        groups[source].append((chunk if isinstance(chunk, int) else rank, rank, doc.page_content))
+
+    merged: List[Tuple[int, str, str]] = []
+    for source, chunks in groups.items():
+        chunks.sort()
+        start_rank, text, last = chunks[0][1], chunks[0][2], chunks[0][0]
+        for index, rank, content in chunks[1:]:
+            if index == last:
+                continue  # the same chunk retrieved twice
+            if index == last + 1:
+                text = _stitch(text, content)
+            else:
+                merged.append((start_rank, source, text))
+                start_rank, text = rank, content
+            start_rank, last = min(start_rank, rank), index
+        merged.append((start_rank, source, text))
+    merged.sort()
+    return [(source, text) for _, source, text in merged]
+
+
+@dataclass
+class ContextStats:
+    chunks: int = 0
+    raw_tokens: int = 0          # what the stuff chain would have sent
+    context_tokens: int = 0
+    sentences: int = 0
+    sentences_kept: int = 0
+    duplicates_dropped: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.raw_tokens - self.context_tokens)
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "saved_tokens": self.saved_tokens}
+
+
+class ContextAssembler:
+    """Builds a query-focused context of at most ``budget_tokens`` tokens."""
+
+    def __init__(self, budget_tokens: int = RAG_CONTEXT_TOKENS):
+        self.budget_tokens = budget_tokens
+        self._lock = threading.Lock()
+        self._totals = Counter()
+
+    def assemble(self, query: str, docs: Sequence) -> Tuple[str, ContextStats]:
+        stats = ContextStats(chunks=len(docs), raw_tokens=sum(estimate_tokens(d.page_content) for d in docs))
+
+        # (block, position, sentence) for every distinct sentence
+        seen = set()
+        candidates: List[Tuple[int, int, str]] = []
+        for block, (_, text) in enumerate(_merge_chunks(docs)):
+            for position, sentence in enumerate(_SENTENCE_RE.split(text)):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                stats.sentences += 1
+                key = _SPACE_RE.sub(" ", sentence.lower())
+                if key in seen:
+                    stats.duplicates_dropped += 1
+                    continue
+                seen.add(key)
+                candidates.append((block, position, sentence))
+
+        # Query-term overlap weighted by IDF over the candidates, with a small
+        # bonus for earlier (better ranked) blocks to break ties.
+        terms = [set(tokenize(s)) for _, _, s in candidates]
+        df = Counter(t for ts in terms for t in ts)
+        n = len(candidates)
+        query_terms = set(tokenize(query))
+
+        def score(i: int) -> float:
+            overlap = sum(math.log(1 + n / df[t]) for t in query_terms & terms[i])
+            return overlap / math.sqrt(len(terms[i]) or 1) + 0.01 / (1 + candidates[i][0])
+
+        chosen, used = [], 0
+        for i in sorted(range(n), key=score, reverse=True):
+            cost = estimate_tokens(candidates[i][2])
+            if used + cost > self.budget_tokens:
+                if used:
+                    break
+                # A single oversized sentence: keep its head rather than nothing.
+                candidates[i] = (*candidates[i][:2], candidates[i][2][: self.budget_tokens * 4])
+                cost = estimate_tokens(candidates[i][2])
+            chosen.append(i)
+            used += cost
+
+        # Back in document order, one paragraph per source block.
+        blocks: Dict[int, List[str]] = defaultdict(list)
+        for i in sorted(chosen, key=lambda i: candidates[i][:2]):
+            blocks[candidates[i][0]].append(candidates[i][2])
+        context = "\n\n".join(" ".join(blocks[b]) for b in sorted(blocks))
+
+        stats.sentences_kept = len(chosen)
+        stats.context_tokens = estimate_tokens(context)
+        with self._lock:
+            self._totals.update({"calls": 1, **{k: v for k, v in stats.to_dict().items() if k != "chunks"}})
+        return context, stats
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        raw = totals.get("raw_tokens", 0)
+        totals["saved_ratio"] = round(totals.get("saved_tokens", 0) / raw, 3) if raw else 0.0
+        totals["budget_tokens"] = self.budget_tokens
+        return totals
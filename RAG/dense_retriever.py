@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+from RAG.indexer import MANIFEST_NAME
+from RAG.ingest import chroma_collection, index_generation
+import tracing
+
+
+def _normalize(arr: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Maximal marginal relevance over a candidate matrix.
+
+    Relevance and the full candidate-candidate similarity matrix are computed
+    with one matrix product each; the greedy loop then only does O(n) vector
+    updates per pick.
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    cand = _normalize(np.asarray(candidates, dtype=np.float32))
+    q = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+    relevance = cand @ q
+    similarity = cand @ cand.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_sim = similarity[first].copy()
+    taken = np.zeros(n, dtype=bool)
+    taken[first] = True
+    for _ in range(min(k, n) - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        scores[taken] = -np.inf
+        j = int(np.argmax(scores))
+        selected.append(j)
+        taken[j] = True
+        np.maximum(max_sim, similarity[j], out=max_sim)
+    return selected
+
+
+def candidates_by_vector(vectordb, query_vector: List[float], fetch_k: int) -> Tuple[List[Document], np.ndarray]:
+    """Fetch the ``fetch_k`` nearest documents together with their stored vectors."""
+    if hasattr(vectordb, "candidates_by_vector"):
+        return vectordb.candidates_by_vector(query_vector, fetch_k)
+    # Chroma
+    res = chroma_collection(vectordb).query(
+        query_embeddings=[query_vector],
+        n_results=fetch_k,
+        include=["documents", "metadatas", "embeddings"],
+    )
+    ids = res["ids"][0]
+    docs = [
+        Document(id=doc_id, page_content=text or "", metadata=meta or {})
+        for doc_id, text, meta in zip(ids, res["documents"][0], res["metadatas"][0])
+    ]
+    vectors = np.asarray(res["embeddings"][0], dtype=np.float32) if ids else np.zeros((0, 0), dtype=np.float32)
+    return docs, vectors
+
+
+class DenseRetriever(BaseRetriever):
+    """MMR retriever with a query-result LRU cache and latency metrics.
+
+    Results are cached by (query embedding, k, fetch_k, lambda_mult). The cache
+    is dropped whenever the index changes: in-process writes bump the ingest
+    generation counter, and re-indexing from another process rewrites the
+    manifest next to the store.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    embeddings: Any
+    k: int = 2
+    fetch_k: int = 10
+    lambda_mult: float = 0.5
+    cache_size: int = 256
+    store_directory: Optional[str] = None
+
+    _cache: "OrderedDict[str, Tuple[List[str], List[Document]]]" = PrivateAttr(default_factory=OrderedDict)
+    _cache_version: Any = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _latencies: deque = PrivateAttr(default_factory=lambda: deque(maxlen=1000))
+    _counters: Dict[str, int] = PrivateAttr(default_factory=lambda: {"queries": 0, "cache_hits": 0})
+
+    def _index_version(self):
+        manifest_mtime = None
+        if self.store_directory:
+            try:
+                manifest_mtime = os.stat(Path(self.store_directory) / MANIFEST_NAME).st_mtime
+            except OSError:
+                pass
+        return index_generation(), manifest_mtime
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def search(self, query: str, k: Optional[int] = None, fetch_k: Optional[int] = None,
+               lambda_mult: Optional[float] = None) -> List[Document]:
+        start = time.perf_counter()
+        k = k or self.k
+        fetch_k = max(fetch_k or self.fetch_k, k)
+        lambda_mult = self.lambda_mult if lambda_mult is None else lambda_mult
+
+        with tracing.span("embedding.query", "embedding"):
+            query_vector = self.embeddings.embed_query(query)
+        digest = hashlib.sha1(np.asarray(query_vector, dtype=np.float16).tobytes()).hexdigest()
+        key = f"{digest}:{k}:{fetch_k}:{lambda_mult}"
+        version = self._index_version()
+
+        with self._lock:
+            self._counters["queries"] += 1
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+            hit = self._cache.get(key)
+            if hit is not None:
+                span = tracing.current_span()
+                if span is not None:
+                    span.attrs["cache_hit"] = True
+                self._cache.move_to_end(key)
+                self._counters["cache_hits"] += 1
+                self._latencies.append(time.perf_counter() - start)
+                return list(hit[1])
+
+        with tracing.span("vector.search", "retrieval", fetch_k=fetch_k):
+            docs, vectors = candidates_by_vector(self.vectorstore, query_vector, fetch_k)
+        with tracing.span("mmr", "retrieval", candidates=len(docs)):
+            result = [docs[i] for i in mmr_select(np.asarray(query_vector), vectors, k, lambda_mult)]
+
+        with self._lock:
+            self._cache[key] = ([d.id for d in result], result)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._latencies.append(time.perf_counter() - start)
+        return list(result)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search(query)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+            queries, hits = self._counters["queries"], self._counters["cache_hits"]
+
+        def pct(p: float) -> float:
+            return lat[min(len(lat) - 1, int(p * len(lat)))] * 1000 if lat else 0.0
+
+        return {
+            "queries": queries,
+            "cache_hits": hits,
+            "hit_rate": hits / queries if queries else 0.0,
+            "cache_entries": len(self._cache),
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p95": pct(0.95),
+        }
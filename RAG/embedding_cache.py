@@ -0,0 +1,130 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# SQLite limits the number of bound parameters per statement.
+_LOOKUP_BATCH = 500
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Disk-backed cache in front of an ``Embeddings`` model.
+
+    Vectors are keyed by model name plus a hash of the whitespace-normalized
+    text and stored as float16 blobs in SQLite. When the table grows past
+    ``max_entries`` the least recently used rows are evicted.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, path: str, max_entries: int = 200_000):
+        self.base = base
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+        self._conn.commit()
+
+    def _key(self, text: str, kind: str) -> str:
+        digest = hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[i:i + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [time.time(), *batch],
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        now = time.time()
+        rows = [
+            (key, len(vec), np.asarray(vec, dtype=np.float16).tobytes(), now)
+            for key, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self._key(t, kind) for t in texts]
+        cached = self._lookup(list(dict.fromkeys(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        n_missed = sum(1 for k in keys if k not in cached)
+        with self._lock:
+            self.hits += len(keys) - n_missed
+            self.misses += n_missed
+
+        if missing:
+            miss_texts = list(missing.values())
+            if kind == "query":
+                vectors = [self.base.embed_query(miss_texts[0])]
+            else:
+                vectors = self.base.embed_documents(miss_texts)
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update({k: list(v) for k, v in fresh.items()})
+        return [cached[k] for k in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "doc")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+def wrap_with_cache(base: Embeddings, model_name: str, path: Optional[str], max_entries: int) -> Embeddings:
+    """Return ``base`` wrapped in a ``CachedEmbeddings`` unless caching is disabled."""
+    if not path or path.lower() in {"0", "off", "none"}:
+        return base
+    return CachedEmbeddings(base, model_name=model_name, path=path, max_entries=max_entries)
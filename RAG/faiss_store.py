@@ -0,0 +1,353 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+
+
+def _normalize(vectors) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class FaissVectorStore(VectorStore):
+    """FAISS index plus a SQLite docstore, persisted under one directory.
+
+    Vectors are L2-normalized and searched by inner product, so scores are
+    cosine similarities. The index is opened memory-mapped and read-only, so
+    startup does not copy it into RAM and several processes can share its pages;
+    it is loaded into memory only on the first write. HNSW indexes cannot remove
+    vectors, so deletions there are tombstoned in the docstore and filtered out
+    of search results.
+
+    An ``ivf`` store starts as an exact flat index: with no more lists than
+    ``nprobe`` IVF would search them all anyway. Once the corpus has enough
+    vectors for more lists (39 per list, as FAISS wants for k-means), it is
+    trained on a sample of the whole corpus and rebuilt, and rebuilt again each
+    time the corpus supports twice as many lists, up to ``nlist``.
+    """
+
+    INDEX_FILE = "index.faiss"
+    DOCSTORE_FILE = "docstore.sqlite3"
+    META_FILE = "faiss_meta.json"
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding: Embeddings,
+        index_type: str = "flat",
+        nlist: int = 256,
+        nprobe: int = 8,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        mmap: bool = True,
+    ):
+        self.persist_directory = Path(persist_directory)
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self._lock = threading.RLock()
+        self._writable = False
+        self._dirty = False
+
+        meta_path = self.persist_directory / self.META_FILE
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        # An existing index keeps the type it was built with.
+        self.index_type = meta.get("index_type", index_type)
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type {self.index_type!r}; expected one of {INDEX_TYPES}")
+
+        index_path = self.persist_directory / self.INDEX_FILE
+        self.index = None
+        if index_path.exists():
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            self.index = faiss.read_index(str(index_path), flags)
+            self._writable = not mmap
+            self._apply_search_params()
+
+        self._db = sqlite3.connect(str(self.persist_directory / self.DOCSTORE_FILE), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " int_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " doc_id TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " deleted INTEGER NOT NULL DEFAULT 0,"
+            " source TEXT)"
+        )
+        columns = {r[1] for r in self._db.execute("PRAGMA table_info(docs)")}
+        if "source" not in columns:
+            # Docstores written before ``source`` had its own column.
+            self._db.execute("ALTER TABLE docs ADD COLUMN source TEXT")
+            self._db.executemany(
+                "UPDATE docs SET source = ? WHERE int_id = ?",
+                [(json.loads(meta).get("source"), int_id)
+                 for int_id, meta in self._db.execute("SELECT int_id, metadata FROM docs").fetchall()],
+            )
+        self._db.execute("CREATE INDEX IF NOT EXISTS docs_doc_id ON docs(doc_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS docs_source ON docs(source)")
+        self._db.commit()
+
+    # ---- index management ------------------------------------------------
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _create_index(self, vectors: np.ndarray):
+        dim = vectors.shape[1]
+        if self.index_type == "hnsw":
+            index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT))
+        else:
+            # IVF starts flat until there is enough data to train it (``_maybe_train``).
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.index = index
+        self._writable = True
+        self._apply_search_params()
+
+    def _maybe_train(self):
+        """(Re)build an ``ivf`` store's index once the corpus supports twice as many lists (or ``nlist``)."""
+        if self.index_type != "ivf":
+            return
+        current = self.index.nlist if isinstance(self.index, faiss.IndexIVF) else 0
+        target = min(self.nlist, self.index.ntotal // 39)
+        if target <= max(self.nprobe, current) or (target < 2 * current and target < self.nlist):
+            return
+        int_ids = np.asarray(
+            [r[0] for r in self._db.execute("SELECT int_id FROM docs WHERE deleted = 0 ORDER BY int_id")],
+            dtype=np.int64,
+        )
+        # FAISS uses at most 256 points per list for k-means; a random sample of that size is enough.
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(int_ids, size=min(len(int_ids), target * 256), replace=False))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(self.index.d), self.index.d, target, faiss.METRIC_INNER_PRODUCT)
+        index.train(self.index.reconstruct_batch(sample))
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        for i in range(0, len(int_ids), 65536):
+            batch = int_ids[i:i + 65536]
+            index.add_with_ids(self.index.reconstruct_batch(batch), batch)
+        print(f"[RAG] FAISS IVF index trained with {target} lists on {len(sample)} of {len(int_ids)} vectors")
+        self.index = index
+        self._apply_search_params()
+
+    def _apply_search_params(self):
+        inner = faiss.downcast_index(self.index.index) if isinstance(self.index, faiss.IndexIDMap2) else self.index
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = self.ef_search
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = self.nprobe
+
+    def _ensure_writable(self):
+        if self.index is not None and not self._writable:
+            # Memory-mapped indexes are read-only; load a private copy to modify.
+            self.index = faiss.read_index(str(self.persist_directory / self.INDEX_FILE))
+            self._writable = True
+            self._apply_search_params()
+
+    def persist(self):
+        """Write the index to disk (atomically) if it changed."""
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+            path = self.persist_directory / self.INDEX_FILE
+            tmp = path.with_suffix(".tmp")
+            faiss.write_index(self.index, str(tmp))
+            os.replace(tmp, path)
+            (self.persist_directory / self.META_FILE).write_text(
+                json.dumps({"index_type": self.index_type, "dim": self.index.d})
+            )
+            self._db.commit()
+            self._dirty = False
+
+    # ---- writes ----------------------------------------------------------
+
+    def _mark_deleted(self, doc_ids: List[str]) -> int:
+        if not doc_ids:
+            return 0
+        rows = []
+        for i in range(0, len(doc_ids), 500):
+            batch = doc_ids[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            rows += self._db.execute(
+                f"SELECT int_id FROM docs WHERE deleted = 0 AND doc_id IN ({marks})", batch
+            ).fetchall()
+        int_ids = [r[0] for r in rows]
+        if not int_ids:
+            return 0
+        self._db.executemany("UPDATE docs SET deleted = 1 WHERE int_id = ?", [(i,) for i in int_ids])
+        if self.index is not None and self.index_type != "hnsw":
+            self._ensure_writable()
+            self.index.remove_ids(np.asarray(int_ids, dtype=np.int64))
+        self._dirty = True
+        return len(int_ids)
+
+    def upsert_embeddings(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+        """Insert or replace documents with pre-computed vectors."""
+        if not ids:
+            return
+        arr = _normalize(vectors)
+        with self._lock:
+            self._mark_deleted(list(ids))
+            int_ids = []
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                cur = self._db.execute(
+                    "INSERT INTO docs (doc_id, text, metadata, source) VALUES (?, ?, ?, ?)",
+                    (doc_id, text, json.dumps(meta or {}), (meta or {}).get("source")),
+                )
+                int_ids.append(cur.lastrowid)
+            if self.index is None:
+                self._create_index(arr)
+            else:
+                self._ensure_writable()
+            self.index.add_with_ids(arr, np.asarray(int_ids, dtype=np.int64))
+            self._maybe_train()
+            self._db.commit()
+            self._dirty = True
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        self.upsert_embeddings(list(ids), texts, self._embedding.embed_documents(texts), metadatas)
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        with self._lock:
+            removed = self._mark_deleted(list(ids or []))
+            self._db.commit()
+        return removed > 0
+
+    def get(self, where: Optional[dict] = None) -> dict:
+        """Chroma-style ``get`` supporting an equality filter on metadata keys.
+
+        ``source`` is filtered in SQL on its indexed column; other keys are
+        matched against the decoded metadata of the remaining rows.
+        """
+        where = dict(where or {})
+        sql, params = "SELECT doc_id, text, metadata FROM docs WHERE deleted = 0", []
+        if "source" in where:
+            sql += " AND source = ?"
+            params.append(where.pop("source"))
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        out = {"ids": [], "documents": [], "metadatas": []}
+        for doc_id, text, meta in rows:
+            meta = json.loads(meta)
+            if where and any(meta.get(k) != v for k, v in where.items()):
+                continue
+            out["ids"].append(doc_id)
+            out["documents"].append(text)
+            out["metadatas"].append(meta)
+        return out
+
+    # ---- reads -----------------------------------------------------------
+
+    def _search(self, vector, k: int) -> List[Tuple[int, float]]:
+        if self.index is None or self.index.ntotal == 0:
+            return []
+        query = _normalize(vector)
+        with self._lock:
+            fetch = k
+            if self.index_type == "hnsw":
+                tombstones = self._db.execute("SELECT COUNT(*) FROM docs WHERE deleted = 1").fetchone()[0]
+                fetch = min(self.index.ntotal, k + tombstones)
+            scores, int_ids = self.index.search(query, fetch)
+        return [(int(i), float(s)) for i, s in zip(int_ids[0], scores[0]) if i != -1]
+
+    def _load_docs(self, hits: List[Tuple[int, float]]) -> List[Tuple[int, Document, float]]:
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT int_id, doc_id, text, metadata FROM docs WHERE deleted = 0 AND int_id IN ({marks})",
+                [i for i, _ in hits],
+            ).fetchall()
+        by_id = {
+            r[0]: Document(id=r[1], page_content=r[2], metadata=json.loads(r[3]))
+            for r in rows
+        }
+        return [(i, by_id[i], score) for i, score in hits if i in by_id]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any):
+        return [(doc, score) for _, doc, score in self._load_docs(self._search(embedding, k))][:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4, **kwargs: Any):
+        # Cosine similarity in [-1, 1] mapped to [0, 1].
+        return [(doc, (score + 1) / 2) for doc, score in self.similarity_search_with_score(query, k)]
+
+    def candidates_by_vector(self, embedding: List[float], fetch_k: int) -> Tuple[List[Document], np.ndarray]:
+        """Return up to ``fetch_k`` nearest documents with their stored (normalized) vectors."""
+        found = self._load_docs(self._search(embedding, fetch_k))[:fetch_k]
+        if not found:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            vectors = np.vstack([self.index.reconstruct(int(i)) for i, _, _ in found])
+        return [doc for _, doc, _ in found], vectors
+
+    def max_marginal_relevance_search_by_vector(
+        self, embedding: List[float], k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        docs, vectors = self.candidates_by_vector(embedding, fetch_k)
+        if not docs:
+            return []
+        selected = maximal_marginal_relevance(
+            _normalize(embedding)[0], vectors, lambda_mult=lambda_mult, k=min(k, len(docs))
+        )
+        return [docs[i] for i in selected]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        persist_directory: str = "rag_db/faiss",
+        **kwargs: Any,
+    ) -> "FaissVectorStore":
+        ids = kwargs.pop("ids", None)
+        store = cls(persist_directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.persist()
+        return store
@@ -0,0 +1,95 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+import tracing
+
+# Tokens that look like identifiers, file names, paths or error codes.
+_IDENTIFIER_RE = re.compile(r"\d|[_./\\:]|[a-z][A-Z]|^[A-Z]{2,}$|^[\"'`].+[\"'`]$")
+
+
+def keyword_ratio(query: str) -> float:
+    """Fraction of query tokens that look like exact identifiers rather than prose."""
+    tokens = query.split()
+    if not tokens:
+        return 0.0
+    return sum(1 for t in tokens if _IDENTIFIER_RE.search(t.strip("?,;()"))) / len(tokens)
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and dense results with weighted reciprocal-rank fusion.
+
+    Weights shift toward the sparse side as the query gets more identifier-like.
+    When a keyword-heavy query has a clear BM25 winner (top score at least
+    ``skip_dense_ratio`` times the runner-up), the dense side, and with it the
+    query embedding, is skipped entirely.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    dense: BaseRetriever
+    sparse: Any
+    k: int = 2
+    sparse_k: int = 10
+    rrf_k: int = 60
+    keyword_threshold: float = 0.5
+    skip_dense_ratio: float = 2.0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _counters: Dict[str, int] = PrivateAttr(default_factory=lambda: {"queries": 0, "dense_skipped": 0})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def query_weights(self, query: str) -> Tuple[float, float]:
+        """Return ``(dense_weight, sparse_weight)`` for a query."""
+        ratio = keyword_ratio(query)
+        return 1.5 - ratio, 0.5 + ratio
+
+    def retrieve(
+        self,
+        query: str,
+        dense_weight: Optional[float] = None,
+        sparse_weight: Optional[float] = None,
+    ) -> List[Document]:
+        auto_dense, auto_sparse = self.query_weights(query)
+        dense_weight = auto_dense if dense_weight is None else dense_weight
+        sparse_weight = auto_sparse if sparse_weight is None else sparse_weight
+        with self._lock:
+            self._counters["queries"] += 1
+
+        with tracing.span("bm25.search", "retrieval"):
+            hits = self.sparse.search(query, self.sparse_k) if sparse_weight > 0 else []
+        sparse_docs = [Document(id=doc_id, page_content=text, metadata=meta) for doc_id, _, text, meta in hits]
+
+        confident = bool(hits) and (len(hits) == 1 or hits[0][1] >= self.skip_dense_ratio * hits[1][1])
+        if dense_weight <= 0 or (confident and keyword_ratio(query) >= self.keyword_threshold):
+            with self._lock:
+                self._counters["dense_skipped"] += 1
+            return sparse_docs[:self.k]
+
+        dense_docs = self.dense.invoke(query)
+
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Document] = {}
+        for weight, ranked in ((dense_weight, dense_docs), (sparse_weight, sparse_docs)):
+            for rank, doc in enumerate(ranked):
+                key = _doc_key(doc)
+                docs.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + weight / (self.rrf_k + rank + 1)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [docs[key] for key in best]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retrieve(query)
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from RAG.ingest import (
+    DEFAULT_GLOBS, FileChunks, IngestStats, bump_index_generation, discover, run_pipeline,
+)
+
+MANIFEST_NAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class IndexReport:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    seconds: float = 0.0
+    ingest: IngestStats = field(default_factory=IngestStats)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} added, {self.updated} updated, {self.removed} removed, "
+            f"{self.unchanged} unchanged files ({self.chunks_added} chunks embedded, "
+            f"{self.chunks_removed} deleted) in {self.seconds:.2f}s; ingest: {self.ingest}"
+        )
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "ingest": self.ingest.to_dict()}
+
+
+def load_manifest(persist_directory: str) -> Dict[str, dict]:
+    path = Path(persist_directory) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_manifest(persist_directory: str, files: Dict[str, dict]):
+    path = Path(persist_directory) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "files": files}, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _delete_ids(vectordb, sparse_index, ids) -> int:
+    if ids:
+        vectordb.delete(ids=ids)
+        bump_index_generation()
+        if sparse_index is not None:
+            sparse_index.delete(ids)
+    return len(ids)
+
+
+def _delete_source(vectordb, sparse_index, source: str) -> int:
+    # Vectors written before the manifest existed are only findable by source.
+    if sparse_index is not None:
+        sparse_index.delete_source(source)
+    return _delete_ids(vectordb, None, vectordb.get(where={"source": source}).get("ids", []))
+
+
+def index_documents(
+    vectordb,
+    data_path: str,
+    persist_directory: str = "rag_db",
+    globs: Sequence[str] = DEFAULT_GLOBS,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    embeddings=None,
+    workers: Optional[int] = None,
+    progress=None,
+    sparse_index=None,
+) -> IndexReport:
+    """Bring ``vectordb`` in line with the files under ``data_path``.
+
+    Files whose size and mtime match the manifest are skipped without being
+    read; the rest stream through the ingestion pipeline, where files whose
+    content hash is unchanged are dropped before embedding. Vectors of files
+    that disappeared are deleted. ``sparse_index`` (a ``BM25Index``) is kept
+    in step with the vector store.
+    """
+    start = time.perf_counter()
+    report = IndexReport()
+    manifest = load_manifest(persist_directory)
+    seen = set()
+
+    def candidates():
+        for path in discover(data_path, globs):
+            source = str(path)
+            seen.add(source)
+            st = path.stat()
+            entry = manifest.get(source)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                report.unchanged += 1
+                continue
+            yield path
+
+    def on_file(fc: FileChunks):
+        entry = manifest.get(fc.source)
+        if entry and entry["sha256"] == fc.sha256:
+            entry.update(mtime=fc.mtime, size=fc.size)
+            report.unchanged += 1
+            return False
+
+        if entry:
+            report.chunks_removed += _delete_ids(vectordb, sparse_index, entry["chunk_ids"])
+            report.updated += 1
+        else:
+            report.chunks_removed += _delete_source(vectordb, sparse_index, fc.source)
+            report.added += 1
+        return True
+
+    def on_indexed(fc: FileChunks, ids):
+        report.chunks_added += len(ids)
+        manifest[fc.source] = {
+            "mtime": fc.mtime,
+            "size": fc.size,
+            "sha256": fc.sha256,
+            "chunk_ids": ids,
+        }
+
+    report.ingest = run_pipeline(
+        candidates(),
+        vectordb,
+        embeddings or vectordb.embeddings,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        workers=workers,
+        on_file=on_file,
+        on_indexed=on_indexed,
+        progress=progress,
+        sparse_index=sparse_index,
+    )
+
+    for source in [s for s in manifest if s not in seen]:
+        report.chunks_removed += _delete_ids(vectordb, sparse_index, manifest.pop(source)["chunk_ids"])
+        report.removed += 1
+
+    save_manifest(persist_directory, manifest)
+    report.seconds = time.perf_counter() - start
+    return report
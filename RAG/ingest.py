@@ -0,0 +1,313 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+import tracing
+
+DEFAULT_GLOBS = tuple(g.strip() for g in os.getenv("RAG_INGEST_GLOBS", "*.txt").split(",") if g.strip())
+# Files are hashed, read and split this many bytes (characters) at a time; larger
+# files are never held in memory whole.
+RAG_INGEST_WINDOW = int(os.getenv("RAG_INGEST_WINDOW", str(1 << 20)))
+
+# Directories never worth indexing when a recursive glob walks the tree.
+EXCLUDED_DIRS = {"rag_db", "__pycache__", "node_modules", "venv", "site-packages"}
+
+# Language-aware splitting for file types that have structure worth keeping.
+_LANGUAGES = {
+    ".md": Language.MARKDOWN,
+    ".py": Language.PYTHON,
+    ".html": Language.HTML,
+    ".htm": Language.HTML,
+    ".rst": Language.RST,
+    ".js": Language.JS,
+    ".ts": Language.TS,
+}
+
+
+@dataclass
+class FileChunks:
+    source: str
+    sha256: str
+    mtime: float
+    size: int
+    # ``None`` for files over ``RAG_INGEST_WINDOW``: their chunks are streamed
+    # from disk by ``iter_chunks`` when they are embedded.
+    texts: Optional[List[str]] = field(default_factory=list)
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    skipped_files: int = 0
+    bytes_read: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.upserted / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_read / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files ({self.bytes_read / 1e6:.1f} MB), {self.chunks} chunks, "
+            f"{self.upserted} upserted in {self.seconds:.2f}s "
+            f"({self.chunks_per_second:.0f} chunks/s, {self.mb_per_second:.2f} MB/s)"
+        )
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "chunks_per_second": self.chunks_per_second, "mb_per_second": self.mb_per_second}
+
+
+_GENERATION = 0
+_GENERATION_LOCK = threading.Lock()
+
+
+def index_generation() -> int:
+    """Counter bumped on every write to a vector store from this process."""
+    return _GENERATION
+
+
+def bump_index_generation():
+    global _GENERATION
+    with _GENERATION_LOCK:
+        _GENERATION += 1
+
+
+def chunk_id_prefix(source: str, content_hash: str) -> str:
+    path_key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    return f"{path_key}-{content_hash[:12]}-"
+
+
+def chunk_ids(source: str, content_hash: str, count: int) -> List[str]:
+    """Stable per-chunk IDs: path hash + content hash + chunk position."""
+    prefix = chunk_id_prefix(source, content_hash)
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+# ---- discover ------------------------------------------------------------
+
+def discover(data_path: str, globs: Sequence[str] = DEFAULT_GLOBS) -> Iterator[Path]:
+    """Lazily yield files under ``data_path`` matching any glob (``**`` recurses)."""
+    root = Path(data_path)
+    seen = set()
+    for pattern in globs:
+        for path in root.glob(pattern):
+            rel_parts = path.relative_to(root).parts[:-1]
+            if any(p.startswith(".") or p in EXCLUDED_DIRS for p in rel_parts):
+                continue
+            if path in seen or not path.is_file():
+                continue
+            seen.add(path)
+            yield path
+
+
+# ---- read + chunk (runs in worker processes) -----------------------------
+
+def _splitter_for(suffix: str, chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    language = _LANGUAGES.get(suffix.lower())
+    if language is not None:
+        return RecursiveCharacterTextSplitter.from_language(
+            language, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def hash_file(source: str, window: int = RAG_INGEST_WINDOW) -> str:
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(window), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_chunks(source: str, chunk_size: int = 500, chunk_overlap: int = 50,
+                window: int = RAG_INGEST_WINDOW) -> Iterator[str]:
+    """Chunks of ``source``, read and split ``window`` characters at a time.
+
+    The last chunk of each window may have been cut at the window boundary,
+    so its text is carried into the next window and split again. Chunks match
+    a whole-file split except, at most, for the overlap picked at a boundary.
+    """
+    splitter = _splitter_for(Path(source).suffix, chunk_size, chunk_overlap)
+    carry = ""
+    with open(source, encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(window)
+            if not block:
+                break
+            text = carry + block
+            chunks = splitter.split_text(text)
+            if not chunks:
+                carry = ""
+                continue
+            yield from chunks[:-1]
+            # Carry the raw text (chunks are stripped) from where the last chunk starts
+            start = text.rfind(chunks[-1])
+            carry = text[start:] if start >= 0 else chunks[-1]
+    if carry:
+        yield from splitter.split_text(carry)
+
+
+def read_and_chunk(source: str, chunk_size: int = 500, chunk_overlap: int = 50,
+                   window: int = RAG_INGEST_WINDOW) -> FileChunks:
+    """Hash and chunk a file; files over ``window`` bytes are only hashed here (see ``FileChunks.texts``)."""
+    path = Path(source)
+    st = path.stat()
+    if st.st_size > window:
+        return FileChunks(source, hash_file(source, window), st.st_mtime, st.st_size, texts=None)
+    raw = path.read_bytes()
+    splitter = _splitter_for(path.suffix, chunk_size, chunk_overlap)
+    return FileChunks(
+        source=source,
+        sha256=hashlib.sha256(raw).hexdigest(),
+        mtime=st.st_mtime,
+        size=st.st_size,
+        texts=splitter.split_text(raw.decode("utf-8", errors="replace")),
+    )
+
+
+def _read_and_chunk_args(args) -> FileChunks:
+    return read_and_chunk(*args)
+
+
+def iter_chunked_files(
+    paths: Iterable[Path],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    workers: Optional[int] = None,
+) -> Iterator[FileChunks]:
+    """Read and chunk files in a process pool, keeping only a bounded window in flight.
+
+    At most ``workers * 2`` files are in flight, none holding more than
+    ``RAG_INGEST_WINDOW`` bytes of text.
+    """
+    workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+    jobs = ((str(p), chunk_size, chunk_overlap) for p in paths)
+    if workers <= 1:
+        for job in jobs:
+            yield _read_and_chunk_args(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window: list = []
+        for job in jobs:
+            window.append(pool.submit(_read_and_chunk_args, job))
+            if len(window) >= workers * 2:
+                yield window.pop(0).result()
+        for future in window:
+            yield future.result()
+
+
+# ---- embed + upsert ------------------------------------------------------
+
+def chroma_collection(vectordb):
+    """The ``chromadb`` collection behind a langchain ``Chroma`` store.
+
+    ``Chroma`` only embeds through its own embedding function and has no
+    public accessor for its collection, so writing pre-computed vectors (and
+    reading them back for MMR) has to go through ``Chroma._collection``; it
+    has been there in every langchain-chroma release (0.1 to 0.2). Keep any
+    use of it behind this helper.
+    """
+    collection = getattr(vectordb, "_collection", None)
+    if collection is None or not hasattr(collection, "upsert"):
+        raise RuntimeError(
+            f"{type(vectordb).__name__} does not expose a chromadb collection; "
+            "this langchain-chroma version is not supported"
+        )
+    return collection
+
+
+def upsert_embeddings(vectordb, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+    """Write pre-computed vectors to the store without embedding them again."""
+    if hasattr(vectordb, "upsert_embeddings"):
+        vectordb.upsert_embeddings(ids, texts, vectors, metadatas)
+    else:  # Chroma
+        chroma_collection(vectordb).upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+    bump_index_generation()
+
+
+def run_pipeline(
+    paths: Iterable[Path],
+    vectordb,
+    embeddings,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    workers: Optional[int] = None,
+    embed_batch_size: int = 64,
+    upsert_batch_size: int = 256,
+    on_file: Optional[Callable[[FileChunks], bool]] = None,
+    on_indexed: Optional[Callable[[FileChunks, List[str]], None]] = None,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+    sparse_index=None,
+) -> IngestStats:
+    """Stream files through discover → read → chunk → embed → upsert.
+
+    Only ``workers * 2`` files (each at most ``RAG_INGEST_WINDOW`` bytes of
+    text; larger ones are chunked window by window here) and one upsert batch
+    are held in memory at a time. ``on_file`` sees each hashed file before it
+    is embedded and returns ``False`` to skip it; ``on_indexed`` gets the chunk
+    IDs written for it. Upserted chunks are also added to ``sparse_index`` (a
+    ``BM25Index``) when one is given.
+    """
+    stats = IngestStats()
+    start = time.perf_counter()
+    pending_ids: List[str] = []
+    pending_texts: List[str] = []
+    pending_meta: List[dict] = []
+
+    def flush():
+        if not pending_ids:
+            return
+        vectors: List[List[float]] = []
+        for i in range(0, len(pending_texts), embed_batch_size):
+            batch = pending_texts[i:i + embed_batch_size]
+            with tracing.span("embedding.batch", "embedding", texts=len(batch)):
+                vectors.extend(embeddings.embed_documents(batch))
+        stats.embedded += len(vectors)
+        with tracing.span("vector.upsert", "retrieval", chunks=len(pending_ids)):
+            upsert_embeddings(vectordb, list(pending_ids), list(pending_texts), vectors, list(pending_meta))
+        if sparse_index is not None:
+            sparse_index.add(list(pending_ids), list(pending_texts), list(pending_meta))
+        stats.upserted += len(pending_ids)
+        pending_ids.clear()
+        pending_texts.clear()
+        pending_meta.clear()
+        stats.seconds = time.perf_counter() - start
+        if progress:
+            progress(stats)
+
+    for fc in iter_chunked_files(paths, chunk_size, chunk_overlap, workers):
+        stats.files += 1
+        stats.bytes_read += fc.size
+        if on_file is not None and not on_file(fc):
+            stats.skipped_files += 1
+            continue
+        texts = fc.texts if fc.texts is not None else iter_chunks(fc.source, chunk_size, chunk_overlap)
+        prefix = chunk_id_prefix(fc.source, fc.sha256)
+        ids: List[str] = []
+        for i, text in enumerate(texts):
+            ids.append(f"{prefix}{i}")
+            pending_ids.append(ids[-1])
+            pending_texts.append(text)
+            pending_meta.append({"source": fc.source, "chunk": i})
+            if len(pending_ids) >= upsert_batch_size:
+                flush()
+        stats.chunks += len(ids)
+        if on_indexed is not None:
+            on_indexed(fc, ids)
+    flush()
+    stats.seconds = time.perf_counter() - start
+    return stats
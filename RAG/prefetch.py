@@ -0,0 +1,203 @@
+"""Speculative retrieval that runs while the planner and worker are still thinking.
+
+A request that needs the knowledge base used to wait for the planner LLM, then
+the worker's first ReAct step, and only then for embedding and retrieval.
+With ``RAG_PREFETCH`` on, retrieval for the raw request starts as soon as it
+is routed, and for each knowledge-base subtask as soon as the plan exists.
+The documents are parked in a per-request cache that ``ContextQA`` reads
+before asking the retriever itself.
+
+A prefetch is *used* when ``rag_tool`` picks it up (exact query, or one whose
+terms overlap by at least ``RAG_PREFETCH_MATCH``) and *wasted* when the
+request finishes without it; ``prefetch_stats()`` has the counters.
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from RAG.bm25_index import tokenize
+
+RAG_PREFETCH = os.getenv("RAG_PREFETCH", "0").lower() not in {"0", "off", "false", "no"}
+RAG_PREFETCH_WORKERS = int(os.getenv("RAG_PREFETCH_WORKERS", "2"))
+RAG_PREFETCH_MATCH = float(os.getenv("RAG_PREFETCH_MATCH", "0.6"))
+
+_SPACE_RE = re.compile(r"\s+")
+
+# Request whose prefetches ``prefetched_docs`` looks in; set by ``bind``.
+_CURRENT_REQUEST: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rag_prefetch_request", default=None)
+
+
+def _normalize(query: str) -> str:
+    return _SPACE_RE.sub(" ", query.strip().lower())
+
+
+def _overlap(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@dataclass
+class _Entry:
+    query: str
+    terms: frozenset
+    future: Future
+    submitted: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    used: bool = False
+
+
+class Prefetcher:
+    """Per-request cache of retrievals started ahead of ``rag_tool``."""
+
+    MAX_REQUESTS = 256
+    MAX_PER_REQUEST = 8
+
+    def __init__(self, enabled: bool = RAG_PREFETCH, workers: int = RAG_PREFETCH_WORKERS,
+                 min_overlap: float = RAG_PREFETCH_MATCH):
+        self.enabled = enabled
+        self.workers = max(1, workers)
+        self.min_overlap = min_overlap
+        self._requests: "OrderedDict[str, Dict[str, _Entry]]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _retrieve(self, query: str) -> list:
+        from RAG.rag_tool import get_qa_chain
+
+        return get_qa_chain().retriever.invoke(query)
+
+    def submit(self, request_id: Optional[str], queries: Iterable[str]):
+        """Start retrieval for each new query of ``request_id`` on the background executor."""
+        if not self.enabled or request_id is None:
+            return
+        with self._lock:
+            entries = self._requests.get(request_id)
+            if entries is None:
+                entries = self._requests[request_id] = {}
+                self._stats["requests"] += 1
+                while len(self._requests) > self.MAX_REQUESTS:
+                    self._discard(self._requests.popitem(last=False)[1])
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="rag-prefetch")
+            for query in queries:
+                key = _normalize(query)
+                if not key or key in entries or len(entries) >= self.MAX_PER_REQUEST:
+                    continue
+                entry = _Entry(query, frozenset(tokenize(query)), self._executor.submit(self._retrieve, query))
+                entry.future.add_done_callback(lambda _, e=entry: setattr(e, "finished", time.perf_counter()))
+                entries[key] = entry
+                self._stats["submitted"] += 1
+
+    def lookup(self, request_id: Optional[str], query: str) -> Optional[list]:
+        """Prefetched documents for ``query``, waiting for a retrieval still in flight; ``None`` on a miss."""
+        if request_id is None:
+            return None
+        with self._lock:
+            entries = self._requests.get(request_id)
+            if not entries:
+                return None
+            entry = entries.get(_normalize(query))
+            kind = "hits_exact"
+            if entry is None:
+                terms = frozenset(tokenize(query))
+                best = max(entries.values(), key=lambda e: _overlap(terms, e.terms))
+                if _overlap(terms, best.terms) >= self.min_overlap:
+                    entry, kind = best, "hits_similar"
+        if entry is None or entry.future.cancelled():
+            self._count(misses=1)
+            return None
+        start = time.perf_counter()
+        try:
+            docs = entry.future.result()
+        except Exception as e:
+            print(f"[RAG] Prefetch for {entry.query[:60]!r} failed: {e}")
+            self._count(errors=1, misses=1)
+            return None
+        waited = time.perf_counter() - start
+        with self._lock:
+            first_use = not entry.used
+            entry.used = True
+        if first_use:
+            # The part of the retrieval that overlapped with planning and reasoning.
+            elapsed = (entry.finished or time.perf_counter()) - entry.submitted
+            self._count(used=1, saved_ms=max(0.0, elapsed - waited) * 1000)
+        self._count(**{kind: 1, "waited_ms": waited * 1000})
+        return docs
+
+    def finish(self, request_id: Optional[str]):
+        """Forget the request; prefetches nobody used are counted as wasted."""
+        with self._lock:
+            entries = self._requests.pop(request_id, None)
+            if entries:
+                self._discard(entries)
+
+    def _discard(self, entries: Dict[str, _Entry]):
+        for entry in entries.values():
+            if entry.used:
+                continue
+            self._stats["cancelled" if entry.future.cancel() else "wasted"] += 1
+
+    def _count(self, **amounts):
+        with self._lock:
+            self._stats.update(amounts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_requests"] = len(self._requests)
+        for key in ("waited_ms", "saved_ms"):
+            stats[key] = round(stats.get(key, 0.0), 1)
+        done = stats.get("used", 0) + stats.get("wasted", 0) + stats.get("cancelled", 0)
+        stats["used_ratio"] = round(stats.get("used", 0) / done, 3) if done else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+_PREFETCHER: Optional[Prefetcher] = None
+_PREFETCHER_LOCK = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    global _PREFETCHER
+    if _PREFETCHER is None:
+        with _PREFETCHER_LOCK:
+            if _PREFETCHER is None:
+                _PREFETCHER = Prefetcher()
+    return _PREFETCHER
+
+
+@contextmanager
+def bind(request_id: Optional[str]) -> Iterator[None]:
+    """Make ``request_id``'s prefetches visible to ``rag_tool`` calls in this context."""
+    token = _CURRENT_REQUEST.set(request_id)
+    try:
+        yield
+    finally:
+        _CURRENT_REQUEST.reset(token)
+
+
+def prefetch(queries: List[str], request_id: Optional[str] = None):
+    """Start retrieval for ``queries`` under ``request_id`` (default: the bound request)."""
+    get_prefetcher().submit(request_id or _CURRENT_REQUEST.get(), queries)
+
+
+def prefetched_docs(query: str) -> Optional[list]:
+    """Documents prefetched for ``query`` in the bound request, or ``None``."""
+    request_id = _CURRENT_REQUEST.get()
+    return get_prefetcher().lookup(request_id, query) if request_id is not None else None
+
+
+def finish(request_id: Optional[str]):
+    if _PREFETCHER is not None:
+        _PREFETCHER.finish(request_id)
+
+
+def prefetch_stats() -> dict:
+    return get_prefetcher().stats()
@@ -1,36 +1,95 @@
-import os
-from langchain.chains import RetrievalQA
-from langchain_google_genai import ChatGoogleGenerativeAI
-from RAG.retriever import get_retriever
-from dotenv import load_dotenv
-
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not found. Add it to your .env or OS environment.")
-os.environ["GOOGLE_API_KEY"] = api_key
-
-# initializing retriver and llm once
-retriever = get_retriever("rag_db")  #persistent vector 
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temp=0.1)
-
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    retriever=retriever,
-    chain_type="stuff"
+from central import make_llm
+from RAG.prefetch import prefetched_docs
+from startup import Lazy
+import tracing
+
+QA_PROMPT = (
+    "Use the following pieces of context to answer the question at the end. "
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\nQuestion: {question}\nHelpful Answer:"
 )
 
+
+class ContextQA:
+    """Retrieve, compress the chunks into a token budget, then ask the LLM once.
+
+    Replaces the RetrievalQA "stuff" chain, which pasted whole chunks into the
+    prompt. Per-call savings are attached to the ``rag.context`` span and
+    accumulated in ``assembler.stats()``.
+    """
+
+    def __init__(self, retriever, llm, assembler):
+        self.retriever = retriever
+        self.llm = llm
+        self.assembler = assembler
+
+    def run_with_stats(self, query: str):
+        # Retrieval may already have been started while the request was planned
+        docs = prefetched_docs(query)
+        prefetched = docs is not None
+        if docs is None:
+            docs = self.retriever.invoke(query)
+        with tracing.span("rag.context", "internal") as s:
+            context, stats = self.assembler.assemble(query, docs)
+            if s is not None:
+                s.attrs.update(stats.to_dict(), prefetched=prefetched)
+        response = self.llm.invoke(QA_PROMPT.format(context=context, question=query))
+        return (response.content if hasattr(response, "content") else str(response)), stats
+
+    def run(self, query: str) -> str:
+        return self.run_with_stats(query)[0]
+
+    def invoke(self, query: str) -> str:
+        return self.run(query)
+
+
+def _build_qa_chain():
+    # Imported here: the vector store and embeddings model are only loaded by
+    # the first request that actually uses RAG.
+    from RAG.context import ContextAssembler
+    from RAG.retriever import get_retriever
+
+    retriever = get_retriever("rag_db")  #persistent vector 
+    llm = make_llm(0.1, caller="rag")
+    return ContextQA(retriever, llm, ContextAssembler())
+
+
+_QA_CHAIN = Lazy("rag.qa_chain", _build_qa_chain)
+
+
+def get_qa_chain() -> ContextQA:
+    return _QA_CHAIN.get()
+
+
+def context_stats() -> dict:
+    """Token savings of context assembly so far (empty until RAG is first used)."""
+    return _QA_CHAIN.get().assembler.stats() if _QA_CHAIN.ready else {}
+
+
 #Function wrapper
 def rag_tool(query: str) -> str:
-    return qa_chain.run(query)
+    return get_qa_chain().run(query)
+
+def _build_rag_answer_tool():
+    try:
+        from langchain_core.tools import tool
+    except Exception:
+        from langchain.tools import tool
+
+    @tool("rag_answer", return_direct=False)
+    def rag_answer_tool(query: str) -> str:
+        """Retrieve and generate an answer using RAG given a query and context."""
+        return rag_tool(query)
+
+    return rag_answer_tool
+
 
-try:
-    from langchain_core.tools import tool
-except Exception:
-    from langchain.tools import tool
+_RAG_ANSWER_TOOL = Lazy("rag.answer_tool", _build_rag_answer_tool)
 
-@tool("rag_answer", return_direct=False)
 
-def rag_answer_tool(query: str) -> str:
-    """Retrieve and generate an answer using RAG given a query and context."""
-    return rag_tool(query)
+def __getattr__(name):
+    # ``rag_answer_tool`` is built on first access so importing this module
+    # stays cheap.
+    if name == "rag_answer_tool":
+        return _RAG_ANSWER_TOOL.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,25 @@
-from langchain_chroma import Chroma
-from RAG.vector_store import build_vector_store, get_embeddings
+from pathlib import Path
+from RAG.bm25_index import BM25Index
+from RAG.dense_retriever import DenseRetriever
+from RAG.hybrid_retriever import HybridRetriever
+from RAG.vector_store import build_vector_store, get_embeddings, get_vector_store, hybrid_enabled, store_directory
 
-def get_retriever(persist_directory="rag_db"):
-    embeddings = get_embeddings()
-    vectordb = Chroma(
-        persist_directory=persist_directory,
-        embedding_function=embeddings
-    )
-    return vectordb.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": 2, "fetch_k": 10, "lambda_mult": 0.5}
+def get_retriever(persist_directory="rag_db", backend=None, hybrid=None):
+    vectordb = get_vector_store(persist_directory, backend)
+    directory = store_directory(vectordb, persist_directory)
+    hybrid = hybrid_enabled() if hybrid is None else hybrid
+    bm25_path = Path(directory) / BM25Index.FILE_NAME
+    if not hybrid or not bm25_path.exists():
+        return DenseRetriever(
+            vectorstore=vectordb, embeddings=get_embeddings(), store_directory=directory,
+            k=2, fetch_k=10, lambda_mult=0.5,
+        )
+    # The dense side returns a longer list so fusion has something to rerank.
+    dense = DenseRetriever(
+        vectorstore=vectordb, embeddings=get_embeddings(), store_directory=directory,
+        k=6, fetch_k=20, lambda_mult=0.5,
     )
+    return HybridRetriever(dense=dense, sparse=BM25Index(str(bm25_path)), k=2)
 
 if __name__ == "__main__":
     
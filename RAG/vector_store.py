@@ -1,34 +1,91 @@
-from langchain_chroma import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from RAG.load_docs import load_and_chunk_doc
+import os
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from RAG.embedding_cache import wrap_with_cache
+from RAG.indexer import index_documents
 from pathlib import Path
 from typing import Optional
+from startup import record
 
-_EMBEDDINGS: Optional[SentenceTransformerEmbeddings] = None
+_EMBEDDINGS: Optional[Embeddings] = None
+_EMBEDDINGS_LOCK = threading.Lock()
 
 
-def get_embeddings(model_name: str = "all-MiniLM-L6-v2") -> SentenceTransformerEmbeddings:
+def get_embeddings(model_name: str = "all-MiniLM-L6-v2") -> Embeddings:
+    """Return the shared embeddings model, behind the on-disk embedding cache.
+
+    Set ``RAG_EMBED_CACHE=off`` to disable the cache.
+    """
     global _EMBEDDINGS
-    if _EMBEDDINGS is None:
-        _EMBEDDINGS = SentenceTransformerEmbeddings(model_name=model_name)
-    return _EMBEDDINGS
+    if _EMBEDDINGS is not None:
+        return _EMBEDDINGS
+    with _EMBEDDINGS_LOCK:
+        if _EMBEDDINGS is None:
+            # Loading the model costs seconds; only the first RAG call pays it.
+            from langchain_community.embeddings import SentenceTransformerEmbeddings
 
+            start = time.perf_counter()
+            _EMBEDDINGS = wrap_with_cache(
+                SentenceTransformerEmbeddings(model_name=model_name),
+                model_name=model_name,
+                path=os.getenv("RAG_EMBED_CACHE", ".cache/embeddings.sqlite3"),
+                max_entries=int(os.getenv("RAG_EMBED_CACHE_MAX", "200000")),
+            )
+            record("rag.embeddings", time.perf_counter() - start)
+    return _EMBEDDINGS
 
-def build_vector_store(data_path: str, persist_directory="rag_db"):
-    persist_path = Path(persist_directory)
-    embeddings = get_embeddings()
 
-    if persist_path.exists() and any(persist_path.iterdir()):
-        return Chroma(
-            persist_directory=str(persist_path),
-            embedding_function=embeddings
+def get_vector_store(persist_directory="rag_db", backend: Optional[str] = None):
+    """Open the configured vector store backend (``RAG_BACKEND``: chroma or faiss)."""
+    backend = (backend or os.getenv("RAG_BACKEND", "chroma")).lower()
+    if backend == "faiss":
+        from RAG.faiss_store import FaissVectorStore
+        return FaissVectorStore(
+            persist_directory=str(Path(persist_directory) / "faiss"),
+            embedding=get_embeddings(),
+            index_type=os.getenv("RAG_FAISS_INDEX", "flat").lower(),
         )
+    if backend != "chroma":
+        raise ValueError(f"Unknown RAG backend {backend!r}; expected 'chroma' or 'faiss'")
+    from langchain_chroma import Chroma
+    return Chroma(
+        persist_directory=str(persist_directory),
+        embedding_function=get_embeddings()
+    )
+
+
+def hybrid_enabled() -> bool:
+    return os.getenv("RAG_HYBRID", "1").lower() not in {"0", "off", "false"}
+
+
+def store_directory(vectordb, persist_directory="rag_db") -> str:
+    # Each backend keeps its manifest and BM25 index next to its own data.
+    return str(getattr(vectordb, "persist_directory", persist_directory))
+
+
+def get_sparse_index(vectordb, persist_directory="rag_db"):
+    """Open the BM25 index kept next to ``vectordb``, backfilling it if empty."""
+    from RAG.bm25_index import BM25Index
+    sparse = BM25Index.for_store(store_directory(vectordb, persist_directory))
+    if sparse.count() == 0:
+        existing = vectordb.get()
+        if existing.get("ids"):
+            sparse.add(existing["ids"], existing["documents"], existing["metadatas"])
+    return sparse
+
 
-    docs = load_and_chunk_doc(data_path)
-    vectordb = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=str(persist_path)
+def build_vector_store(data_path: str, persist_directory="rag_db", backend: Optional[str] = None):
+    """Open the persistent store and incrementally sync it with ``data_path``."""
+    vectordb = get_vector_store(persist_directory, backend)
+    sparse = get_sparse_index(vectordb, persist_directory) if hybrid_enabled() else None
+    report = index_documents(
+        vectordb,
+        data_path,
+        persist_directory=store_directory(vectordb, persist_directory),
+        sparse_index=sparse,
     )
-    vectordb.persist()
+    if hasattr(vectordb, "persist"):
+        vectordb.persist()
+    print(f"[RAG] Index update: {report}")
     return vectordb
@@ -1,38 +1,154 @@
+import os
 import time
-from messaging import MessageBus
+from typing import Callable, Iterator, Optional
+from messaging import PRIORITY_NORMAL, MessageBus
+import tracing
+from startup import warm_up_if_enabled
+from a2a_runtime import AgentRuntime
 from agents.planner import create_planner_a2a,PlannerA2A
 from agents.worker import create_worker_a2a, WorkerA2A
 from agents.verifier import create_verifier_a2a, VerifierA2A
+from streaming import FINAL, StreamEvent
 
 class A2ANetwork:
-    def __init__(self):
-        self.message_bus = MessageBus()
+    def __init__(
+        self,
+        worker_threads: int = None,
+        verifier_threads: int = None,
+        request_timeout: float = None,
+        worker_processes: int = None,
+        verifier_processes: int = None,
+        process_initializer: Optional[Callable[[], None]] = None,
+    ):
+        worker_threads = worker_threads or int(os.getenv("A2A_WORKER_THREADS", "4"))
+        verifier_threads = verifier_threads or int(os.getenv("A2A_VERIFIER_THREADS", "2"))
+        worker_processes = (
+            worker_processes if worker_processes is not None else int(os.getenv("A2A_WORKER_PROCESSES", "0"))
+        )
+        verifier_processes = (
+            verifier_processes if verifier_processes is not None else int(os.getenv("A2A_VERIFIER_PROCESSES", "0"))
+        )
+        self.process_runtime = None
+        if worker_processes or verifier_processes:
+            # Imported here so the single-process setup never loads multiprocessing
+            from process_bus import ProcessMessageBus, ProcessRuntime
+
+            self.message_bus = ProcessMessageBus()
+            self.process_runtime = ProcessRuntime(self.message_bus, initializer=process_initializer)
+        else:
+            self.message_bus = MessageBus()
         self.planner: PlannerA2A = create_planner_a2a(self.message_bus)
-        self.worker: WorkerA2A = create_worker_a2a(self.message_bus)
-        self.verifier: VerifierA2A = create_verifier_a2a(self.message_bus)
-
-    def run(self, user_input: str) -> str:
-        # Planner gets user input and sends subtasks to Worker
-        self.planner.process_user_request(user_input)
-
-        # Simple cooperative pump loop
-        idle_rounds = 0
-        max_idle_rounds = 10
-        end_time = time.time() + 10.0  # hard cap to avoid runaway loops
-        while time.time() < end_time and idle_rounds < max_idle_rounds:
-            progressed = False
-            progressed |= self.worker.process_once(timeout=0.1)
-            progressed |= self.verifier.process_once(timeout=0.1)
-            if progressed:
-                idle_rounds = 0
-            else:
-                idle_rounds += 1
-
-        # Planner collects final results
-        final = self.planner.collect_results(max_wait_seconds=1.0)
-        return final
+        self.request_timeout = (
+            request_timeout if request_timeout is not None
+            else float(os.getenv("A2A_REQUEST_TIMEOUT", "300"))
+        )
+
+        # Each role gets its own threads blocked on the bus; no polling loop.
+        # Roles with processes run their threads in child processes instead.
+        self.runtime = AgentRuntime(self.message_bus)
+        self.runtime.add_role("Planner", self.planner.handle_message, threads=1)
+        self.worker: Optional[WorkerA2A] = None
+        self.verifier: Optional[VerifierA2A] = None
+        if worker_processes:
+            self.process_runtime.add_role(
+                "Worker", "agents.worker:create_worker_a2a", processes=worker_processes, threads=worker_threads,
+            )
+        else:
+            self.worker = create_worker_a2a(self.message_bus)
+            self.runtime.add_role("Worker", self.worker.handle_message, threads=worker_threads)
+        if verifier_processes:
+            # A request's results must reach one process for the verifier to batch them.
+            self.process_runtime.add_role(
+                "Verifier", "agents.verifier:create_verifier_a2a",
+                processes=verifier_processes, threads=verifier_threads, shard_by_request=True,
+            )
+        else:
+            self.verifier = create_verifier_a2a(self.message_bus)
+            self.runtime.add_role("Verifier", self.verifier.handle_message, threads=verifier_threads)
+        if self.process_runtime is not None:
+            self.process_runtime.start()
+        self.runtime.start()
+
+    def run(self, user_input: str, timeout: float = None, priority: int = PRIORITY_NORMAL,
+            request_id: Optional[str] = None) -> str:
+        """Answer ``user_input`` through the agent network.
+
+        Pass a fresh ``request_id`` (e.g. ``uuid.uuid4().hex``) to be able to
+        ``cancel`` the request from another thread while this call blocks.
+        """
+        # The request ID doubles as the trace ID for every span of this request
+        request_id = self.message_bus.open_request(request_id)
+        with tracing.span("a2a.run", "request", trace_id=request_id):
+            return self._run(user_input, request_id, timeout, priority)
+
+    def _run(self, user_input: str, request_id: str, timeout: float = None, priority: int = PRIORITY_NORMAL) -> str:
+        timeout = self.request_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+        # Planner gets user input and sends subtasks to Worker; work still queued
+        # or running at the deadline is dropped instead of burning LLM quota
+        self.planner.process_user_request(user_input, request_id, deadline=deadline, priority=priority)
+        try:
+            # Completion is signalled by the planner once every expected result arrives
+            if not self.planner.wait_for_results(request_id, max(0.0, deadline - time.time())):
+                received, expected = self.planner.progress(request_id)
+                print(f"[A2A] Request {request_id} timed out after {timeout:.0f}s with {received}/{expected} results")
+            return self.planner.combined_result(request_id)
+        finally:
+            # Late messages for this request are dropped instead of leaking into the next one
+            self.planner.finish_request(request_id)
+
+    def run_stream(self, user_input: str, timeout: float = None, priority: int = PRIORITY_NORMAL,
+                   request_id: Optional[str] = None) -> Iterator[StreamEvent]:
+        """Streaming ``run``: yields the plan, worker/verifier tokens and each verified
+        subtask as they happen, then a ``final`` event with the combined answer.
+
+        Every event carries the ``request_id`` that ``cancel`` takes; closing the
+        generator early cancels the request too. Wrap it in ``streaming.to_async``
+        for an async iterator.
+        """
+        request_id = self.message_bus.open_request(request_id)
+        listener = f"Stream:{request_id}"
+        self.message_bus.register_agent(listener)
+        start = time.time()
+        try:
+            timeout = self.request_timeout if timeout is None else timeout
+            deadline = start + timeout
+            # Planning runs here, on the caller's thread, like in ``run``
+            self.planner.process_user_request(user_input, request_id, stream_to=listener,
+                                              deadline=deadline, priority=priority)
+            while True:
+                msg = self.message_bus.receive(listener, timeout=max(0.0, deadline - time.time()))
+                if msg is None:
+                    received, expected = self.planner.progress(request_id)
+                    print(f"[A2A] Request {request_id} timed out after {timeout:.0f}s with {received}/{expected} results")
+                    yield StreamEvent(FINAL, self.planner.combined_result(request_id), request_id=request_id)
+                    return
+                yield msg.payload
+                if msg.payload.kind == FINAL:
+                    return
+        finally:
+            self.planner.finish_request(request_id)
+            self.message_bus.unregister_agent(listener)
+            tracing.record_span("a2a.run_stream", "request", start, time.time(), trace_id=request_id)
+
+    def cancel(self, request_id: str):
+        """Cancel a running request: its queued messages are purged, agents abort
+        their in-flight work and ``run`` returns the results gathered so far."""
+        self.planner.cancel_request(request_id)
+
+    def shutdown(self, timeout: float = 5.0):
+        if self.process_runtime is not None:
+            self.process_runtime.shutdown(timeout)
+        self.runtime.shutdown(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
 
 if __name__ == "__main__":
+    warm_up_if_enabled()
     a2a_network = A2ANetwork()
     try:
         while True:
@@ -43,3 +159,5 @@ if __name__ == "__main__":
             print("\nFinal Answer:\n", result or "<no result>", "\n")
     except KeyboardInterrupt:
         pass
+    finally:
+        a2a_network.shutdown()
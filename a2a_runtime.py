@@ -0,0 +1,138 @@
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import tracing
+from messaging import PRIORITY_LOW, Message, MessageBus, MessageType
+
+
+class RequestCancelled(Exception):
+    """The request a handler is working on was cancelled or ran past its deadline."""
+
+
+class AbortOnCancel(BaseCallbackHandler):
+    """Raises ``RequestCancelled`` at the next LLM call, token or tool call of a dead request."""
+
+    raise_error = True
+
+    def __init__(self, message_bus: MessageBus, request_id: Optional[str], deadline: Optional[float] = None):
+        self.message_bus = message_bus
+        self.request_id = request_id
+        self.deadline = deadline
+
+    def check(self):
+        if self.message_bus.is_closed(self.request_id):
+            raise RequestCancelled("request was cancelled")
+        if self.deadline is not None and time.time() > self.deadline:
+            raise RequestCancelled("request is past its deadline")
+
+    def on_llm_start(self, *args, **kwargs):
+        self.check()
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.check()
+
+    def on_llm_new_token(self, *args, **kwargs):
+        self.check()
+
+    def on_tool_start(self, *args, **kwargs):
+        self.check()
+
+
+def abort_callbacks(message_bus: MessageBus, msg: Message, callbacks: Optional[list] = None) -> list:
+    """``callbacks`` plus an ``AbortOnCancel`` for the request ``msg`` belongs to."""
+    return (callbacks or []) + [AbortOnCancel(message_bus, msg.request_id, msg.deadline)]
+
+
+class AgentRuntime:
+    """Runs each agent role on its own pool of threads blocked on ``MessageBus.receive``.
+
+    Handlers are called with every message delivered to the role. Nothing polls:
+    threads sleep inside ``receive`` until a message arrives, and ``shutdown``
+    wakes them with one ``SHUTDOWN`` message per thread.
+    """
+
+    def __init__(self, message_bus: MessageBus):
+        self.message_bus = message_bus
+        self._roles: Dict[str, tuple[Callable[[Message], None], int]] = {}
+        self._threads: Dict[str, List[threading.Thread]] = {}
+        self._running = False
+
+    def add_role(self, agent_name: str, handler: Callable[[Message], None], threads: int = 1):
+        if self._running:
+            raise RuntimeError("Cannot add roles to a running runtime")
+        self.message_bus.register_agent(agent_name)
+        self._roles[agent_name] = (handler, max(1, threads))
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for agent_name, (handler, count) in self._roles.items():
+            self._threads[agent_name] = []
+            for i in range(count):
+                t = threading.Thread(
+                    target=self._serve,
+                    args=(agent_name, handler),
+                    name=f"{agent_name}-{i}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads[agent_name].append(t)
+
+    def _serve(self, agent_name: str, handler: Callable[[Message], None]):
+        while True:
+            msg = self.message_bus.receive(agent_name)
+            if msg is None:
+                continue
+            if msg.message_type == MessageType.SHUTDOWN:
+                return
+            try:
+                if tracing.enabled():
+                    self._traced(agent_name, handler, msg)
+                else:
+                    handler(msg)
+            except RequestCancelled as e:
+                print(f"[A2A] {agent_name} aborted {msg.request_id}: {e}")
+            except Exception:
+                print(f"[A2A] {agent_name} handler error:\n{traceback.format_exc()}")
+
+    @staticmethod
+    def _traced(agent_name: str, handler: Callable[[Message], None], msg: Message):
+        trace_id = msg.request_id or tracing.new_trace_id()
+        parent_id = (msg.metadata or {}).get("trace_parent")
+        # Enqueue -> dequeue delay, from the timestamp set when the message was built
+        tracing.record_span(
+            f"bus.wait.{agent_name}", "bus", msg.timestamp, time.time(),
+            trace_id=trace_id, parent_id=parent_id, message_type=msg.message_type.value,
+        )
+        with tracing.span(f"{agent_name}.handle", "agent", trace_id=trace_id, parent_id=parent_id,
+                          message_type=msg.message_type.value):
+            handler(msg)
+
+    def join(self):
+        """Block until every handler thread has exited (after a SHUTDOWN each)."""
+        for threads in list(self._threads.values()):
+            for t in threads:
+                t.join()
+
+    def shutdown(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        self._running = False
+        for agent_name, threads in self._threads.items():
+            for _ in threads:
+                self.message_bus.send(Message(
+                    sender="Runtime",
+                    recipient=agent_name,
+                    message_type=MessageType.SHUTDOWN,
+                    payload=None,
+                    priority=PRIORITY_LOW,  # after the work already queued
+                ))
+        for threads in self._threads.values():
+            for t in threads:
+                t.join(timeout)
+        self._threads = {}
@@ -0,0 +1,85 @@
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+
+def _tool_signature(tools) -> Tuple:
+    return tuple((t.name, t.description) for t in tools)
+
+
+class AgentFactory:
+    """Builds each role's ReAct executor once and hands out the cached instance.
+
+    Executors are cached per role and tool set. They hold no per-request state
+    (the scratchpad lives inside each ``invoke`` call), so one instance serves
+    concurrent tasks. Tool lists are only re-read from their sources when
+    ``refresh_tools`` is called.
+    """
+
+    def __init__(self):
+        self._roles: Dict[str, Tuple[Callable[..., "AgentExecutor"], Optional[Callable[[], List]]]] = {}
+        self._tools: Dict[str, List] = {}
+        self._executors: Dict[Tuple, "AgentExecutor"] = {}
+        self._lock = threading.RLock()
+        self.builds = 0
+
+    def register(self, role: str, build: Callable[..., "AgentExecutor"], tools: Optional[Callable[[], List]] = None):
+        """``build(tools)`` creates the executor; ``tools()`` lists its tools (omit for fixed tool sets)."""
+        with self._lock:
+            self._roles[role] = (build, tools)
+            self._tools.pop(role, None)
+
+    def get(self, role: str) -> "AgentExecutor":
+        with self._lock:
+            build, tools_fn = self._roles[role]
+            if tools_fn is None:
+                key, tools = (role,), None
+            else:
+                if role not in self._tools:
+                    self._tools[role] = list(tools_fn())
+                tools = self._tools[role]
+                key = (role, _tool_signature(tools))
+            executor = self._executors.get(key)
+            if executor is None:
+                executor = self._executors[key] = build(tools) if tools is not None else build()
+                self.builds += 1
+            return executor
+
+    def refresh_tools(self):
+        """Re-list MCP tools and drop executors whose tool set changed."""
+        from MCP.mcp_tools_adapter import load_mcp_tools
+
+        load_mcp_tools(refresh=True)
+        with self._lock:
+            self._tools.clear()
+            current = set()
+            for role, (_, tools_fn) in self._roles.items():
+                if tools_fn is not None:
+                    self._tools[role] = list(tools_fn())
+                    current.add((role, _tool_signature(self._tools[role])))
+            for key in list(self._executors):
+                if len(key) > 1 and key not in current:
+                    del self._executors[key]
+
+
+_FACTORY: Optional[AgentFactory] = None
+_FACTORY_LOCK = threading.Lock()
+
+
+def get_agent_factory() -> AgentFactory:
+    """Process-wide factory with the planner, worker and verifier roles registered."""
+    global _FACTORY
+    with _FACTORY_LOCK:
+        if _FACTORY is None:
+            from agents.planner import create_planner
+            from agents.verifier import create_verifier
+            from agents.worker import create_worker, worker_tools
+
+            factory = AgentFactory()
+            factory.register("planner", create_planner)
+            factory.register("worker", create_worker, tools=worker_tools)
+            factory.register("verifier", create_verifier)
+            _FACTORY = factory
+        return _FACTORY
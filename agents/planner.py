@@ -1,14 +1,18 @@
-from langchain.tools import Tool
 from central import make_llm, make_react_agent
 import json
+import threading
 import time
-from messaging import MessageBus, Message, MessageType
+from dataclasses import dataclass, field
+from messaging import PRIORITY_NORMAL, MessageBus, Message, MessageType
+from RAG import prefetch
+from router import FILE, PLAN, get_router, mentions_knowledge_base
+from streaming import FINAL, PLAN as PLAN_EVENT, StreamEvent, bus_sink
 
 PLANNER_SYSTEM_PROMPT = """
 You are the Planner Agent. Your job is to break the user's objective into a minimal ordered list of atomic subtasks.
 
 IMPORTANT: You must respond with ONLY valid JSON in this exact format:
-{"subtasks": ["step 1", "step 2", "step 3"]}
+{{"subtasks": ["step 1", "step 2", "step 3"], "depends_on": {{"3": [1, 2]}}}}
 
 Rules:
 1. Output ONLY the JSON, no other text.
@@ -17,6 +21,7 @@ Rules:
 4. Include "RAG" in a subtask ONLY when information is needed from the project knowledge base (docs, code, repo-specific context). Do NOT include RAG for general knowledge questions.
 5. Include "MCP" in a subtask ONLY for repository/file operations (e.g., search files, read_file, save_file).
 6. If the user request is a general conceptual question that can be answered directly, return a single subtask with the original question (no RAG, no MCP).
+7. "depends_on" is optional. It maps a subtask number (1-based) to the subtask numbers whose output it needs. Omit it or leave it empty when subtasks are independent so they can run in parallel.
 
 Always follow the ReAct format:
 Thought: reasoning about how to break down the task
@@ -26,21 +31,32 @@ Observation: the planning result
 Final Answer: the final JSON plan
 """
 
+@dataclass
+class _PendingRequest:
+    expected_results: int
+    results: dict = field(default_factory=dict)
+    done: threading.Event = field(default_factory=threading.Event)
+    stream_to: str = None  # listener queue of a streaming caller
+    cancelled: bool = False
+
+
 class PlannerA2A:
     def __init__(self, message_bus: MessageBus):
         self.message_bus = message_bus
         self.message_bus.register_agent("Planner")
-        # Initialize result tracking
-        self.expected_results: int = 0
-        self.results: list[str] = []
+        # Result tracking, keyed by request_id so concurrent requests stay apart
+        self._pending: dict[str, _PendingRequest] = {}
+        self._lock = threading.Lock()
+        self._llm = make_llm(temp=0, caller="planner")
 
     def _plan_task(self, input_text: str) -> str:
-        llm = make_llm(temp=0)
+        llm = self._llm
         prompt = f"""
         Break down this objective into subtasks: {input_text}
         
         Return ONLY valid JSON in this format:
-        {{"subtasks": ["step 1", "step 2", "step 3"]}}
+        {{"subtasks": ["step 1", "step 2", "step 3"], "depends_on": {{"3": [1, 2]}}}}
+        "depends_on" is optional: list only the 1-based subtask numbers whose output a subtask needs.
         """
         response = llm.invoke(prompt)
         output = response.content if hasattr(response, "content") else response
@@ -69,51 +85,159 @@ class PlannerA2A:
         except Exception:
             return [user_request]
 
-    def process_user_request(self, user_request: str):
-        subtasks = self.create_subtasks(user_request)
-        # Reset tracking counters for this user request
-        self.expected_results = len(subtasks)
-        self.results = []
+    def process_user_request(self, user_request: str, request_id: str = None, stream_to: str = None,
+                             deadline: float = None, priority: int = PRIORITY_NORMAL) -> str:
+        """Plan the request, dispatch its subtasks and return its request_id.
+
+        With ``stream_to`` (a registered bus queue) the plan, tokens, verified
+        subtasks and the final answer are sent there as STREAM_CHUNK messages.
+        ``deadline`` (absolute ``time.time()``) and ``priority`` travel with every
+        task message; agents drop or abort work on the request once it passes.
+        """
+        request_id = self.message_bus.open_request(request_id)
+        decision = get_router().route(user_request)
+        if decision.route != FILE:
+            # Speculative retrieval (RAG_PREFETCH) overlaps with planning and the worker's first step
+            prefetch.prefetch([user_request], request_id)
+        if decision.route == PLAN:
+            subtasks, route_meta = self.create_subtasks(user_request), {}
+            prefetch.prefetch([task for task in subtasks if mentions_knowledge_base(task)], request_id)
+        else:
+            # Single step: no planner call; direct routes tell the worker which tool to use
+            subtasks, route_meta = [user_request], decision.metadata()
+        pending = _PendingRequest(expected_results=len(subtasks), stream_to=stream_to)
+        with self._lock:
+            self._pending[request_id] = pending
+        if stream_to:
+            bus_sink(self.message_bus, "Planner", stream_to, request_id)(StreamEvent(
+                PLAN_EVENT, "\n".join(subtasks), "planner", metadata={"subtasks": subtasks, "route": decision.route},
+            ))
+        if not subtasks:
+            self._complete(request_id, pending)
         for i, task in enumerate(subtasks, 1):
             msg = Message(
                 sender="Planner",
                 recipient="Worker",
                 message_type=MessageType.TASK_REQUEST,
                 payload=task,
-                metadata={"task_id": f"task_{i}", "total": len(subtasks), "original_request": user_request},
+                metadata={
+                    "task_id": f"task_{i}", "total": len(subtasks), "original_request": user_request,
+                    "stream_to": stream_to, **route_meta,
+                },
+                request_id=request_id,
+                priority=priority,
+                deadline=deadline,
             )
             self.message_bus.send(msg)
+        return request_id
+
+    def handle_message(self, msg: Message):
+        if msg.message_type != MessageType.TASK_RESULT:
+            return
+        with self._lock:
+            pending = self._pending.get(msg.request_id)
+            if pending is None:
+                return  # unknown or already finished request
+            task_id = (msg.metadata or {}).get("from_task_id") or f"result_{len(pending.results) + 1}"
+            pending.results[task_id] = str(msg.payload)
+            finished = len(pending.results) >= pending.expected_results and not pending.done.is_set()
+        if finished:
+            self._complete(msg.request_id, pending)
+
+    def _complete(self, request_id: str, pending: _PendingRequest):
+        if pending.stream_to:
+            # Sent before ``done`` is set, so a streaming caller gets it before cleanup
+            bus_sink(self.message_bus, "Planner", pending.stream_to, request_id)(
+                StreamEvent(FINAL, self.combined_result(request_id), "planner")
+            )
+        pending.done.set()
+
+    def wait_for_results(self, request_id: str, timeout: float = None) -> bool:
+        """Block until every expected result has arrived; False on timeout."""
+        pending = self._pending.get(request_id)
+        return pending is None or pending.done.wait(timeout)
+
+    def progress(self, request_id: str) -> tuple[int, int]:
+        """Return (received, expected) result counts for a request."""
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return 0, 0
+        return len(pending.results), pending.expected_results
 
-    def collect_results(self, max_wait_seconds: float = 1.0) -> str:
-        """Poll the message bus for TASK_RESULT messages until all expected
-        results are gathered or the timeout expires, then combine them.
+    def combined_result(self, request_id: str) -> str:
+        with self._lock:
+            pending = self._pending.get(request_id)
+            if pending is None:
+                return ""
+            ordered = [pending.results[k] for k in sorted(pending.results, key=_task_order)]
+
+        if not ordered:
+            return ""
+
+        if len(ordered) == 1:
+            return ordered[0]
+
+        return "\n\n".join(ordered)
+
+    def cancel_request(self, request_id: str):
+        """Stop a request early: queued work is purged, agents abort in-flight work and
+        waiters are released with whatever results already arrived."""
+        purged = self.message_bus.cancel_request(request_id)
+        with self._lock:
+            pending = self._pending.get(request_id)
+            if pending is not None:
+                pending.cancelled = True
+        if pending is not None and not pending.done.is_set():
+            print(f"[A2A] Request {request_id} cancelled ({purged} queued messages purged)")
+            if pending.stream_to:
+                event = StreamEvent(FINAL, self.combined_result(request_id), "planner", request_id=request_id,
+                                    metadata={"cancelled": True})
+                try:
+                    # No request_id on the message: the request is closed, and this must still get through
+                    self.message_bus.send(Message("Planner", pending.stream_to, MessageType.STREAM_CHUNK, event))
+                except ValueError:
+                    pass  # the streaming caller is already gone
+            pending.done.set()
+
+    def finish_request(self, request_id: str):
+        """Drop the request's state; its queued messages are purged and late ones discarded by the bus."""
+        self.message_bus.cancel_request(request_id)
+        prefetch.finish(request_id)
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def collect_results(self, request_id: str, max_wait_seconds: float = 1.0) -> str:
+        """Receive TASK_RESULT messages directly from the bus until all expected
+        results are gathered or the timeout expires, then combine them. Use this
+        only when no runtime thread is serving the Planner queue.
         """
+        pending = self._pending.get(request_id)
         deadline = time.time() + max_wait_seconds
-        while time.time() < deadline and len(self.results) < self.expected_results:
-            msg = self.message_bus.receive("Planner", timeout=0.05)
-            if not msg:
-                continue
-            if msg.message_type == MessageType.TASK_RESULT:
-                self.results.append(str(msg.payload))
-
-        if not self.results:
-            return ""
+        while pending is not None and not pending.done.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            msg = self.message_bus.receive("Planner", timeout=remaining)
+            if msg:
+                self.handle_message(msg)
+        return self.combined_result(request_id)
 
-        if len(self.results) == 1:
-            return self.results[0]
 
-        return "\n\n".join(self.results)
+def _task_order(task_id: str):
+    suffix = task_id.rsplit("_", 1)[-1]
+    return (0, int(suffix), task_id) if suffix.isdigit() else (1, 0, task_id)
 
 
 def create_planner():
     """Orchestrator mode: return a LangChain ReAct planner agent (backward compatible)."""
     def plan_task(input_text: str) -> str:
-        llm = make_llm(temp=0)
+        llm = make_llm(temp=0, caller="planner")
         prompt = f"""
         Break down this objective into subtasks: {input_text}
         
         Return ONLY valid JSON in this format:
-        {{"subtasks": ["step 1", "step 2", "step 3"]}}
+        {{"subtasks": ["step 1", "step 2", "step 3"], "depends_on": {{"3": [1, 2]}}}}
+        "depends_on" is optional: list only the 1-based subtask numbers whose output a subtask needs.
         """
         response = llm.invoke(prompt)
         output = response.content if hasattr(response, "content") else response
@@ -133,6 +257,8 @@ def create_planner():
                 ]
             })
 
+    from langchain_core.tools import Tool
+
     planning_tool = Tool(
         name="plan_task",
         func=plan_task,
@@ -141,7 +267,7 @@ def create_planner():
     tools = [planning_tool]
     return make_react_agent(
         tools=tools,
-        llm=make_llm(temp=0),
+        llm=make_llm(temp=0, caller="planner"),
         system_prompt=PLANNER_SYSTEM_PROMPT,
     )
 
@@ -1,7 +1,34 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import tracing
+from a2a_runtime import AbortOnCancel, RequestCancelled
 from central import make_llm, make_react_agent
 from central import llm_summarize_tool  
-from messaging import MessageBus, Message, MessageType
-import time
+from messaging import PRIORITY_NORMAL, MessageBus, Message, MessageType
+from streaming import SUBTASK, StreamEvent, bus_sink, stream_callbacks
+
+# Results of one request arriving within this many seconds of each other are
+# verified in a single LLM call; 0 verifies every result on its own.
+A2A_VERIFY_WINDOW = float(os.getenv("A2A_VERIFY_WINDOW", "0.25"))
+A2A_VERIFY_BATCH_MAX = int(os.getenv("A2A_VERIFY_BATCH_MAX", "8"))
+A2A_VERIFY_SKIP_TOOLS = os.getenv("A2A_VERIFY_SKIP_TOOLS", "0").lower() not in {"0", "off", "false", "no"}
+
+VERIFY_PROMPT = "Clean up and verify this result for correctness and clarity. If unclear, improve it.\n\n{text}"
+BATCH_VERIFY_PROMPT = (
+    "Clean up and verify each of the following results for correctness and clarity. If one is unclear, improve it.\n"
+    "Return every result in the same order, each under its header line exactly as given "
+    "(e.g. \"### [Result 1]\"), and nothing else.\n\n{sections}"
+)
+_SECTION_RE = re.compile(r"^#{1,6}\s*\[Result (\d+)\][ \t]*$", re.M)
+# One path per line, as file_search prints them.
+_PATH_LINE_RE = re.compile(r"^(?:[A-Za-z]:)?[\w.~/\\-]+$")
+_EXTENSION_RE = re.compile(r"[^/\\.]\.[A-Za-z0-9]{1,8}$")
 
 VERIFIER_SYSTEM_PROMPT = """
 You are the Verifier Agent.
@@ -17,35 +44,241 @@ Observation: tool output
 Final Answer: the verified and corrected result
 """
 
+def _is_path(line: str) -> bool:
+    if not _PATH_LINE_RE.match(line):
+        return False
+    # "Paris.", "3.14" or "e.g." have no directory part and are not files on disk
+    has_dir = "/" in line or "\\" in line
+    return (has_dir and bool(_EXTENSION_RE.search(line))) or os.path.isfile(line)
+
+
+def is_deterministic(text: str) -> bool:
+    """True for a bare file listing, which verification cannot improve.
+
+    Only a fallback for ``A2A_VERIFY_SKIP_TOOLS``: results of direct tool
+    dispatch are already marked ``verify=False`` by the worker.
+    """
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    if lines and lines[-1].startswith("... "):  # file_search's "... N more of T matches" trailer
+        lines.pop()
+    return bool(lines) and all(_is_path(line) for line in lines)
+
+
+def batch_prompt(texts: List[str]) -> str:
+    return BATCH_VERIFY_PROMPT.format(
+        sections="\n\n".join(f"### [Result {i}]\n{text}" for i, text in enumerate(texts, 1))
+    )
+
+
+def split_batch(output: str, count: int) -> Dict[int, str]:
+    """Section text per 0-based position; sections missing from ``output`` are left out."""
+    marks = list(_SECTION_RE.finditer(output))
+    sections = {}
+    for i, mark in enumerate(marks):
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(output)
+        position = int(mark.group(1)) - 1
+        body = output[mark.end():end].strip()
+        if 0 <= position < count and body:
+            sections.setdefault(position, body)
+    return sections
+
+
+@dataclass
+class _Item:
+    task_id: Optional[str]
+    text: str
+    stream_to: Optional[str]
+    priority: int = PRIORITY_NORMAL
+    deadline: Optional[float] = None
+    arrived: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Batch:
+    total: Optional[int] = None
+    seen: int = 0  # responses of the request so far, skipped ones included
+    items: List[_Item] = field(default_factory=list)
+    timer: Optional[threading.Timer] = None
+
+
 class VerifierA2A:
-    def __init__(self, message_bus: MessageBus):
+    """Verifies worker results, batching those of the same request into one LLM call.
+
+    A batch is verified once every ``total`` result of the request (from the
+    planner's task metadata) has arrived, ``batch_max`` results are waiting, or
+    ``window`` seconds after its first result, whichever comes first.
+    """
+
+    # Requests whose results never all arrive are forgotten oldest first.
+    MAX_PENDING_REQUESTS = 1024
+
+    def __init__(self, message_bus: MessageBus, window: float = A2A_VERIFY_WINDOW,
+                 batch_max: int = A2A_VERIFY_BATCH_MAX, skip_tools: bool = A2A_VERIFY_SKIP_TOOLS):
         self.message_bus = message_bus
         self.message_bus.register_agent("Verifier")
+        self._llm = make_llm(0, caller="verifier")
+        self.window = window
+        self.batch_max = max(1, batch_max)
+        self.skip_tools = skip_tools
+        self._batches: "OrderedDict[str, _Batch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _call(self, prompt: str, callbacks=None) -> str:
+        resp = self._llm.invoke(prompt, config={"callbacks": callbacks} if callbacks else None)
+        return resp.content if hasattr(resp, "content") else str(resp)
 
-    def _verify(self, text: str) -> str:
-        llm = make_llm(0)
+    def _verify(self, text: str, callbacks=None) -> str:
+        start = time.perf_counter()
         try:
-            resp = llm.invoke(f"Clean up and verify this result for correctness and clarity. If unclear, improve it.\n\n{text}")
-            return resp.content if hasattr(resp, "content") else str(resp)
+            return self._call(VERIFY_PROMPT.format(text=text), callbacks)
+        except RequestCancelled:
+            raise
         except Exception as e:
             return f"Verification error: {e}\n\n{text}"
+        finally:
+            self._count(llm_calls=1, verified=1, verify_ms=(time.perf_counter() - start) * 1000)
+
+    def _verify_batch(self, texts: List[str], callbacks=None) -> List[str]:
+        """One LLM call for all ``texts``; results the output does not cover are verified singly."""
+        start = time.perf_counter()
+        try:
+            sections = split_batch(self._call(batch_prompt(texts), callbacks), len(texts))
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            print(f"[A2A] Batched verification of {len(texts)} results failed: {e}")
+            sections = {}
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        covered = len(sections)
+        # Every covered result beyond the first would otherwise have cost a call of its own.
+        self._count(llm_calls=1, batched_calls=1, batched_items=len(texts), verified=covered,
+                    fallbacks=len(texts) - covered, verify_ms=elapsed_ms,
+                    saved_calls=max(0, covered - 1), saved_ms=max(0, covered - 1) * elapsed_ms)
+        return [sections[i] if i in sections else self._verify(text, callbacks) for i, text in enumerate(texts)]
+
+    def _count(self, **amounts):
+        with self._lock:
+            self._stats.update(amounts)
+
+    def stats(self) -> dict:
+        """Counters since start-up; ``saved_ms`` estimates the verifier latency batching avoided."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_requests"] = len(self._batches)
+        for key in ("verify_ms", "saved_ms", "wait_ms"):
+            stats[key] = round(stats.get(key, 0.0), 1)
+        calls = stats.get("llm_calls", 0)
+        stats["results_per_call"] = round(stats.get("verified", 0) / calls, 2) if calls else 0.0
+        return stats
 
     def process_once(self, timeout: float = 0.2) -> bool:
         msg = self.message_bus.receive("Verifier", timeout=timeout)
         if not msg:
             return False
-        if msg.message_type == MessageType.TASK_RESPONSE:
-            verified = self._verify(str(msg.payload))
-            out = Message(
-                sender="Verifier",
-                recipient="Planner",
-                message_type=MessageType.TASK_RESULT,
-                payload=verified,
-                metadata={"from_task_id": (msg.metadata or {}).get("task_id")},
-            )
-            self.message_bus.send(out)
+        self.handle_message(msg)
         return True
 
+    def handle_message(self, msg: Message):
+        if msg.message_type == MessageType.TASK_RESPONSE:
+            meta = msg.metadata or {}
+            item = _Item(meta.get("task_id"), str(msg.payload), meta.get("stream_to"), msg.priority, msg.deadline)
+            self._count(responses=1)
+            skip = not meta.get("verify", True) or (self.skip_tools and is_deterministic(item.text))
+            if skip:
+                self._count(skipped=1)
+                self._deliver(msg.request_id, item, item.text)
+            ready = self._add(msg.request_id, meta.get("total"), None if skip else item)
+            if ready:
+                self._flush(msg.request_id, ready)
+
+    def _add(self, request_id: Optional[str], total: Optional[int], item: Optional[_Item]) -> List[_Item]:
+        """Record a response; returns the items to verify now (empty while the batch waits)."""
+        if self.window <= 0 or request_id is None:
+            return [item] if item else []
+        with self._lock:
+            batch = self._batches.get(request_id)
+            if batch is None:
+                batch = self._batches[request_id] = _Batch()
+                while len(self._batches) > self.MAX_PENDING_REQUESTS:
+                    _, stale = self._batches.popitem(last=False)
+                    if stale.timer:
+                        stale.timer.cancel()
+            batch.seen += 1
+            batch.total = total or batch.total
+            if item is not None:
+                batch.items.append(item)
+            complete = batch.total is not None and batch.seen >= batch.total
+            if complete or len(batch.items) >= self.batch_max:
+                if batch.timer:
+                    batch.timer.cancel()
+                    batch.timer = None
+                if complete:
+                    del self._batches[request_id]
+                items, batch.items = batch.items, []
+                return items
+            if batch.items and batch.timer is None:
+                batch.timer = threading.Timer(self.window, self._on_window, args=(request_id,))
+                batch.timer.daemon = True
+                batch.timer.start()
+            return []
+
+    def _on_window(self, request_id: str):
+        with self._lock:
+            batch = self._batches.get(request_id)
+            if batch is None or batch.timer is None:
+                return  # flushed by a later response in the meantime
+            batch.timer = None
+            items, batch.items = batch.items, []
+            if self.message_bus.is_closed(request_id):
+                del self._batches[request_id]
+                return
+        if items:
+            with tracing.span("Verifier.window", "agent", trace_id=request_id, results=len(items)):
+                try:
+                    self._flush(request_id, items)
+                except RequestCancelled as e:
+                    print(f"[A2A] Verifier aborted {request_id}: {e}")
+
+    def _flush(self, request_id: Optional[str], items: List[_Item]):
+        now = time.monotonic()
+        self._count(wait_ms=sum(now - item.arrived for item in items) * 1000)
+        if self.message_bus.is_closed(request_id):
+            self._count(dropped_cancelled=len(items))
+            return
+        stream_to = items[0].stream_to
+        sink = bus_sink(self.message_bus, "Verifier", stream_to, request_id) if stream_to else None
+        deadlines = [item.deadline for item in items if item.deadline is not None]
+        abort = AbortOnCancel(self.message_bus, request_id, min(deadlines) if deadlines else None)
+        try:
+            if len(items) == 1:
+                callbacks = (stream_callbacks(sink, "verifier", items[0].task_id) or []) + [abort]
+                verified = [self._verify(items[0].text, callbacks)]
+            else:
+                callbacks = (stream_callbacks(sink, "verifier") or []) + [abort]
+                verified = self._verify_batch([item.text for item in items], callbacks)
+        except RequestCancelled:
+            self._count(dropped_cancelled=len(items))
+            raise
+        for item, text in zip(items, verified):
+            self._deliver(request_id, item, text)
+
+    def _deliver(self, request_id: Optional[str], item: _Item, text: str):
+        if item.stream_to:
+            # Ahead of the TASK_RESULT, so the caller sees it before the final event
+            sink = bus_sink(self.message_bus, "Verifier", item.stream_to, request_id)
+            sink(StreamEvent(SUBTASK, text, "verifier", item.task_id))
+        self.message_bus.send(Message(
+            sender="Verifier",
+            recipient="Planner",
+            message_type=MessageType.TASK_RESULT,
+            payload=text,
+            metadata={"from_task_id": item.task_id},
+            request_id=request_id,
+            priority=item.priority,
+            deadline=item.deadline,
+        ))
+
 
 def create_verifier():
     """Orchestrator mode: return the LangChain-based verifier executor."""
@@ -57,7 +290,7 @@ def create_verifier():
     ]
     return make_react_agent(
         tools=tools,
-        llm=make_llm(temp=0),
+        llm=make_llm(temp=0, caller="verifier"),
         system_prompt=VERIFIER_SYSTEM_PROMPT,
     )
 
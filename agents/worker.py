@@ -1,8 +1,13 @@
-from langchain.tools import Tool
+from a2a_runtime import RequestCancelled, abort_callbacks
 from central import make_llm, make_react_agent
 from RAG.rag_tool import rag_tool
 from MCP.mcp_tools_adapter import load_mcp_tools
 from messaging import MessageBus, Message, MessageType
+from RAG import prefetch
+from agent_factory import get_agent_factory
+from router import DIRECT_ROUTES, get_router
+from startup import Lazy
+from streaming import bus_sink, stream_callbacks
 
 WORKER_SYSTEM_PROMPT = """
 You are the Worker Agent. Execute subtasks using tools when needed or answer directly for general questions.
@@ -29,16 +34,16 @@ IMPORTANT:
 --- TOOL DEFINITIONS ---
 You have access to the following tools. Use them with the exact parameter names provided.
 
-1. `file_search(root: str, pattern: str) -> str`
-   - Searches for files matching a glob pattern within a root directory.
-   - Parameters: root (directory to search), pattern (file pattern like "*.py")
+1. `file_search(root: str, pattern: str, limit: int, offset: int) -> str`
+   - Searches for files matching a glob pattern within a root directory (ignored and .gitignore'd files are skipped).
+   - Parameters: root (directory to search), pattern (file pattern like "*.py"), limit (optional, default 200), offset (optional, for the next page)
    - Example: To find all Python files in the 'agents' directory:
      Action: file_search
      Action Input: {{"root": "agents", "pattern": "*.py"}}
 
-2. `read_file(path: str, max_chars: int) -> str`
-   - Reads the contents of a text file at the given path.
-   - Parameters: path (file path), max_chars (optional, default 5000)
+2. `read_file(path: str, max_chars: int, start_line: int, end_line: int, offset: int, length: int, tail: int, stat: bool) -> str`
+   - Reads the contents of a text file at the given path. Large files are read in slices.
+   - Parameters: path (file path), max_chars (optional, default 5000); optional modes: start_line/end_line (1-based line range), offset/length (byte range), tail (last N lines, e.g. for logs), stat (true for size and modification time only)
    - Example:
      Action: read_file
      Action Input: {{"path": "agents/worker.py"}}
@@ -58,38 +63,38 @@ Begin!
 """
 
 
+def _build_rag_tool():
+    from langchain_core.tools import Tool
+
+    return Tool(
+        name="RAG_Search",
+        func=rag_tool,
+        description=(
+            "Retrieve information from the project knowledge base. Use ONLY when the "
+            "task explicitly requires KB retrieval (mentions 'RAG' or needs doc context)."
+        ),
+    )
+
+
+_RAG_TOOL = Lazy("worker.rag_tool", _build_rag_tool)
+
+
 class WorkerA2A:
     def __init__(self, message_bus: MessageBus):
         self.message_bus = message_bus
         self.message_bus.register_agent("Worker")
 
     def _make_agent(self):
-        rag_tool_wrapper = Tool(
-            name="RAG_Search",
-            func=rag_tool,
-            description=(
-                "Retrieve information from the project knowledge base. Use ONLY when the "
-                "task explicitly requires KB retrieval (mentions 'RAG' or needs doc context)."
-            ),
-        )
-        tools = [rag_tool_wrapper]
-        mcp_tools = load_mcp_tools()
-        tools += mcp_tools
-        
-        # Format the system prompt with tool names
-        formatted_prompt = WORKER_SYSTEM_PROMPT
-        
-        return make_react_agent(
-            tools=tools,
-            llm=make_llm(temp=0.0),  # Lower temperature for more consistent output
-            system_prompt=formatted_prompt,
-        )
-
-    def perform_task(self, task_data: str) -> str:
+        # Executors are shared across tasks; see agent_factory.
+        return get_agent_factory().get("worker")
+
+    def perform_task(self, task_data: str, callbacks=None) -> str:
         agent = self._make_agent()
         try:
-            out = agent.invoke({"input": task_data})
+            out = agent.invoke({"input": task_data}, config={"callbacks": callbacks} if callbacks else None)
             return out.get("output", str(out))
+        except RequestCancelled:
+            raise
         except Exception as e:
             # Handle common LangChain parsing errors
             error_msg = str(e)
@@ -104,38 +109,51 @@ class WorkerA2A:
         msg = self.message_bus.receive("Worker", timeout=timeout)
         if not msg:
             return False
+        self.handle_message(msg)
+        return True
+
+    def handle_message(self, msg: Message):
         if msg.message_type == MessageType.TASK_REQUEST:
-            result = self.perform_task(msg.payload)
+            meta = msg.metadata or {}
+            result = None
+            # RAG_Search calls below pick up retrievals the planner prefetched for this request
+            with prefetch.bind(msg.request_id):
+                if meta.get("route") in DIRECT_ROUTES:
+                    result = get_router().dispatch(meta["route"], msg.payload, meta.get("tool"), meta.get("tool_args"))
+                # Raw tool output is passed through; agent answers still get verified
+                verify = result is None
+                if result is None:
+                    stream_to = meta.get("stream_to")
+                    sink = bus_sink(self.message_bus, "Worker", stream_to, msg.request_id) if stream_to else None
+                    # Aborts between ReAct steps once the request is cancelled or past its deadline
+                    callbacks = abort_callbacks(self.message_bus, msg, stream_callbacks(sink, "worker", meta.get("task_id")))
+                    result = self.perform_task(msg.payload, callbacks)
             resp = Message(
                 sender="Worker",
                 recipient="Verifier",
                 message_type=MessageType.TASK_RESPONSE,
                 payload=result,
-                metadata={"task_id": (msg.metadata or {}).get("task_id")},
+                metadata={
+                    "task_id": meta.get("task_id"), "total": meta.get("total"),
+                    "verify": verify, "stream_to": meta.get("stream_to"),
+                },
+                request_id=msg.request_id,
+                priority=msg.priority,
+                deadline=msg.deadline,
             )
             self.message_bus.send(resp)
-        return True
 
 
-def create_worker():
+def worker_tools():
+    """RAG_Search plus the MCP tools (both lists are built once and cached)."""
+    return [_RAG_TOOL.get()] + load_mcp_tools()
+
+
+def create_worker(tools=None):
     """Orchestrator mode: return a LangChain worker agent executor."""
-    rag_tool_wrapper = Tool(
-        name="RAG_Search",
-        func=rag_tool,
-        description=(
-            "Retrieve information from the project knowledge base. Use ONLY when the "
-            "task explicitly requires KB retrieval (mentions 'RAG' or needs doc context)."
-        ),
-    )
-    tools = [rag_tool_wrapper]
-    mcp_tools = load_mcp_tools()
-    tools += mcp_tools
-    
-    # Tools loaded successfully
-    
     return make_react_agent(
-        tools=tools,
-        llm=make_llm(temp=0.0),  # Lower temperature for more consistent output
+        tools=worker_tools() if tools is None else tools,
+        llm=make_llm(temp=0.0, caller="worker"),  # Lower temperature for more consistent output
         system_prompt=WORKER_SYSTEM_PROMPT,
     )
 
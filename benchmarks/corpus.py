@@ -0,0 +1,35 @@
+"""Synthetic document corpus for RAG benchmarks."""
+import random
+from pathlib import Path
+from typing import List
+
+_WORDS = (
+    "agent planner worker verifier message bus request subtask result tool retrieval "
+    "vector index chunk embedding query context answer latency throughput cache "
+    "session server file search read save pipeline batch stream token model prompt"
+).split()
+
+
+def make_corpus(path: str, n_docs: int = 200, words_per_doc: int = 400, seed: int = 0) -> List[Path]:
+    """Write ``n_docs`` reproducible text files (with a few identifier-like tokens) under ``path``."""
+    rng = random.Random(seed)
+    root = Path(path)
+    root.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(n_docs):
+        words = [rng.choice(_WORDS) for _ in range(words_per_doc)]
+        for _ in range(3):
+            words.insert(rng.randrange(len(words)), f"ERR_CODE_{rng.randrange(1000):03d}")
+        sentences = [" ".join(words[j:j + 12]).capitalize() + "." for j in range(0, len(words), 12)]
+        file = root / f"doc_{i:04d}.txt"
+        file.write_text("\n".join(sentences), encoding="utf-8")
+        files.append(file)
+    return files
+
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 7))) if i % 4 else f"ERR_CODE_{rng.randrange(1000):03d}"
+        for i in range(n)
+    ]
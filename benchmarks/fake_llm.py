@@ -0,0 +1,143 @@
+"""Scripted chat model and environment setup for running the framework offline."""
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_QUESTION_RE = re.compile(r"^Question:\s*(.*)$", re.MULTILINE)
+_OBSERVATION_RE = re.compile(r"Observation:\s*(.*?)(?:\nThought:|\Z)", re.DOTALL)
+_OBJECTIVE_RE = re.compile(r"Break down this objective into subtasks:\s*(.*)")
+_RESULT_HEADER_RE = re.compile(r"^### \[Result (\d+)\]$", re.MULTILINE)
+
+
+def _question(prompt: str) -> str:
+    found = _QUESTION_RE.findall(prompt)
+    return found[-1].strip() if found else prompt.strip().splitlines()[-1][:200]
+
+
+def scripted_response(prompt: str) -> str:
+    """Deterministic output shaped like what each agent's prompt asks for."""
+    objective = _OBJECTIVE_RE.search(prompt)
+    if objective:
+        topic = objective.group(1).strip()[:80]
+        return json.dumps({
+            "subtasks": [
+                f"Search the knowledge base (RAG) for {topic}",
+                f"Explain the key ideas behind {topic}",
+                f"Write a short summary of {topic}",
+            ],
+            "depends_on": {"3": [1, 2]},
+        })
+    if prompt.lstrip().startswith("Clean up and verify each"):
+        parts = _RESULT_HEADER_RE.split(prompt)[1:]
+        return "\n\n".join(
+            f"### [Result {number}]\nVerified answer:\n{body.strip()[:500]}"
+            for number, body in zip(parts[::2], parts[1::2])
+        )
+    if prompt.lstrip().startswith("Clean up and verify"):
+        return "Verified answer:\n" + prompt.split("\n\n", 1)[-1][:500]
+    if prompt.lstrip().startswith("Summarize clearly"):
+        return "Summary: " + prompt.split("\n\n", 1)[-1][:200]
+    if "Use the following pieces of context" in prompt:
+        return "Answer drawn from the retrieved context."
+
+    # ReAct executors: call one tool when it is the obvious choice, then finish.
+    observations = _OBSERVATION_RE.findall(prompt.split("Question:")[-1])
+    question = _question(prompt)
+    if observations:
+        return f"Thought: I now know the final answer.\nFinal Answer: {observations[-1].strip()[:500]}"
+    if "Action: plan_task" in prompt:
+        return f"Thought: I should plan this.\nAction: plan_task\nAction Input: {question}"
+    if "RAG_Search" in prompt and ("RAG" in question or "knowledge base" in question):
+        return f"Thought: This needs the knowledge base.\nAction: RAG_Search\nAction Input: {question}"
+    return f"Thought: I can answer directly.\nFinal Answer: Result for: {question}"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from a script after a simulated latency."""
+
+    latency: float = 0.05
+    per_token_latency: float = 0.0
+    script: Callable[[str], str] = scripted_response
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"latency": self.latency}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = self.script(prompt)
+        tokens_in, tokens_out = len(prompt) // 4, len(text) // 4
+        time.sleep(self.latency + self.per_token_latency * tokens_out)
+        self.calls += 1
+        message = AIMessage(
+            content=text,
+            usage_metadata={"input_tokens": tokens_in, "output_tokens": tokens_out,
+                            "total_tokens": tokens_in + tokens_out},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = self.script(prompt)
+        time.sleep(self.latency)
+        self.calls += 1
+        for word in re.findall(r"\S+\s*|\s+", text):
+            time.sleep(self.per_token_latency * max(1, len(word) // 4))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        tokens_in, tokens_out = len(prompt) // 4, len(text) // 4
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata={"input_tokens": tokens_in, "output_tokens": tokens_out,
+                            "total_tokens": tokens_in + tokens_out},
+        ))
+
+
+_INSTALLED = threading.Event()
+
+
+def install(latency: float = 0.05, per_token_latency: float = 0.0, embedding_size: int = 64):
+    """Route every LLM and embedding call in this process to deterministic fakes.
+
+    Must run before ``central`` or the agents are imported so that provider,
+    cache and rate-limit settings are read from the environment set here.
+    """
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("LLM_CACHE", "off")
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", "0")
+    os.environ.setdefault("RAG_EMBED_CACHE", "off")
+
+    import llm_pool
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import RAG.vector_store as vector_store
+
+    llm_pool.register_provider(
+        "fake", lambda model, temperature: ScriptedChatModel(latency=latency, per_token_latency=per_token_latency)
+    )
+    vector_store._EMBEDDINGS = DeterministicFakeEmbedding(size=embedding_size)
+    _INSTALLED.set()
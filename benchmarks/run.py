@@ -0,0 +1,444 @@
+"""Offline benchmark suite for the orchestrator, A2A, RAG and MCP paths.
+
+Every LLM call goes to ``ScriptedChatModel`` and every embedding to a
+deterministic fake, so numbers reflect framework overhead plus the simulated
+model latency. Run from the repository root:
+
+    python -m benchmarks.run --requests 20 --concurrency 4 --out bench_results.json
+    python -m benchmarks.run --compare bench_results.json   # diff against a previous run
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentiles(samples: List[float]) -> dict:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(s * 1000 for s in samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class StageTimer:
+    """Thread-safe accumulator of per-stage durations."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def patch(self, owner, attr: str, stage: str):
+        setattr(owner, attr, self.wrap(stage, getattr(owner, attr)))
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {k: list(v) for k, v in self._samples.items()}
+        return {stage: {**percentiles(v), "total_s": round(sum(v), 3)} for stage, v in samples.items()}
+
+
+def run_load(fn: Callable[[str], object], inputs: List[str], concurrency: int) -> dict:
+    """Run ``fn`` over ``inputs`` with ``concurrency`` threads; report latency and throughput."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(text: str):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            fn(text)
+        except Exception as e:
+            print(f"[bench] error: {e}", file=sys.stderr)
+            with lock:
+                errors += 1
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, inputs))
+    wall = time.perf_counter() - start
+    return {
+        "latency_ms": percentiles(latencies),
+        "throughput_rps": round(len(inputs) / wall, 3) if wall else 0.0,
+        "wall_s": round(wall, 3),
+        "concurrency": concurrency,
+        "errors": errors,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+# ---- individual benchmarks -----------------------------------------------
+
+def bench_import(latency: float) -> dict:
+    """Import time of the entry points in a fresh interpreter (after fakes are installed)."""
+    code = (
+        "import sys, time, resource\n"
+        f"sys.path.insert(0, {str(REPO_ROOT)!r})\n"
+        "from benchmarks.fake_llm import install\n"
+        f"install(latency={latency})\n"
+        "start = time.perf_counter()\n"
+        "import orchestrator, a2a_network\n"
+        "print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    seconds, rss = out.stdout.strip().splitlines()[-1].split()
+    return {"seconds": round(float(seconds), 3), "peak_rss_mb": round(int(rss) / 1024, 1)}
+
+
+def bench_rag(corpus_dir: str, queries: List[str], concurrency: int) -> dict:
+    from RAG.retriever import get_retriever
+    from RAG.vector_store import build_vector_store
+
+    start = time.perf_counter()
+    build_vector_store(corpus_dir, "rag_db")
+    build_seconds = time.perf_counter() - start
+
+    retriever = get_retriever("rag_db")
+    result = {
+        "build_s": round(build_seconds, 3),
+        "retriever": run_load(retriever.invoke, queries, concurrency),
+    }
+    from RAG.rag_tool import context_stats, rag_tool
+    result["rag_tool"] = run_load(rag_tool, queries, concurrency)
+    result["context"] = context_stats()
+    return result
+
+
+def bench_mcp(corpus_dir: str, calls: int, concurrency: int) -> dict:
+    from MCP.session_pool import get_session_manager
+
+    manager = get_session_manager()
+    start = time.perf_counter()
+    manager.list_tools()
+    first = time.perf_counter() - start
+    files = sorted(os.listdir(corpus_dir))
+    search = run_load(
+        lambda _: manager.call_tool("file_search", {"root": corpus_dir, "pattern": "*.txt"}),
+        [""] * calls, concurrency,
+    )
+    read = run_load(
+        lambda name: manager.call_tool("read_file", {"path": os.path.join(corpus_dir, name), "max_chars": 2000}),
+        [files[i % len(files)] for i in range(calls)], concurrency,
+    )
+    return {"first_call_s": round(first, 3), "file_search": search, "read_file": read, "pool": dict(manager.stats)}
+
+
+def bench_orchestrator(requests: List[str], concurrency: int, timer: StageTimer) -> dict:
+    import orchestrator
+    from agent_factory import get_agent_factory
+    import agents.worker as worker
+
+    factory = get_agent_factory()
+    roles = {id(factory.get(role)): role for role in ("planner", "worker", "verifier")}
+    run_agent = orchestrator.run_agent
+
+    def timed_run_agent(agent, text, **kwargs):
+        start = time.perf_counter()
+        try:
+            return run_agent(agent, text, **kwargs)
+        finally:
+            timer.record(roles.get(id(agent), "agent"), time.perf_counter() - start)
+
+    orchestrator.run_agent = timed_run_agent
+    timer.patch(worker._RAG_TOOL.get(), "func", "rag_tool")
+    try:
+        timer.reset()
+        load = run_load(orchestrator.orchestrate, requests, concurrency)
+        load["stages"] = timer.summary()
+        return load
+    finally:
+        orchestrator.run_agent = run_agent
+
+
+def bench_stream(requests: List[str], concurrency: int) -> dict:
+    """Time to the first streamed token, first finished subtask and final answer."""
+    from orchestrator import orchestrate_stream
+
+    firsts: Dict[str, List[float]] = {"token": [], "subtask": [], "final": []}
+    lock = threading.Lock()
+
+    def one(text: str):
+        start = time.perf_counter()
+        seen = set()
+        for event in orchestrate_stream(text):
+            if event.kind in firsts and event.kind not in seen:
+                seen.add(event.kind)
+                with lock:
+                    firsts[event.kind].append(time.perf_counter() - start)
+
+    load = run_load(one, requests, concurrency)
+    load.update({f"first_{kind}_ms": percentiles(samples) for kind, samples in firsts.items()})
+    return load
+
+
+def bench_a2a(requests: List[str], concurrency: int, timer: StageTimer) -> dict:
+    from a2a_network import A2ANetwork
+    from agents.planner import PlannerA2A
+    from agents.verifier import VerifierA2A
+    from agents.worker import WorkerA2A
+
+    timer.patch(PlannerA2A, "create_subtasks", "planner")
+    timer.patch(WorkerA2A, "perform_task", "worker")
+    timer.patch(VerifierA2A, "_verify", "verifier")
+    timer.patch(VerifierA2A, "_verify_batch", "verifier_batch")
+    timer.reset()
+    with A2ANetwork() as network:
+        load = run_load(network.run, requests, concurrency)
+        load["verifier"] = network.verifier.stats()
+        load["bus"] = network.message_bus.stats()
+    load["stages"] = timer.summary()
+    return load
+
+
+def init_process(latency: float, per_token_latency: float, mcp: bool):
+    """Initializer for A2A child processes: the same fakes as the parent."""
+    from benchmarks.fake_llm import install
+
+    install(latency=latency, per_token_latency=per_token_latency)
+    if not mcp:
+        import MCP.mcp_tools_adapter as adapter
+        adapter._CACHED_TOOLS = []
+
+
+def bench_a2a_processes(requests: List[str], concurrency: int, processes: int, initializer: Callable) -> dict:
+    """A2A with Worker and Verifier in child processes (stage timings are not collected there)."""
+    from a2a_network import A2ANetwork
+
+    start = time.perf_counter()
+    network = A2ANetwork(worker_processes=processes, verifier_processes=max(1, processes // 2),
+                         process_initializer=initializer)
+    startup_s = time.perf_counter() - start
+    try:
+        load = run_load(network.run, requests, concurrency)
+        load["bus"] = network.message_bus.stats()
+    finally:
+        network.shutdown()
+    load["startup_s"] = round(startup_s, 3)
+    load["worker_processes"] = processes
+    return load
+
+
+class EchoAgent:
+    """Replies to every message with its payload; the far end of ``bench_bus``."""
+
+    def __init__(self, message_bus):
+        self.message_bus = message_bus
+        message_bus.register_agent("Echo")
+
+    def handle_message(self, msg):
+        from messaging import Message, MessageType
+
+        self.message_bus.send(Message("Echo", msg.sender, MessageType.TASK_RESULT, msg.payload,
+                                      request_id=msg.request_id))
+
+
+def bench_bus(messages: int, payload_bytes: int = 1024) -> dict:
+    """Round trip and pipelined throughput of one message, in-process vs across processes."""
+    from a2a_runtime import AgentRuntime
+    from messaging import Message, MessageBus, MessageType
+    from process_bus import ProcessMessageBus, ProcessRuntime
+
+    payload = "x" * payload_bytes
+
+    def measure(bus) -> dict:
+        bus.register_agent("Bench")
+        for _ in range(20):  # warm up queues and feeder threads
+            bus.send(Message("Bench", "Echo", MessageType.TASK_REQUEST, payload))
+            bus.receive("Bench", timeout=10)
+        round_trips = []
+        for _ in range(messages):
+            start = time.perf_counter()
+            bus.send(Message("Bench", "Echo", MessageType.TASK_REQUEST, payload))
+            bus.receive("Bench", timeout=10)
+            round_trips.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(messages):
+            bus.send(Message("Bench", "Echo", MessageType.TASK_REQUEST, payload))
+        received = sum(bus.receive("Bench", timeout=10) is not None for _ in range(messages))
+        wall = time.perf_counter() - start
+        return {"round_trip_ms": percentiles(round_trips), "pipelined_msgs_per_s": round(received / wall, 1)}
+
+    bus = MessageBus()
+    runtime = AgentRuntime(bus)
+    runtime.add_role("Echo", EchoAgent(bus).handle_message)
+    runtime.start()
+    try:
+        threads = measure(bus)
+    finally:
+        runtime.shutdown()
+
+    bus = ProcessMessageBus()
+    runtime = ProcessRuntime(bus, warmups=())  # Echo needs no agents or retriever
+    runtime.add_role("Echo", "benchmarks.run:EchoAgent")
+    runtime.start()
+    try:
+        processes = measure(bus)
+    finally:
+        runtime.shutdown()
+    overhead = processes["round_trip_ms"]["p50"] - threads["round_trip_ms"]["p50"]
+    return {
+        "payload_bytes": payload_bytes,
+        "threads": threads,
+        "processes": processes,
+        "process_overhead_ms_p50": round(overhead, 3),
+    }
+
+
+# ---- driver --------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(base: dict, current: dict, path: str = "") -> List[str]:
+    """Lines describing how latency/throughput figures moved between two reports."""
+    lines = []
+    for key, value in current.items():
+        here = f"{path}.{key}" if path else key
+        old = base.get(key) if isinstance(base, dict) else None
+        if isinstance(value, dict):
+            lines += compare(old or {}, value, here)
+        elif key in {"p50", "p95", "p99", "throughput_rps", "seconds", "build_s", "peak_rss_mb"} \
+                and isinstance(old, (int, float)) and old:
+            lines.append(f"{here:<55} {old:>10.2f} -> {value:>10.2f} ({(value - old) / old * 100:+.1f}%)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="end-to-end requests per mode")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="simulated seconds per output token")
+    parser.add_argument("--docs", type=int, default=200, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=50, help="RAG queries")
+    parser.add_argument("--mcp-calls", type=int, default=50)
+    parser.add_argument("--bus-messages", type=int, default=500, help="messages per bus transport")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="also run A2A with this many worker processes (verifiers: half as many)")
+    parser.add_argument("--prefetch", action="store_true", help="turn on speculative RAG retrieval (RAG_PREFETCH)")
+    parser.add_argument("--skip", default="", help="comma-separated: import,rag,mcp,orchestrator,stream,a2a,bus")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    args = parser.parse_args(argv)
+    skip = {s.strip() for s in args.skip.split(",") if s.strip()}
+    out = Path(args.out).resolve()
+    base = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    from benchmarks.corpus import make_corpus, make_queries
+    from benchmarks.fake_llm import install
+
+    workspace = tempfile.mkdtemp(prefix="agentfoundry-bench-")
+    os.chdir(workspace)  # rag_tool opens ./rag_db
+    install(latency=args.latency, per_token_latency=args.token_latency)
+    if args.prefetch:
+        from RAG.prefetch import get_prefetcher
+        get_prefetcher().enabled = True
+    corpus_dir = os.path.join(workspace, "corpus")
+    make_corpus(corpus_dir, n_docs=args.docs)
+    queries = make_queries(args.queries)
+    requests = [f"Explain topic {i} of the agent framework" for i in range(args.requests)]
+    timer = StageTimer()
+
+    report: dict = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+        }
+    }
+    if "import" not in skip:
+        # Needs ./rag_db to exist, so build the store first when RAG is benchmarked too.
+        if "rag" not in skip:
+            report["rag"] = bench_rag(corpus_dir, queries, args.concurrency)
+        report["import"] = bench_import(args.latency)
+    elif "rag" not in skip:
+        report["rag"] = bench_rag(corpus_dir, queries, args.concurrency)
+    if "mcp" in skip:
+        import MCP.mcp_tools_adapter as adapter
+        adapter._CACHED_TOOLS = []  # keep the worker from spawning MCP servers
+    else:
+        report["mcp"] = bench_mcp(corpus_dir, args.mcp_calls, args.concurrency)
+    if "orchestrator" not in skip:
+        report["orchestrator"] = bench_orchestrator(requests, args.concurrency, timer)
+    if "stream" not in skip:
+        report["stream"] = bench_stream(requests, args.concurrency)
+    if "a2a" not in skip:
+        report["a2a"] = bench_a2a(requests, args.concurrency, timer)
+        if args.processes:
+            initializer = functools.partial(init_process, args.latency, args.token_latency, "mcp" not in skip)
+            report["a2a_processes"] = bench_a2a_processes(requests, args.concurrency, args.processes, initializer)
+    if "bus" not in skip:
+        report["bus"] = bench_bus(args.bus_messages)
+
+    import llm_pool
+    from RAG.prefetch import prefetch_stats
+    from router import router_stats
+    report["llm"] = llm_pool.pool_stats()
+    report["router"] = router_stats()
+    report["prefetch"] = prefetch_stats()
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"[bench] wrote {out}")
+    if base is not None:
+        print(f"\n[bench] {base.get('meta', {}).get('commit')} -> {report['meta']['commit']}")
+        print("\n".join(compare(base, report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,25 @@
-from langchain.tools import Tool
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not found. Add it to your .env file.")
-os.environ["GOOGLE_API_KEY"] = api_key
+# The API key is checked when the first Gemini client is created (llm_pool),
+# so importing the framework works without one, e.g. with a fake provider.
 
-def make_llm(temp: float = 0):
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=temp)
+def make_llm(temp: float = 0, caller: str = "default"):
+    # Cheap to call: wraps a shared client. ``caller`` picks the scheduler
+    # priority and labels the response-cache stats. langchain_core's model and
+    # cache classes cost most of a second to import, so they load on first use.
+    from llm_cache import get_response_cache
+    from llm_pool import scheduled_llm
+
+    return scheduled_llm(temp, caller=caller, cache=get_response_cache(caller))
 
 
 def make_react_agent(tools, llm, system_prompt, temp: float = 0):
+    # langchain.agents pulls in most of langchain; import it on first build only.
+    from langchain.agents import AgentExecutor, create_react_agent
+    from langchain_core.prompts import PromptTemplate
+
     template = (
         f"{system_prompt}\n\n"
         "You can use the following tools:\n{tools}\n\n"
@@ -38,17 +41,20 @@ def make_react_agent(tools, llm, system_prompt, temp: float = 0):
     )
 
 def llm_summarize_tool(name="Summarize", description="Summarize text succinctly."):
-    llm = make_llm(0)
+    from langchain_core.tools import Tool
+
+    llm = make_llm(0, caller="summarize")
     return Tool(
         name=name,
         description=description,
         func=lambda text: llm.invoke(f"Summarize clearly and briefly:\n\n{text}").content,
     )
 
-def run_agent(agent_executor, input_text: str) -> str:
+def run_agent(agent_executor, input_text: str, callbacks=None) -> str:
+    # ``callbacks`` (e.g. streaming.TokenStreamHandler) reach every LLM call of the run
     try:
         return agent_executor.invoke({
             "input": input_text
-        })["output"]
+        }, config={"callbacks": callbacks} if callbacks else None)["output"]
     except Exception as e:
         return f"Error running agent: {str(e)}"
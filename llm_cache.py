@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE", ".cache/llm.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "10000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0").lower() in {"1", "true", "yes"}
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.95"))
+
+
+def _prompt_text(prompt: str) -> str:
+    """Whitespace-normalized text of a serialized prompt.
+
+    Chat models hand the cache a JSON dump of their messages; only the role and
+    content of each message matter for matching.
+    """
+    try:
+        messages = json.loads(prompt)
+        parts = []
+        for m in messages:
+            kwargs = m.get("kwargs", {})
+            content = kwargs.get("content", "")
+            if not isinstance(content, str):
+                content = json.dumps(content, sort_keys=True)
+            parts.append(f"{kwargs.get('type', m.get('id', [''])[-1])}: {content}")
+        text = "\n".join(parts)
+    except (ValueError, TypeError, AttributeError):
+        text = prompt
+    return " ".join(text.split())
+
+
+def _loads(serialized: str):
+    # ``loads`` warns that it is in beta on every call.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return loads(serialized)
+
+
+class _Vectors:
+    """Prompt vectors of one model for the semantic tier, kept in step with the table.
+
+    Rows are appended into spare capacity and removed by copying, never changed
+    in place, so a ``snapshot`` stays valid without the store lock.
+    """
+
+    def __init__(self, keys: list, matrix: np.ndarray):
+        self.keys = keys
+        self._matrix = matrix
+        self._rows = len(keys)
+
+    def snapshot(self) -> tuple:
+        return self.keys, self._matrix[:self._rows]
+
+    def append(self, key: str, vector: np.ndarray):
+        if self._rows == len(self._matrix):
+            grown = np.zeros((max(16, 2 * self._rows), self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._rows] = self._matrix[:self._rows]
+            self._matrix = grown
+        self._matrix[self._rows] = vector
+        self.keys.append(key)
+        self._rows += 1
+
+    def remove(self, keys: set):
+        keep = [i for i, key in enumerate(self.keys) if key not in keys]
+        if len(keep) < self._rows:
+            self.keys = [self.keys[i] for i in keep]
+            self._matrix = self._matrix[keep]
+            self._rows = len(keep)
+
+
+class _Store:
+    """SQLite table of completions shared by every caller in the process."""
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Semantic tier: llm_string -> normalized prompt vectors, loaded on first lookup
+        self._vectors: Dict[str, _Vectors] = {}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, llm TEXT NOT NULL, generations TEXT NOT NULL,"
+            " vec BLOB, created REAL NOT NULL, last_used REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_used);"
+            "CREATE INDEX IF NOT EXISTS responses_llm ON responses(llm);"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM responses WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return row[0] if row else None
+
+    def put(self, key: str, llm: str, generations: str, vector: Optional[np.ndarray]):
+        now = time.time()
+        blob = vector.astype(np.float16).tobytes() if vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, llm, generations, blob, now, now),
+            )
+            evicted = {key}  # a replaced prompt moves to the end of its matrix
+            evicted.update(r[0] for r in self._conn.execute(
+                "SELECT key FROM responses WHERE created < ?", (now - self.ttl,)))
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                lru = [r[0] for r in self._conn.execute(
+                    "SELECT key FROM responses ORDER BY last_used LIMIT ?", (count - self.max_entries,))]
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in lru])
+                evicted.update(lru)
+            self._conn.commit()
+            for vectors in self._vectors.values():
+                vectors.remove(evicted)
+            cached = self._vectors.get(llm)
+            if cached is not None and blob is not None:
+                if cached.snapshot()[1].shape[1] == len(vector):
+                    cached.append(key, np.frombuffer(blob, dtype=np.float16).astype(np.float32))
+                else:
+                    self._vectors.pop(llm)  # embedding model changed: reload on next lookup
+
+    def nearest(self, llm: str, vector: np.ndarray) -> Optional[tuple]:
+        """Return ``(key, similarity)`` of the closest cached prompt for ``llm``."""
+        with self._lock:
+            if llm not in self._vectors:
+                rows = self._conn.execute(
+                    "SELECT key, vec FROM responses WHERE llm = ? AND vec IS NOT NULL AND created >= ?",
+                    (llm, time.time() - self.ttl),
+                ).fetchall()
+                matrix = (
+                    np.stack([np.frombuffer(blob, dtype=np.float16).astype(np.float32) for _, blob in rows])
+                    if rows else np.zeros((0, len(vector)), dtype=np.float32)
+                )
+                self._vectors[llm] = _Vectors([key for key, _ in rows], matrix)
+            keys, matrix = self._vectors[llm].snapshot()
+        if not keys or matrix.shape[1] != len(vector):
+            return None
+        sims = matrix @ vector
+        best = int(np.argmax(sims))
+        return keys[best], float(sims[best])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._vectors.clear()
+
+
+_STATS: Dict[str, Dict[str, int]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _record(caller: str, outcome: str):
+    with _STATS_LOCK:
+        counters = _STATS.setdefault(caller, {"exact_hits": 0, "semantic_hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+
+class ResponseCache(BaseCache):
+    """LangChain LLM cache with an exact tier and an optional semantic tier.
+
+    The exact tier is keyed by the model parameters (model name, temperature,
+    ...) plus the whitespace-normalized prompt. The semantic tier embeds the
+    prompt and returns the closest cached completion for the same model
+    parameters when its cosine similarity reaches ``similarity``. A hit is
+    returned before the model is called, so no request goes out.
+    """
+
+    def __init__(self, store: _Store, caller: str = "default", semantic: bool = False,
+                 similarity: float = 0.95, embeddings: Any = None):
+        self.store = store
+        self.caller = caller
+        self.semantic = semantic
+        self.similarity = similarity
+        self._embeddings = embeddings
+
+    @staticmethod
+    def _key(prompt_text: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt_text}".encode("utf-8")).hexdigest()
+
+    def _embed(self, prompt_text: str) -> Optional[np.ndarray]:
+        if not self.semantic:
+            return None
+        if self._embeddings is None:
+            from RAG.vector_store import get_embeddings
+            self._embeddings = get_embeddings()
+        vec = np.asarray(self._embeddings.embed_query(prompt_text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        text = _prompt_text(prompt)
+        cached = self.store.get(self._key(text, llm_string))
+        if cached is not None:
+            _record(self.caller, "exact_hits")
+            return _loads(cached)
+        if self.semantic:
+            match = self.store.nearest(llm_string, self._embed(text))
+            if match and match[1] >= self.similarity:
+                cached = self.store.get(match[0])
+                if cached is not None:
+                    _record(self.caller, "semantic_hits")
+                    return _loads(cached)
+        _record(self.caller, "misses")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        text = _prompt_text(prompt)
+        self.store.put(self._key(text, llm_string), llm_string, dumps(list(return_val)), self._embed(text))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+_STORE: Optional[_Store] = None
+_STORE_LOCK = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return bool(LLM_CACHE_PATH) and LLM_CACHE_PATH.lower() not in {"0", "off", "none"}
+
+
+def get_response_cache(caller: str = "default") -> Optional[ResponseCache]:
+    """Return a cache view for ``caller`` over the shared store, or ``None`` when disabled."""
+    global _STORE
+    if not cache_enabled():
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = _Store(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX)
+    return ResponseCache(_STORE, caller=caller, semantic=LLM_CACHE_SEMANTIC, similarity=LLM_CACHE_SIMILARITY)
+
+
+def cache_stats() -> dict:
+    """Per-caller hit counts and hit rates, plus the number of stored completions."""
+    with _STATS_LOCK:
+        callers = {name: dict(c) for name, c in _STATS.items()}
+    for counters in callers.values():
+        total = counters["exact_hits"] + counters["semantic_hits"] + counters["misses"]
+        counters["hit_rate"] = (counters["exact_hits"] + counters["semantic_hits"]) / total if total else 0.0
+    return {"entries": _STORE.count() if _STORE else 0, "callers": callers}
+
@@ -0,0 +1,333 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_RPM = float(os.getenv("LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+# Lower value = served first when requests queue up.
+PRIORITIES = {"planner": 0, "worker": 1, "verifier": 2}
+DEFAULT_PRIORITY = 1
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_RETRYABLE_MARKERS = ("429", "resource exhausted", "resourceexhausted", "rate limit", "unavailable", "503", "500")
+
+
+# ---- providers -----------------------------------------------------------
+
+def _google_factory(model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY not found. Add it to your .env file.")
+    kwargs: Dict[str, Any] = {"google_api_key": api_key}
+    if LLM_BASE_URL:
+        # Point the client at a local stub server (REST transport speaks plain HTTP).
+        kwargs.update(client_options={"api_endpoint": LLM_BASE_URL}, transport="rest")
+    # The scheduler owns retries, so the client itself makes a single attempt.
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature, max_retries=1, **kwargs)
+
+
+_PROVIDERS: Dict[str, Callable[[str, float], BaseChatModel]] = {"google": _google_factory}
+_CLIENTS: Dict[Tuple[str, str, float], BaseChatModel] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def register_provider(name: str, factory: Callable[[str, float], BaseChatModel]):
+    """Register ``factory(model, temperature) -> chat model`` under ``name`` (select it with LLM_PROVIDER)."""
+    with _CLIENTS_LOCK:
+        _PROVIDERS[name] = factory
+        for key in [k for k in _CLIENTS if k[0] == name]:
+            del _CLIENTS[key]
+
+
+def get_client(temperature: float = 0, model: Optional[str] = None, provider: Optional[str] = None) -> BaseChatModel:
+    """Process-wide chat client for (provider, model, temperature); its HTTP/gRPC channel is reused."""
+    key = (provider or LLM_PROVIDER, model or LLM_MODEL, float(temperature))
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = _PROVIDERS[key[0]](key[1], key[2])
+        return client
+
+
+# ---- scheduler -----------------------------------------------------------
+
+class _Bucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` per second. 0 disables it."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if not self.capacity:
+            return 0.0
+        # A single request larger than the whole bucket waits for a full bucket.
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.capacity:
+            self.level -= amount
+
+
+class RateLimitScheduler:
+    """Admits LLM calls under request/token-per-minute budgets and a concurrency cap.
+
+    Waiting calls form a priority queue ordered by (priority, arrival); only the
+    head of the queue may take budget, so a burst of verifier calls cannot
+    starve the planner.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._in_flight = 0
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._queue_ms: Dict[int, deque] = {}
+        self._counters: Dict[str, int] = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    def acquire(self, priority: int = DEFAULT_PRIORITY, tokens: int = 0) -> float:
+        """Block until the call may start; return the seconds spent queued."""
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                if self._queue[0] == ticket:
+                    if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                        delay = None  # woken by release()
+                    else:
+                        delay = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                        if delay <= 0:
+                            heapq.heappop(self._queue)
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            self._in_flight += 1
+                            self._cond.notify_all()
+                            break
+                else:
+                    delay = None
+                self._cond.wait(delay)
+            waited = time.monotonic() - start
+            self._counters["requests"] += 1
+            self._queue_ms.setdefault(priority, deque(maxlen=1000)).append(waited * 1000)
+        return waited
+
+    def release(self, extra_tokens: int = 0):
+        """Mark a call finished; ``extra_tokens`` charges usage beyond the estimate."""
+        with self._cond:
+            self._in_flight -= 1
+            self._tokens.take(extra_tokens)
+            self._cond.notify_all()
+
+    def count(self, name: str):
+        with self._cond:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            queues = {p: sorted(v) for p, v in self._queue_ms.items()}
+            out: Dict[str, Any] = dict(self._counters, in_flight=self._in_flight, waiting=len(self._queue))
+        names = {v: k for k, v in PRIORITIES.items()}
+        out["queue_ms"] = {
+            names.get(p, str(p)): {
+                "p50": lat[len(lat) // 2],
+                "p95": lat[min(len(lat) - 1, int(0.95 * len(lat)))],
+                "max": lat[-1],
+            }
+            for p, lat in queues.items() if lat
+        }
+        return out
+
+
+_SCHEDULER: Optional[RateLimitScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = RateLimitScheduler()
+        return _SCHEDULER
+
+
+def is_retryable(exc: BaseException) -> bool:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        value = getattr(value, "value", value)  # HTTPStatus / grpc enums
+        if isinstance(value, int) and value in _RETRYABLE_STATUS:
+            return True
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in text for marker in _RETRYABLE_MARKERS)
+
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    # ~4 characters per token is close enough for budgeting.
+    return sum(len(str(m.content)) for m in messages) // 4 + 1
+
+
+def _used_tokens(result: ChatResult) -> Optional[int]:
+    for gen in result.generations:
+        usage = getattr(gen.message, "usage_metadata", None)
+        if usage:
+            return usage.get("total_tokens")
+    return None
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model that routes every call to a shared client through the scheduler.
+
+    Cache lookups happen in ``BaseChatModel`` before ``_generate`` runs, so
+    cached completions never wait for rate-limit budget.
+    """
+
+    inner: BaseChatModel
+    priority: int = DEFAULT_PRIORITY
+    # AgentExecutor streams by default, which would bypass the response cache
+    # and the retry loop; stream() falls back to invoke() while this is set.
+    # Token streaming still happens inside invoke() when a handler asks for it
+    # (see _should_stream).
+    disable_streaming: bool = True
+    max_retries: int = LLM_MAX_RETRIES
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # Cache keys should match those of the underlying model.
+        return self.inner._identifying_params
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        return self.inner._get_llm_string(stop=stop, **kwargs)
+
+    def _should_stream(self, *, async_api: bool, run_manager=None, **kwargs: Any) -> bool:
+        # Called from the cached invoke() path with the run's callbacks: stream
+        # from the provider only when a streaming.TokenStreamHandler listens.
+        handlers = run_manager.handlers if run_manager else []
+        return any(getattr(h, "streams_tokens", False) for h in handlers)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying threads from re-synchronizing.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        scheduler = get_scheduler()
+        estimate = _estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            scheduler.acquire(self.priority, estimate)
+            extra = 0
+            try:
+                result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                used = _used_tokens(result)
+                extra = max(0, used - estimate) if used else 0
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    scheduler.count("failures")
+                    raise
+                scheduler.count("rate_limited")
+                if attempt == self.max_retries:
+                    scheduler.count("failures")
+                    raise
+                scheduler.count("retries")
+                delay = self._backoff(attempt)
+            finally:
+                scheduler.release(extra)
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if type(self.inner)._stream is BaseChatModel._stream:
+            # Inner model cannot stream: one chunk from the retrying path.
+            message = self._generate(messages, stop=stop, run_manager=run_manager, **kwargs).generations[0].message
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content, usage_metadata=getattr(message, "usage_metadata", None),
+            ))
+            return
+        scheduler = get_scheduler()
+        estimate = _estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            scheduler.acquire(self.priority, estimate)
+            started = False
+            try:
+                for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Tokens already handed out cannot be taken back, so only a
+                # stream that failed before its first chunk is retried.
+                if started or not is_retryable(e) or attempt == self.max_retries:
+                    scheduler.count("failures")
+                    raise
+                scheduler.count("rate_limited")
+                scheduler.count("retries")
+                delay = self._backoff(attempt)
+            finally:
+                scheduler.release()
+            time.sleep(delay)
+
+
+def scheduled_llm(temperature: float = 0, caller: str = "default", cache=None) -> ScheduledChatModel:
+    return ScheduledChatModel(
+        inner=get_client(temperature),
+        priority=PRIORITIES.get(caller, DEFAULT_PRIORITY),
+        cache=cache,
+    )
+
+
+def pool_stats() -> dict:
+    with _CLIENTS_LOCK:
+        clients = len(_CLIENTS)
+    return {"clients": clients, "scheduler": get_scheduler().stats()}
@@ -1,16 +1,37 @@
+from collections import Counter, OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict
-from queue import Queue
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+from queue import Empty, Full
+import math
+import os
 import threading
 import time
+import uuid
+
+import tracing
+
+# Messages an agent's queue holds before ``send`` blocks (0: unbounded).
+A2A_QUEUE_MAX = int(os.getenv("A2A_QUEUE_MAX", "1000"))
+# Seconds ``send`` waits for room in a full queue before raising ``QueueFullError``.
+A2A_SEND_TIMEOUT = float(os.getenv("A2A_SEND_TIMEOUT", "30"))
+
+PRIORITY_HIGH = -10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 10
 
 
 class MessageType(Enum):
     TASK_REQUEST = "TASK_REQUEST"
     TASK_RESPONSE = "TASK_RESPONSE"
     TASK_RESULT = "TASK_RESULT"
+    # Partial output (LLM tokens, finished subtasks) for a streaming caller;
+    # the payload is a streaming.StreamEvent.
+    STREAM_CHUNK = "STREAM_CHUNK"
     ERROR = "ERROR"
+    SHUTDOWN = "SHUTDOWN"
 
 
 @dataclass
@@ -21,30 +42,216 @@ class Message:
     payload: Any
     metadata: Dict[str, Any] = field(default_factory=dict)
     timestamp: float = field(default_factory=time.time)
+    # Correlates every message belonging to one user request, end to end.
+    request_id: Optional[str] = None
+    # Lower is served first; ties go to the earlier deadline, then FIFO.
+    priority: int = PRIORITY_NORMAL
+    # Absolute ``time.time()`` after which nobody waits for this message's work.
+    deadline: Optional[float] = None
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return self.deadline is not None and (now or time.time()) > self.deadline
+
+
+class QueueFullError(RuntimeError):
+    """``send`` gave up waiting for room in the recipient's queue (backpressure)."""
+
+
+class AgentQueue:
+    """Bounded priority queue of one agent, with the ``put``/``get`` interface of ``queue.Queue``."""
+
+    def __init__(self, maxsize: int = A2A_QUEUE_MAX):
+        self.maxsize = maxsize
+        self.high_water = 0
+        self._heap: List[tuple] = []
+        self._seq = count()
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+
+    def qsize(self) -> int:
+        with self._mutex:
+            return len(self._heap)
+
+    def put(self, message: Message, block: bool = True, timeout: Optional[float] = None, force: bool = False):
+        """Enqueue, waiting up to ``timeout`` for room; ``force`` ignores ``maxsize``. Raises ``queue.Full``."""
+        with self._not_full:
+            if self.maxsize > 0 and not force:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while len(self._heap) >= self.maxsize:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if not block or (remaining is not None and remaining <= 0):
+                        raise Full
+                    self._not_full.wait(remaining)
+            key = message.deadline if message.deadline is not None else math.inf
+            heappush(self._heap, (message.priority, key, next(self._seq), message))
+            self.high_water = max(self.high_water, len(self._heap))
+            self._not_empty.notify()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Message:
+        with self._not_empty:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._heap:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Empty
+                self._not_empty.wait(remaining)
+            message = heappop(self._heap)[-1]
+            self._not_full.notify()
+            return message
+
+    def purge(self, predicate: Callable[[Message], bool]) -> int:
+        """Remove every queued message ``predicate`` accepts; returns how many."""
+        with self._mutex:
+            kept = [entry for entry in self._heap if not predicate(entry[-1])]
+            removed = len(self._heap) - len(kept)
+            if removed:
+                heapify(kept)
+                self._heap = kept
+                self._not_full.notify_all()
+            return removed
 
 
 class MessageBus:
-    """Core A2A communication bus using thread-safe queues."""
+    """Core A2A communication bus with one bounded priority queue per agent.
+
+    Messages carry a ``request_id`` so several user requests can share the bus.
+    Once a request is closed (finished, timed out or cancelled), messages still
+    in flight for it are dropped on ``send``/``receive`` with a set lookup, and
+    ``cancel_request`` also purges the ones already queued. Messages past their
+    ``deadline`` are dropped on ``receive``, before anyone starts work on them.
 
-    def __init__(self):
-        self.queues: Dict[str, Queue] = {}
+    ``send`` blocks while the recipient's queue is full (up to ``A2A_SEND_TIMEOUT``,
+    then ``QueueFullError``). Stream chunks never block: when their queue is
+    full they are dropped, so a slow stream reader cannot stall the agents.
+    """
+
+    # How many closed request IDs to remember for discarding late messages.
+    MAX_CLOSED_REQUESTS = 4096
+
+    def __init__(self, max_queue: int = A2A_QUEUE_MAX, send_timeout: float = A2A_SEND_TIMEOUT):
+        self.queues: Dict[str, AgentQueue] = {}
         self.lock = threading.Lock()
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._closed_requests: "OrderedDict[str, None]" = OrderedDict()
+        self.counters = Counter()
+
+    @property
+    def stale_dropped(self) -> int:
+        return self.counters["stale_dropped"]
+
+    def _count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.counters[key] += amount
 
     def register_agent(self, agent_name: str):
         with self.lock:
             if agent_name not in self.queues:
-                self.queues[agent_name] = Queue()
+                self.queues[agent_name] = AgentQueue(self.max_queue)
 
-    def send(self, message: Message):
+    def unregister_agent(self, agent_name: str):
+        """Drop an agent's queue (and anything still in it), e.g. a finished stream listener."""
         with self.lock:
+            self.queues.pop(agent_name, None)
+
+    def open_request(self, request_id: Optional[str] = None) -> str:
+        """Return a fresh correlation ID (or accept the caller's) for a user request."""
+        return request_id or uuid.uuid4().hex
+
+    def close_request(self, request_id: str):
+        """Mark a request finished; later messages for it are discarded."""
+        with self.lock:
+            self._closed_requests[request_id] = None
+            self._closed_requests.move_to_end(request_id)
+            while len(self._closed_requests) > self.MAX_CLOSED_REQUESTS:
+                self._closed_requests.popitem(last=False)
+
+    def cancel_request(self, request_id: str) -> int:
+        """Close a request and purge its queued messages; returns how many were purged.
+
+        Agents already working on it see ``is_closed`` and abort at their next
+        check (see ``a2a_runtime.abort_callbacks``).
+        """
+        self.close_request(request_id)
+        with self.lock:
+            queues = list(self.queues.values())
+        purged = sum(q.purge(lambda m: m.request_id == request_id) for q in queues if hasattr(q, "purge"))
+        if purged:
+            self._count("purged", purged)
+        return purged
+
+    def is_closed(self, request_id: Optional[str]) -> bool:
+        return request_id is not None and request_id in self._closed_requests
+
+    def send(self, message: Message, timeout: Optional[float] = None):
+        with self.lock:
+            # Stale first: a finished request's stream listener may already be unregistered
+            if message.request_id in self._closed_requests:
+                self.counters["stale_dropped"] += 1
+                return
             if message.recipient not in self.queues:
                 raise ValueError(f"Recipient {message.recipient} not registered")
-            self.queues[message.recipient].put(message)
+            queue = self.queues[message.recipient]
+        self._stamp_trace_parent(message)
+        self._put(queue, message, self.send_timeout if timeout is None else timeout)
+
+    def _put(self, queue, message: Message, timeout: float):
+        # Outside the bus lock: a blocked sender must not stall everyone else
+        if message.message_type == MessageType.SHUTDOWN and isinstance(queue, AgentQueue):
+            queue.put(message, force=True)
+            return
+        stream = message.message_type == MessageType.STREAM_CHUNK
+        try:
+            queue.put(message, block=False)
+            return
+        except Full:
+            if stream:
+                self._count("stream_dropped")
+                return
+        self._count("blocked_sends")
+        try:
+            queue.put(message, timeout=timeout)
+        except Full:
+            self._count("rejected")
+            raise QueueFullError(f"Queue of {message.recipient} is full ({timeout:.0f}s without room)") from None
+
+    @staticmethod
+    def _stamp_trace_parent(message: Message):
+        parent = tracing.current_span()
+        if parent is not None:
+            # Lets the receiving thread attach its spans to the sender's trace
+            message.metadata = {**(message.metadata or {}), "trace_parent": parent.span_id}
 
     def receive(self, agent_name: str, timeout: float = None) -> Message | None:
         if agent_name not in self.queues:
             raise ValueError(f"Agent {agent_name} not registered")
-        try:
-            return self.queues[agent_name].get(timeout=timeout)
-        except Exception:
-            return None
+        queue = self.queues[agent_name]
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                msg = queue.get(timeout=remaining)
+            except Empty:
+                return None
+            if self.is_closed(msg.request_id):
+                self._count("stale_dropped")
+                continue
+            if msg.expired():
+                self._count("expired")
+                continue
+            return msg
+
+    def stats(self) -> dict:
+        """Queue depth (and high-water mark) per agent, plus drop, expiry and backpressure counters."""
+        with self.lock:
+            queues = dict(self.queues)
+            counters = dict(self.counters)
+        depth = {}
+        for name, queue in queues.items():
+            try:
+                depth[name] = queue.qsize()
+            except NotImplementedError:  # multiprocessing queues on macOS
+                continue
+        high_water = {name: q.high_water for name, q in queues.items() if isinstance(q, AgentQueue)}
+        return {"depth": depth, "high_water": high_water, **counters}
@@ -1,46 +1,106 @@
-import json
-from agents.planner import create_planner
-from agents.worker import create_worker
-from agents.verifier import create_verifier
+from typing import Iterator, Optional
+
+from agent_factory import get_agent_factory
 from central import run_agent
+from router import FILE, PLAN, get_router, mentions_knowledge_base
+from RAG import prefetch
+from task_graph import current_subtask, execute_plan, parse_plan
+import tracing
+from startup import warm_up_if_enabled
+from streaming import (
+    ERROR, FINAL, PLAN as PLAN_EVENT, SUBTASK, Sink, StreamEvent, cancel_callbacks, run_streaming, stream_callbacks,
+)
+
+def orchestrate(user_request: str, sink: Optional[Sink] = None) -> str:
+    """Answer ``user_request``; ``sink`` (optional) receives streaming events as work finishes."""
+    request_id = tracing.new_trace_id()
+    with tracing.span("orchestrate", "request", trace_id=request_id), prefetch.bind(request_id):
+        try:
+            return _orchestrate(user_request, sink)
+        finally:
+            prefetch.finish(request_id)
+
+
+def orchestrate_stream(user_request: str) -> Iterator[StreamEvent]:
+    """Streaming ``orchestrate``: yields plan, token and subtask events, then the final answer.
+
+    Wrap it in ``streaming.to_async`` for an async iterator.
+    """
+    return run_streaming(lambda sink: orchestrate(user_request, sink))
+
+
+def _run_stage(stage: str, agent, text: str, sink: Optional[Sink] = None, task_id: Optional[str] = None,
+               stream_tokens: bool = True) -> str:
+    # Without ``stream_tokens`` the stage only stops when the stream is closed
+    callbacks = stream_callbacks(sink, stage, task_id) if stream_tokens else cancel_callbacks(sink) or None
+    with tracing.span(stage, "agent"):
+        return run_agent(agent, text, callbacks=callbacks)
 
-def orchestrate(user_request: str) -> str:
-    # Create agents
-    planner = create_planner()
-    worker = create_worker()
-    verifier = create_verifier()
 
-    # Planner
-    plan_raw = run_agent(planner, user_request)
+def _orchestrate(user_request: str, sink: Optional[Sink] = None) -> str:
+    # Agents are built once per process and reused across requests
+    factory = get_agent_factory()
+    worker = factory.get("worker")
+    verifier = factory.get("verifier")
 
-    # Parsing subtasks
-    try:
-        subtasks = json.loads(plan_raw).get("subtasks", [])
-    except Exception:
-        subtasks = [s.strip("-• ").strip() for s in plan_raw.splitlines() if s.strip()]
+    # Router: plain file/RAG lookups skip every agent, single steps skip the planner
+    router = get_router()
+    decision = router.route(user_request)
+    if decision.route != FILE:
+        # Speculative retrieval (RAG_PREFETCH) overlaps with planning and the worker's first step
+        prefetch.prefetch([user_request])
+    if decision.direct:
+        with tracing.span(f"router.{decision.route}", "tool", tool=decision.tool):
+            answer = router.dispatch(decision.route, user_request, decision.tool, decision.args)
+        if answer is not None:
+            return answer
 
-    #Workers
-    worker_outputs = []
-    for i, task in enumerate(subtasks, 1):
-        result = run_agent(worker, task)
-        worker_outputs.append(f"[Subtask {i}] {task}\n{result}")
+    if decision.route == PLAN:
+        # Planner
+        plan_raw = _run_stage("planner", factory.get("planner"), user_request, sink, stream_tokens=False)
 
-    #Verifier
+        # Parsing subtasks and dependency edges
+        subtasks, depends_on = parse_plan(plan_raw)
+        prefetch.prefetch([task for task in subtasks if mentions_knowledge_base(task)])
+    else:
+        subtasks, depends_on = [user_request], {}
+    if sink is not None:
+        sink(StreamEvent(PLAN_EVENT, "\n".join(subtasks), metadata={"subtasks": subtasks, "route": decision.route}))
+
+    def run_worker(task: str) -> str:
+        return _run_stage("worker", worker, task, sink, f"task_{current_subtask() + 1}")
+
+    def subtask_done(i: int, result: str):
+        sink(StreamEvent(SUBTASK, result, "worker", f"task_{i + 1}", metadata={"subtask": subtasks[i]}))
+
+    #Workers: independent subtasks run concurrently, dependents wait for their inputs
+    results = execute_plan(subtasks, depends_on, run_worker, on_done=subtask_done if sink else None)
+    worker_outputs = [
+        f"[Subtask {i}] {task}\n{result}"
+        for i, (task, result) in enumerate(zip(subtasks, results), 1)
+    ]
+
+    #Verifier: its tokens are the first of the final answer to reach a streaming caller
     bundle = "\n\n".join(worker_outputs)
-    final_answer = run_agent(verifier, bundle)
+    final_answer = _run_stage("verifier", verifier, bundle, sink)
 
     return final_answer
 
 
 if __name__ == "__main__":
+    warm_up_if_enabled()
     while True:
         query = input("User: ")
         if query.lower() in ("exit", "quit"):
             break
         try:
-            print("Final Answer:", orchestrate(query))
+            # Subtasks are shown as they finish rather than all at the end
+            for event in orchestrate_stream(query):
+                if event.kind == SUBTASK:
+                    print(f"[{event.task_id} done] {event.text[:200]}")
+                elif event.kind == FINAL:
+                    print("Final Answer:", event.text)
+                elif event.kind == ERROR:
+                    print("Error in orchestration:", event.text)
         except Exception as e:
             print("Error in orchestration:", e)
-
-
-
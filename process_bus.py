@@ -0,0 +1,287 @@
+"""Cross-process transport for the A2A message bus.
+
+``MessageBus`` keeps every queue inside one interpreter, so Worker and Verifier
+threads share a GIL with the CPU-bound parts of their work (embedding,
+splitting, JSON). ``ProcessMessageBus`` has the same ``register_agent`` /
+``send`` / ``receive`` API, but roles added to a ``ProcessRuntime`` are served
+by child processes that each build their own agent, retriever and MCP
+sessions:
+
+- every process-hosted role has one ``multiprocessing`` queue; all processes
+  (and threads) of the role compete for its messages. A role added with
+  ``shard_by_request=True`` has one queue per process instead, and a stable
+  hash of ``request_id`` picks the process, so all of a request's messages
+  meet in one place (the verifier's batches need that);
+- a child sends to other process-hosted roles directly, and everything else
+  (Planner, stream listeners) goes up one shared queue to the parent, where a
+  router thread delivers it to the local queues;
+- ``close_request`` in the parent is forwarded to every child, so late
+  messages are dropped there as well; remote queues are bounded FIFOs, so
+  ``cancel_request`` cannot purge them and priorities do not apply there.
+
+Messages and their payloads are pickled on the way, so they must stay plain
+data. Other per-process state (RAG prefetches, caches) is not shared between
+processes.
+"""
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from messaging import PRIORITY_LOW, Message, MessageBus, MessageType
+
+A2A_MP_START = os.getenv("A2A_MP_START", "spawn")
+A2A_PROCESS_START_TIMEOUT = float(os.getenv("A2A_PROCESS_START_TIMEOUT", "120"))
+
+_STOP = None  # sentinel on the uplink and control queues
+
+
+class ProcessMessageBus(MessageBus):
+    """``MessageBus`` whose process-hosted roles live behind ``multiprocessing`` queues."""
+
+    def __init__(self, context=None, _remote: Optional[Dict[str, object]] = None, _uplink=None,
+                 _shards: Optional[Dict[str, List[object]]] = None):
+        super().__init__()
+        self.context = context or multiprocessing.get_context(A2A_MP_START)
+        self.remote: Dict[str, object] = dict(_remote or {})
+        self.shards: Dict[str, List[object]] = dict(_shards or {})
+        self.queues.update(self.remote)
+        self._uplink = _uplink  # set in children: the parent's inbox
+        self._inbox = None
+        self._router: Optional[threading.Thread] = None
+        self._controls: List[object] = []
+
+    # ---- parent side -----------------------------------------------------
+
+    def host_remote(self, agent_name: str, shards: int = 1):
+        """Declare ``agent_name`` as served by child processes; returns its queue.
+
+        With ``shards > 1`` each process gets its own queue (see ``shard_for``)
+        and the first one is returned.
+        """
+        with self.lock:
+            if agent_name not in self.remote:
+                if shards > 1:
+                    self.shards[agent_name] = [self.context.Queue(self.max_queue) for _ in range(shards)]
+                    self.remote[agent_name] = self.shards[agent_name][0]
+                else:
+                    self.remote[agent_name] = self.context.Queue(self.max_queue)
+                self.queues[agent_name] = self.remote[agent_name]
+            return self.remote[agent_name]
+
+    def shard_for(self, agent_name: str, request_id: Optional[str]):
+        """Queue of the process serving ``request_id`` for a sharded role (crc32: same in every process)."""
+        shards = self.shards[agent_name]
+        return shards[zlib.crc32(request_id.encode("utf-8")) % len(shards)] if request_id else shards[0]
+
+    def inbox(self):
+        """Queue children send parent-side messages to; starts the router thread on first use."""
+        with self.lock:
+            if self._inbox is None:
+                self._inbox = self.context.Queue()
+                self._router = threading.Thread(target=self._route_inbox, name="bus-router", daemon=True)
+                self._router.start()
+            return self._inbox
+
+    def add_control(self):
+        """A new per-child queue that receives the parent's ``close_request`` calls."""
+        control = self.context.Queue()
+        with self.lock:
+            self._controls.append(control)
+        return control
+
+    def _route_inbox(self):
+        while True:
+            msg = self._inbox.get()
+            if msg is _STOP:
+                return
+            try:
+                super().send(msg)
+                self._count("routed")
+            except ValueError:
+                # e.g. a stream listener that unregistered after its request finished
+                self._count("unroutable")
+
+    def close_request(self, request_id: str):
+        super().close_request(request_id)
+        for control in self._controls:
+            try:
+                control.put(request_id)
+            except ValueError:
+                pass  # closed by ``close``: the children are gone
+
+    def close(self):
+        """Stop the router thread and release the queues (after the children exited)."""
+        if self._router is not None:
+            self._inbox.put(_STOP)
+            self._router.join(5.0)
+            self._router = None
+        sharded = [q for shards in self.shards.values() for q in shards[1:]]
+        for q in [*self.remote.values(), *sharded, *self._controls, *([self._inbox] if self._inbox is not None else [])]:
+            q.close()
+            q.cancel_join_thread()  # anything still queued is for a request nobody waits on
+
+    # ---- both sides --------------------------------------------------------
+
+    def send(self, message: Message, timeout: Optional[float] = None):
+        if message.recipient in self.shards:
+            if self.is_closed(message.request_id):
+                self._count("stale_dropped")
+                return
+            self._stamp_trace_parent(message)
+            self._count("sent_remote")
+            self._put(self.shard_for(message.recipient, message.request_id), message,
+                      self.send_timeout if timeout is None else timeout)
+            return
+        if message.recipient in self.queues or self._uplink is None:
+            if message.recipient in self.remote:
+                self._count("sent_remote")
+            return super().send(message, timeout)
+        # Child process, recipient lives in the parent
+        if self.is_closed(message.request_id):
+            self._count("stale_dropped")
+            return
+        self._stamp_trace_parent(message)
+        self._count("sent_uplink")
+        self._uplink.put(message)
+
+
+def _load(spec: str) -> Callable:
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _apply_closes(bus: ProcessMessageBus, control):
+    while True:
+        request_id = control.get()
+        if request_id is _STOP:
+            return
+        MessageBus.close_request(bus, request_id)
+
+
+def _child_main(role: str, factory: str, threads: int, remote: Dict[str, object], shards: Dict[str, List[object]],
+                shard: Optional[int], uplink, control, ready, initializer: Optional[Callable],
+                warmups: Tuple[str, ...], rag_lock):
+    from a2a_runtime import AgentRuntime
+    from startup import startup_report, warm_up
+
+    try:
+        if initializer is not None:
+            initializer()
+        bus = ProcessMessageBus(_remote=remote, _uplink=uplink, _shards=shards)
+        if shard is not None:
+            bus.queues[role] = shards[role][shard]  # receive only this process's requests
+        threading.Thread(target=_apply_closes, args=(bus, control), name="bus-control", daemon=True).start()
+        # Each process builds its own agents, retriever and MCP sessions before it
+        # reports ready, so the first requests it serves do not pay for them.
+        warm_up([name for name in warmups if name != "rag"], background=False)
+        if "rag" in warmups:
+            # Processes opening a fresh Chroma store at once race on creating its tables.
+            with rag_lock:
+                warm_up(["rag"], background=False)
+        for name, error in startup_report()["errors"].items():
+            print(f"[A2A] {role} process {os.getpid()}: warm-up of {name} failed ({error})")
+        agent = _load(factory)(bus)
+        runtime = AgentRuntime(bus)
+        runtime.add_role(role, agent.handle_message, threads=threads)
+        runtime.start()
+    except Exception:
+        ready.put((role, os.getpid(), traceback.format_exc()))
+        return
+    ready.put((role, os.getpid(), None))
+    runtime.join()
+
+
+class ProcessRuntime:
+    """Serves roles from pools of child processes, each running ``threads`` handler threads.
+
+    ``factory`` is a ``"module:function"`` spec called with the child's bus
+    (e.g. ``"agents.worker:create_worker_a2a"``); it is imported in the child,
+    after ``initializer`` has run and the ``warmups`` (``startup.WARMUPS``
+    names) are built.
+    """
+
+    def __init__(self, message_bus: ProcessMessageBus, initializer: Optional[Callable] = None,
+                 warmups: Optional[Iterable[str]] = None):
+        from startup import WARMUPS
+
+        self.message_bus = message_bus
+        self.initializer = initializer
+        self.warmups = tuple(WARMUPS if warmups is None else warmups)
+        self._roles: Dict[str, Tuple[str, int, int, bool]] = {}
+        self._processes: Dict[str, List[multiprocessing.Process]] = {}
+        self._running = False
+
+    def add_role(self, agent_name: str, factory: str, processes: int = 1, threads: int = 1,
+                 shard_by_request: bool = False):
+        """Serve ``agent_name`` from ``processes`` processes; with ``shard_by_request`` every
+        message of a request goes to the same one (for agents keeping per-request state)."""
+        if self._running:
+            raise RuntimeError("Cannot add roles to a running runtime")
+        processes = max(1, processes)
+        sharded = shard_by_request and processes > 1
+        self.message_bus.host_remote(agent_name, shards=processes if sharded else 1)
+        self._roles[agent_name] = (factory, processes, max(1, threads), sharded)
+
+    def start(self, timeout: float = A2A_PROCESS_START_TIMEOUT):
+        """Start every process and wait until each has warmed up and built its agent."""
+        if self._running:
+            return
+        self._running = True
+        bus = self.message_bus
+        uplink = bus.inbox()
+        ready = bus.context.Queue()
+        rag_lock = bus.context.Lock()
+        started = time.perf_counter()
+        for agent_name, (factory, processes, threads, sharded) in self._roles.items():
+            self._processes[agent_name] = []
+            for i in range(processes):
+                p = bus.context.Process(
+                    target=_child_main,
+                    args=(agent_name, factory, threads, bus.remote, bus.shards, i if sharded else None,
+                          uplink, bus.add_control(), ready, self.initializer, self.warmups, rag_lock),
+                    name=f"{agent_name}-proc-{i}",
+                    daemon=True,
+                )
+                p.start()
+                self._processes[agent_name].append(p)
+        expected = sum(len(ps) for ps in self._processes.values())
+        deadline = time.time() + timeout
+        for _ in range(expected):
+            try:
+                role, pid, error = ready.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                raise RuntimeError(f"A2A processes not ready after {timeout:.0f}s")
+            if error:
+                raise RuntimeError(f"{role} process {pid} failed to start:\n{error}")
+        print(f"[A2A] Started {expected} agent processes in {time.perf_counter() - started:.1f}s")
+
+    def shutdown(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        self._running = False
+        for agent_name, (_, processes, threads, sharded) in self._roles.items():
+            # One SHUTDOWN per handler thread; a thread exits after taking one.
+            if sharded:
+                for q in self.message_bus.shards[agent_name]:
+                    for _ in range(threads):
+                        q.put(Message("Runtime", agent_name, MessageType.SHUTDOWN, None, priority=PRIORITY_LOW))
+                continue
+            for _ in range(processes * threads):
+                self.message_bus.send(Message("Runtime", agent_name, MessageType.SHUTDOWN, None,
+                                              priority=PRIORITY_LOW))
+        deadline = time.time() + timeout
+        for processes in self._processes.values():
+            for p in processes:
+                p.join(max(0.0, deadline - time.time()))
+                if p.is_alive():
+                    print(f"[A2A] {p.name} did not stop in {timeout:.0f}s; terminating")
+                    p.terminate()
+                    p.join(1.0)
+        self._processes = {}
+        self.message_bus.close()
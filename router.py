@@ -0,0 +1,318 @@
+"""Local request router that lets simple requests skip the planner.
+
+Every request used to pay a planner round trip, even when the plan is just
+"do this one thing". ``RequestRouter.route`` classifies a request first:
+
+- ``plan``:   multi-step work, goes through the planner as before
+- ``worker``: a single step, handed straight to the worker agent
+- ``rag``:    an explicit knowledge-base question, answered by ``rag_tool``
+- ``file``:   a plain file search/read, sent straight to the MCP tool
+
+Cheap regex heuristics run first. When they are not confident enough, a
+nearest-prototype classifier over ``get_embeddings`` gets a vote. Anything
+still below ``ROUTER_MIN_CONFIDENCE`` falls back to full planning.
+"""
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+PLAN = "plan"
+WORKER = "worker"
+RAG = "rag"
+FILE = "file"
+ROUTES = (PLAN, WORKER, RAG, FILE)
+DIRECT_ROUTES = (RAG, FILE)
+
+ROUTER_ENABLED = os.getenv("ROUTER", "1").lower() not in {"0", "off", "false", "no"}
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+ROUTER_EMBEDDINGS = os.getenv("ROUTER_EMBEDDINGS", "1").lower() not in {"0", "off", "false", "no"}
+ROUTER_DIRECT_TOOLS = os.getenv("ROUTER_DIRECT_TOOLS", "1").lower() not in {"0", "off", "false", "no"}
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    confidence: float
+    source: str  # heuristic, embedding, agreement, fallback or disabled
+    tool: Optional[str] = None  # MCP tool for the file route
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def direct(self) -> bool:
+        return self.route in DIRECT_ROUTES
+
+    def metadata(self) -> Dict[str, Any]:
+        """Fields carried on A2A task messages so the worker can dispatch directly."""
+        return {"route": self.route, "tool": self.tool, "tool_args": self.args}
+
+
+# ---- heuristics ----------------------------------------------------------
+
+_ACTION_VERBS = (
+    "find", "list", "search", "locate", "read", "open", "show", "save", "write", "create",
+    "summarize", "summarise", "explain", "compare", "analyze", "analyse", "fix", "refactor",
+    "generate", "update", "delete", "run", "test", "implement", "review", "translate", "draft",
+)
+_VERB_RE = re.compile(r"\b(" + "|".join(_ACTION_VERBS) + r")\b", re.I)
+_SEQUENCE_RE = re.compile(r"\b(then|after that|afterwards|finally|next|followed by)\b|;|^\s*\d+[.)]\s", re.I | re.M)
+_RAG_RE = re.compile(
+    r"\b(knowledge ?base|kb|rag|project docs?|documentation|according to the docs?|in the docs?)\b", re.I
+)
+_QUESTION_RE = re.compile(r"^\s*(what|who|when|where|why|how|which|is|are|can|does|do|explain|define|describe)\b", re.I)
+_PATH_RE = re.compile(r"[\"'`]?((?:~|\.{1,2})?[/\\]?(?:[\w.-]+[/\\])*[\w-][\w.-]*\.[A-Za-z0-9]{1,8})[\"'`]?")
+_GLOB_RE = re.compile(r"(?<![\w/])([\w.-]*\*[\w*?.-]*)")
+_ROOT_RE = re.compile(r"\b(?:in|under|inside|within|from)\s+(?:the\s+)?(?:directory|folder|dir)?\s*[\"'`]?([\w./\\-]+)[\"'`]?", re.I)
+_READ_RE = re.compile(r"^\s*(?:please\s+)?(read|open|show|cat|print|display|view)\b", re.I)
+_SEARCH_RE = re.compile(r"^\s*(?:please\s+)?(find|list|search|locate)\b", re.I)
+_LLM_WORK_RE = re.compile(
+    r"\b(summari[sz]e|explain|analy[sz]e|review|fix|refactor|improve|compare|translate|rewrite|describe)\b", re.I
+)
+_FILE_KINDS = {
+    "python": "*.py", "markdown": "*.md", "text": "*.txt", "json": "*.json",
+    "yaml": "*.yaml", "toml": "*.toml", "javascript": "*.js", "typescript": "*.ts",
+}
+_ROOT_STOPWORDS = {"the", "this", "a", "an", "it", "them", "repo", "repository", "project", "files"}
+
+
+def _search_args(text: str) -> Optional[Dict[str, str]]:
+    glob = _GLOB_RE.search(text)
+    pattern = glob.group(1) if glob else None
+    if pattern is None:
+        kind = re.search(r"\b(" + "|".join(_FILE_KINDS) + r")\s+files?\b", text, re.I)
+        if kind is None:
+            return None
+        pattern = _FILE_KINDS[kind.group(1).lower()]
+    root = "."
+    for m in _ROOT_RE.finditer(text):
+        candidate = m.group(1).rstrip(".,")
+        if candidate and candidate.lower() not in _ROOT_STOPWORDS and "*" not in candidate:
+            root = candidate
+            break
+    return {"root": root, "pattern": pattern}
+
+
+def mentions_knowledge_base(text: str) -> bool:
+    """True when ``text`` asks for the knowledge base (the planner tags such subtasks with "RAG")."""
+    return bool(_RAG_RE.search(text))
+
+
+def heuristic_route(text: str) -> Tuple[str, float, Optional[str], Dict[str, Any]]:
+    """``(route, confidence, tool, args)`` from surface features of the request."""
+    verbs = {v.lower() for v in _VERB_RE.findall(text)}
+    words = len(text.split())
+    if _SEQUENCE_RE.search(text) or len(verbs) >= 2 or words > 60:
+        return PLAN, 0.9, None, {}
+
+    needs_llm = bool(_LLM_WORK_RE.search(text))
+    if _READ_RE.search(text) and not needs_llm:
+        # Only a path that exists: "np.array" or "v2.0" is a dotted word, not a file
+        path = next((m.group(1) for m in _PATH_RE.finditer(text) if os.path.isfile(os.path.expanduser(m.group(1)))), None)
+        if path:
+            return FILE, 0.95, "read_file", {"path": path}
+    if _SEARCH_RE.search(text) and not needs_llm:
+        args = _search_args(text)
+        if args and os.path.isdir(os.path.expanduser(args["root"])):
+            return FILE, 0.9, "file_search", args
+    if _RAG_RE.search(text):
+        # Questions about the knowledge base; anything that also asks for
+        # extra work on the answer goes to the worker, which can call RAG itself.
+        return (WORKER, 0.85, None, {}) if needs_llm and not _QUESTION_RE.search(text) else (RAG, 0.85, None, {})
+    if _PATH_RE.search(text) and needs_llm:
+        return WORKER, 0.85, None, {}  # one file, one LLM step (e.g. "summarize README.md")
+    if _QUESTION_RE.search(text) and words <= 30 and text.count("?") <= 1:
+        return WORKER, 0.7, None, {}
+    return PLAN, 0.5, None, {}
+
+
+# ---- embedding classifier ------------------------------------------------
+
+PROTOTYPES: Dict[str, List[str]] = {
+    PLAN: [
+        "Find all Python files, read the main one and write a summary report to report.md",
+        "Research the topic, compare the options and draft a recommendation",
+        "Search the repo for TODO comments, group them by module and save the list",
+        "Set up the project, run the tests and fix whatever fails",
+        "Collect the docs on the retriever, explain the design and propose improvements",
+    ],
+    WORKER: [
+        "What is the difference between a process and a thread?",
+        "Explain how gradient descent works",
+        "Summarize README.md",
+        "Write a haiku about distributed systems",
+        "How do I reverse a list in Python?",
+    ],
+    RAG: [
+        "What does the knowledge base say about the message bus?",
+        "According to the project docs, how is the vector store built?",
+        "Look up the agent architecture in the documentation",
+        "Use RAG to find how the planner creates subtasks",
+        "Search the knowledge base for the retriever settings",
+    ],
+    FILE: [
+        "Find all *.py files in agents",
+        "List the markdown files in the docs folder",
+        "Read the file agents/worker.py",
+        "Open config.json",
+        "Show me the contents of requirements.txt",
+    ],
+}
+
+
+class _PrototypeClassifier:
+    """Nearest-prototype classifier over the shared embeddings model."""
+
+    # Softmax temperature over cosine similarities; sentence embeddings of
+    # related requests differ by a few hundredths, so this stays small.
+    TEMPERATURE = 0.05
+
+    def __init__(self, embeddings, prototypes: Dict[str, List[str]] = PROTOTYPES):
+        import numpy as np
+
+        self._np = np
+        self._embeddings = embeddings
+        self._labels = list(prototypes)
+        texts = [t for label in self._labels for t in prototypes[label]]
+        self._owner = np.array([i for i, label in enumerate(self._labels) for _ in prototypes[label]])
+        self._matrix = self._normalize(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+
+    def _normalize(self, m):
+        norms = self._np.linalg.norm(m, axis=-1, keepdims=True)
+        return m / self._np.where(norms == 0, 1.0, norms)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        np = self._np
+        query = self._normalize(np.asarray(self._embeddings.embed_query(text), dtype=np.float32))
+        sims = self._matrix @ query
+        best = np.full(len(self._labels), -1.0, dtype=np.float32)
+        np.maximum.at(best, self._owner, sims)
+        probs = np.exp((best - best.max()) / self.TEMPERATURE)
+        probs /= probs.sum()
+        i = int(probs.argmax())
+        return self._labels[i], float(probs[i])
+
+
+# ---- router --------------------------------------------------------------
+
+class RequestRouter:
+    """Decides whether a request needs the planner; counts every decision."""
+
+    def __init__(
+        self,
+        enabled: bool = ROUTER_ENABLED,
+        min_confidence: float = ROUTER_MIN_CONFIDENCE,
+        use_embeddings: bool = ROUTER_EMBEDDINGS,
+        direct_tools: bool = ROUTER_DIRECT_TOOLS,
+    ):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.use_embeddings = use_embeddings
+        self.direct_tools = direct_tools
+        self._classifier: Optional[_PrototypeClassifier] = None
+        self._classifier_failed = False
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {r: 0 for r in ROUTES}
+        self._sources: Dict[str, int] = {}
+        self._stats = {"requests": 0, "fallbacks": 0, "classifier_calls": 0, "direct_errors": 0, "route_ms": 0.0}
+
+    def _get_classifier(self) -> Optional[_PrototypeClassifier]:
+        if self._classifier is not None or self._classifier_failed:
+            return self._classifier
+        with self._lock:
+            if self._classifier is None and not self._classifier_failed:
+                try:
+                    from RAG.vector_store import get_embeddings
+
+                    self._classifier = _PrototypeClassifier(get_embeddings())
+                except Exception as e:
+                    print(f"[router] Embedding classifier unavailable, using heuristics only: {e}")
+                    self._classifier_failed = True
+        return self._classifier
+
+    def _decide(self, text: str) -> RouteDecision:
+        if not self.enabled:
+            return RouteDecision(PLAN, 1.0, "disabled")
+        route, confidence, tool, args = heuristic_route(text)
+        if confidence >= self.min_confidence:
+            return RouteDecision(route, confidence, "heuristic", tool, args)
+
+        classifier = self._get_classifier() if self.use_embeddings else None
+        if classifier is not None:
+            with self._lock:
+                self._stats["classifier_calls"] += 1
+            label, p = classifier.classify(text)
+            if label == route:
+                return RouteDecision(route, max(confidence, p), "agreement", tool, args)
+            if p >= self.min_confidence:
+                if label == FILE:
+                    # The classifier can say "file" but not which tool or arguments.
+                    return RouteDecision(WORKER, p, "embedding")
+                return RouteDecision(label, p, "embedding")
+        return RouteDecision(PLAN, confidence, "fallback")
+
+    def route(self, text: str) -> RouteDecision:
+        start = time.perf_counter()
+        decision = self._decide(text)
+        if decision.direct and not self.direct_tools:
+            decision = RouteDecision(WORKER, decision.confidence, decision.source)
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["route_ms"] += (time.perf_counter() - start) * 1000
+            self._counts[decision.route] += 1
+            self._sources[decision.source] = self._sources.get(decision.source, 0) + 1
+            if decision.source == "fallback":
+                self._stats["fallbacks"] += 1
+        return decision
+
+    def dispatch(self, route: str, text: str, tool: Optional[str] = None,
+                 args: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Run a direct route; ``None`` means the caller should fall back to the worker."""
+        try:
+            if route == RAG:
+                from RAG.rag_tool import rag_tool
+
+                return rag_tool(text)
+            if route == FILE and tool:
+                from MCP.mcp_tools_adapter import load_mcp_tools
+
+                by_name = {t.name: t for t in load_mcp_tools()}
+                if tool in by_name:
+                    result = by_name[tool].func(json.dumps(args or {}))
+                    # Tool errors and empty results are for the worker to handle, not the final answer
+                    if result and result.strip() and not result.startswith((f"Error calling {tool}", "[Error]")):
+                        return result
+        except Exception as e:
+            print(f"[router] Direct {route} dispatch failed, handing to the worker: {e}")
+        with self._lock:
+            self._stats["direct_errors"] += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self._stats["requests"]
+            return {
+                **{k: v for k, v in self._stats.items() if k != "route_ms"},
+                "routes": dict(self._counts),
+                "sources": dict(self._sources),
+                "planner_skipped": requests - self._counts[PLAN],
+                "avg_route_ms": round(self._stats["route_ms"] / requests, 3) if requests else 0.0,
+            }
+
+
+_ROUTER: Optional[RequestRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> RequestRouter:
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = RequestRouter()
+        return _ROUTER
+
+
+def router_stats() -> dict:
+    return get_router().stats()
@@ -0,0 +1,150 @@
+"""Lazy initialization helpers, background warm-up and a startup-time report.
+
+Heavy objects (embeddings model, vector store, QA chain, MCP sessions, agent
+executors) are built on first use through ``Lazy``. Set ``AGENT_WARMUP=1`` to
+have the entry points build them on a background thread right after start-up
+instead. ``python startup.py`` prints a cold-start report.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_TIMINGS: Dict[str, float] = {}
+_ERRORS: Dict[str, str] = {}
+_TIMINGS_LOCK = threading.Lock()
+_PROCESS_START = time.perf_counter()
+
+
+def record(component: str, seconds: float):
+    with _TIMINGS_LOCK:
+        _TIMINGS[component] = seconds
+
+
+class Lazy(Generic[T]):
+    """Thread-safe value built once on first ``get()``; the build time is recorded."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                self._value = self._factory()
+                record(self.name, time.perf_counter() - start)
+                self._ready = True
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value, self._ready = None, False
+
+
+# ---- warm-up -------------------------------------------------------------
+
+def _warm_embeddings():
+    from RAG.vector_store import get_embeddings
+    get_embeddings()
+
+
+def _warm_rag():
+    from RAG.rag_tool import get_qa_chain
+    get_qa_chain()
+
+
+def _warm_mcp():
+    from MCP.mcp_tools_adapter import load_mcp_tools
+    load_mcp_tools()
+
+
+def _warm_agents():
+    from agent_factory import get_agent_factory
+    factory = get_agent_factory()
+    for role in ("planner", "worker", "verifier"):
+        factory.get(role)
+
+
+WARMUPS: Dict[str, Callable[[], None]] = {
+    "embeddings": _warm_embeddings,
+    "rag": _warm_rag,
+    "mcp": _warm_mcp,
+    "agents": _warm_agents,
+}
+
+
+def warm_up(components: Iterable[str] = tuple(WARMUPS), background: bool = True) -> Optional[threading.Thread]:
+    """Build the given components now, on a daemon thread unless ``background=False``.
+
+    Failures are recorded in the report rather than raised; the component is
+    simply built (or fails again) on first real use.
+    """
+    def run():
+        for name in components:
+            start = time.perf_counter()
+            try:
+                WARMUPS[name]()
+            except Exception as e:
+                with _TIMINGS_LOCK:
+                    _ERRORS[name] = f"{type(e).__name__}: {e}"
+            record(f"warmup.{name}", time.perf_counter() - start)
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_if_enabled() -> Optional[threading.Thread]:
+    if os.getenv("AGENT_WARMUP", "0").lower() in {"1", "true", "yes"}:
+        return warm_up()
+    return None
+
+
+def startup_report() -> dict:
+    with _TIMINGS_LOCK:
+        timings = {k: round(v * 1000, 1) for k, v in _TIMINGS.items()}
+        errors = dict(_ERRORS)
+    return {
+        "uptime_ms": round((time.perf_counter() - _PROCESS_START) * 1000, 1),
+        "init_ms": timings,
+        "errors": errors,
+    }
+
+
+def measure_import(modules: Iterable[str] = ("orchestrator", "a2a_network")) -> Dict[str, float]:
+    """Cold import time (ms) of each module, each in a fresh interpreter."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    out = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+        if proc.returncode != 0:
+            out[module] = float("nan")
+            print(f"[startup] import {module} failed:\n{proc.stderr.strip()}")
+        else:
+            out[module] = round(float(proc.stdout.strip().splitlines()[-1]) * 1000, 1)
+    return out
+
+
+if __name__ == "__main__":
+    print("cold import (ms):", measure_import())
+    if "--warm" in sys.argv:
+        warm_up(background=False)
+        print("warm-up:", startup_report())
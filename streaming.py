@@ -0,0 +1,170 @@
+"""Streaming events for ``orchestrate_stream`` and ``A2ANetwork.run_stream``.
+
+A streamed request yields ``StreamEvent`` objects as work finishes instead of
+one string at the end:
+
+- ``plan``:    the subtasks the request was split into
+- ``token``:   an LLM token from the worker or verifier (``stage`` says which)
+- ``subtask``: a finished (in A2A mode: verified) subtask result
+- ``final``:   the complete answer, always the last event
+- ``error``:   the pipeline raised; ``text`` has the message
+
+LLM tokens are picked up by ``TokenStreamHandler``, a callback handler passed
+to agent and LLM calls; the scheduled chat model streams from its provider
+only when such a handler is attached (see ``llm_pool``). When the consumer of
+``run_streaming`` goes away, ``AbortOnClose`` stops the work at its next LLM
+call, token or tool call.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from a2a_runtime import RequestCancelled
+from messaging import Message, MessageBus, MessageType
+
+PLAN = "plan"
+TOKEN = "token"
+SUBTASK = "subtask"
+FINAL = "final"
+ERROR = "error"
+
+
+@dataclass
+class StreamEvent:
+    kind: str
+    text: str = ""
+    stage: Optional[str] = None
+    task_id: Optional[str] = None
+    request_id: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+Sink = Callable[[StreamEvent], None]
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """Forwards each new LLM token to ``sink`` as a ``token`` event."""
+
+    # Checked by ScheduledChatModel._should_stream.
+    streams_tokens = True
+
+    def __init__(self, sink: Sink, stage: str, task_id: Optional[str] = None, request_id: Optional[str] = None):
+        self.sink = sink
+        self.stage = stage
+        self.task_id = task_id
+        self.request_id = request_id
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if token:
+            self.sink(StreamEvent(TOKEN, token, self.stage, self.task_id, self.request_id))
+
+
+class AbortOnClose(BaseCallbackHandler):
+    """Raises ``RequestCancelled`` at the next LLM call, token or tool call once ``cancelled`` is set."""
+
+    raise_error = True
+
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise RequestCancelled("stream was closed")
+
+    def on_llm_start(self, *args, **kwargs):
+        self.check()
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.check()
+
+    def on_llm_new_token(self, *args, **kwargs):
+        self.check()
+
+    def on_tool_start(self, *args, **kwargs):
+        self.check()
+
+
+def cancel_callbacks(sink: Optional[Sink]) -> list:
+    """An ``AbortOnClose`` for sinks that can be closed (``run_streaming``'s), else nothing."""
+    cancelled = getattr(sink, "cancelled", None)
+    return [AbortOnClose(cancelled)] if cancelled is not None else []
+
+
+def stream_callbacks(sink: Optional[Sink], stage: str, task_id: Optional[str] = None,
+                     request_id: Optional[str] = None) -> Optional[list]:
+    """Callbacks list for an agent/LLM call, or ``None`` when nothing is listening."""
+    if sink is None:
+        return None
+    return [TokenStreamHandler(sink, stage, task_id, request_id), *cancel_callbacks(sink)]
+
+
+def bus_sink(bus: MessageBus, sender: str, recipient: str, request_id: Optional[str]) -> Sink:
+    """Sink that delivers events to ``recipient`` as STREAM_CHUNK messages (A2A mode)."""
+    def send(event: StreamEvent):
+        event.request_id = event.request_id or request_id
+        bus.send(Message(sender, recipient, MessageType.STREAM_CHUNK, event, request_id=request_id))
+    return send
+
+
+_DONE = object()
+
+
+class _QueueSink:
+    """``run_streaming``'s sink: queues events until the generator is closed, then raises."""
+
+    def __init__(self, events: Queue):
+        self.events = events
+        self.cancelled = threading.Event()
+
+    def __call__(self, event: StreamEvent):
+        if self.cancelled.is_set():
+            raise RequestCancelled("stream was closed")
+        self.events.put(event)
+
+
+def run_streaming(run: Callable[[Sink], str]) -> Iterator[StreamEvent]:
+    """Run ``run(sink)`` on a thread and yield the events it emits as they arrive.
+
+    The return value of ``run`` becomes the ``final`` event; an exception
+    becomes an ``error`` event. Closing the generator early cancels the run:
+    the sink and the callbacks from ``stream_callbacks``/``cancel_callbacks``
+    raise ``RequestCancelled`` at its next event, LLM call or tool call.
+    """
+    events: Queue = Queue()
+    sink = _QueueSink(events)
+
+    def target():
+        try:
+            events.put(StreamEvent(FINAL, run(sink)))
+        except Exception as e:
+            events.put(StreamEvent(ERROR, f"{type(e).__name__}: {e}"))
+        finally:
+            events.put(_DONE)
+
+    ctx = contextvars.copy_context()  # keeps the caller's tracing span as parent
+    threading.Thread(target=ctx.run, args=(target,), name="stream", daemon=True).start()
+    try:
+        while True:
+            event = events.get()
+            if event is _DONE:
+                return
+            yield event
+    except GeneratorExit:
+        sink.cancelled.set()
+        raise
+
+
+async def to_async(events: Iterator[StreamEvent]) -> AsyncIterator[StreamEvent]:
+    """Async-iterator view of a streaming generator; each step waits off the event loop."""
+    while True:
+        event = await asyncio.to_thread(next, events, _DONE)
+        if event is _DONE:
+            return
+        yield event
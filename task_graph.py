@@ -0,0 +1,144 @@
+import contextvars
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_WORKERS = int(os.getenv("ORCHESTRATOR_MAX_WORKERS", "8"))
+
+
+def parse_plan(plan_raw: str) -> Tuple[List[str], Dict[int, List[int]]]:
+    """Parse a planner plan into subtasks and 0-based dependency edges.
+
+    Accepts ``{"subtasks": [...], "depends_on": {"2": [1]}}`` (1-based subtask
+    numbers, matching the ``[Subtask i]`` labels) or ``depends_on`` as a list
+    with one entry per subtask. Plans that are not JSON fall back to one
+    subtask per non-empty line with no edges.
+    """
+    try:
+        plan = json.loads(plan_raw)
+        subtasks = [str(s) for s in plan.get("subtasks", [])]
+        depends_on = plan.get("depends_on") or {}
+    except Exception:
+        subtasks = [s.strip("-• ").strip() for s in plan_raw.splitlines() if s.strip()]
+        depends_on = {}
+    return subtasks, normalize_dependencies(depends_on, len(subtasks))
+
+
+def normalize_dependencies(depends_on, n: int) -> Dict[int, List[int]]:
+    """Convert planner edges to ``{task_index: [prerequisite_index, ...]}`` (0-based).
+
+    Out-of-range and self edges are dropped. If the remaining edges contain a
+    cycle, the plan falls back to running the subtasks strictly in order.
+    """
+    if isinstance(depends_on, list):
+        items = [(i + 1, d) for i, d in enumerate(depends_on)]
+    elif isinstance(depends_on, dict):
+        items = list(depends_on.items())
+    else:
+        items = []
+
+    deps: Dict[int, List[int]] = {i: [] for i in range(n)}
+    for key, prereqs in items:
+        try:
+            task = int(key) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= task < n:
+            continue
+        if not isinstance(prereqs, list):
+            prereqs = [prereqs]
+        for p in prereqs:
+            try:
+                p = int(p) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= p < n and p != task and p not in deps[task]:
+                deps[task].append(p)
+
+    if _has_cycle(deps):
+        return {i: ([i - 1] if i else []) for i in range(n)}
+    return deps
+
+
+def _has_cycle(deps: Dict[int, List[int]]) -> bool:
+    state: Dict[int, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(i: int) -> bool:
+        state[i] = 1
+        for p in deps[i]:
+            if state.get(p) == 1 or (p not in state and visit(p)):
+                return True
+        state[i] = 2
+        return False
+
+    return any(i not in state and visit(i) for i in deps)
+
+
+def _with_prerequisites(task: str, prior: List[Tuple[int, str, str]]) -> str:
+    if not prior:
+        return task
+    context = "\n\n".join(f"[Subtask {i + 1}] {t}\n{r}" for i, t, r in prior)
+    return f"Results from earlier subtasks:\n{context}\n\nCurrent subtask: {task}"
+
+
+_CURRENT_SUBTASK: contextvars.ContextVar = contextvars.ContextVar("current_subtask", default=None)
+
+
+def current_subtask() -> Optional[int]:
+    """0-based index of the subtask ``run_task`` is executing, ``None`` outside one."""
+    return _CURRENT_SUBTASK.get()
+
+
+def execute_plan(
+    subtasks: List[str],
+    depends_on: Dict[int, List[int]],
+    run_task: Callable[[str], str],
+    max_workers: int = None,
+    on_done: Optional[Callable[[int, str], None]] = None,
+) -> List[str]:
+    """Run subtasks on a bounded thread pool, respecting dependency edges.
+
+    A subtask starts as soon as all of its prerequisites have finished, and
+    their outputs are prepended to its input. Results are returned in the
+    original subtask order; ``on_done(index, result)`` is called as each one
+    finishes.
+    """
+    n = len(subtasks)
+    if n == 0:
+        return []
+    max_workers = max(1, min(n, max_workers or DEFAULT_MAX_WORKERS))
+
+    results: List[str] = [""] * n
+    waiting = {i: set(depends_on.get(i, [])) for i in range(n)}
+    dependents: Dict[int, List[int]] = {i: [] for i in range(n)}
+    for i, prereqs in waiting.items():
+        for p in prereqs:
+            dependents[p].append(i)
+
+    def _run(i: int) -> str:
+        prior = [(p, subtasks[p], results[p]) for p in sorted(depends_on.get(i, []))]
+        _CURRENT_SUBTASK.set(i)
+        try:
+            return run_task(_with_prerequisites(subtasks[i], prior))
+        except Exception as e:
+            return f"Error running subtask: {e}"
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="subtask") as pool:
+        # Each subtask runs in a copy of the caller's context so tracing spans nest.
+        def submit(i: int):
+            return pool.submit(contextvars.copy_context().run, _run, i)
+
+        running = {submit(i): i for i in range(n) if not waiting[i]}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                results[i] = future.result()
+                if on_done is not None:
+                    on_done(i, results[i])
+                for j in dependents[i]:
+                    waiting[j].discard(i)
+                    if not waiting[j]:
+                        running[submit(j)] = j
+    return results
@@ -0,0 +1,78 @@
+from MCP.file_reader import read_head, read_lines, read_range, read_tail
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def _page(path, **kwargs):
+    """Follow ``read_lines`` paging the way the ``read_file`` tool tells callers to."""
+    pages, start = [], 1
+    while True:
+        text, last, more = read_lines(path, start, **kwargs)
+        pages.append((start, text, last))
+        if not more:
+            return pages
+        assert last >= start
+        start = last + 1
+
+
+def test_paging_with_default_max_chars_skips_no_lines(tmp_path):
+    lines = [f"{i:04d} " + "x" * 94 + "\n" for i in range(1, 1001)]  # 100 bytes each
+    path = _write(tmp_path, "big.txt", "".join(lines))
+
+    text, last, more = read_lines(path, 1)
+    assert text == "".join(lines[:50])
+    assert (last, more) == (50, True)
+
+    pages = _page(path)
+    assert "".join(text for _, text, _ in pages) == "".join(lines)
+    for start, text, last in pages:
+        assert text.splitlines(keepends=True) == lines[start - 1:last]
+
+
+def test_paging_ends_on_line_boundary(tmp_path):
+    lines = [f"line {i} " + "y" * (i % 37) + "\n" for i in range(1, 400)]
+    path = _write(tmp_path, "ragged.txt", "".join(lines))
+    pages = _page(path, max_chars=300)
+    assert "".join(text for _, text, _ in pages) == "".join(lines)
+    assert all(text.endswith("\n") for _, text, _ in pages)
+
+
+def test_end_line_range(tmp_path):
+    path = _write(tmp_path, "short.txt", "".join(f"{i}\n" for i in range(1, 11)))
+    assert read_lines(path, 3, 5) == ("3\n4\n5\n", 5, True)
+    assert read_lines(path, 9, 20) == ("9\n10\n", 10, False)
+    assert read_lines(path, 5, 4) == ("", 4, False)
+    assert read_lines(path, 11) == ("", 10, False)
+
+
+def test_last_line_without_newline(tmp_path):
+    path = _write(tmp_path, "no_eol.txt", "a\nb\nc")
+    assert read_lines(path, 2) == ("b\nc", 3, False)
+
+
+def test_tail(tmp_path):
+    path = _write(tmp_path, "tail.txt", "".join(f"{i}\n" for i in range(1, 101)))
+    assert read_tail(path, 3) == "98\n99\n100\n"
+    assert read_tail(path, 3, max_chars=5) == "\n100\n"
+    assert read_tail(path, 0) == ""
+
+
+def test_utf8_boundaries(tmp_path):
+    path = _write(tmp_path, "utf8.txt", "é" * 10 + "\n" + "€" * 10 + "\n")
+    text, next_offset, size = read_range(path, 1, 5)  # starts and ends inside characters
+    assert text == "éé"
+    assert (next_offset, size) == (6, 52)
+    assert "�" not in read_lines(path, 1, max_chars=4)[0]
+    assert "".join(text for _, text, _ in _page(path, max_chars=12)) == "é" * 10 + "\n" + "€" * 10 + "\n"
+
+
+def test_empty_file(tmp_path):
+    path = _write(tmp_path, "empty.txt", "")
+    assert read_lines(path, 1) == ("", 0, False)
+    assert read_tail(path, 5) == ""
+    assert read_head(path) == ("", False)
+    assert read_range(path, 10) == ("", 0, 0)
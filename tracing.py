@@ -0,0 +1,331 @@
+"""Lightweight span tracing for requests, LLM/tool/retriever calls and bus waits.
+
+Enable it by setting ``TRACE_FILE`` (e.g. ``.cache/traces.jsonl``) or calling
+``configure(path)``. Spans nest through ``contextvars``, LangChain runs are
+picked up by a callback handler registered as a configure hook, and every
+finished span is appended to the file as one JSON line. Summarize a file with:
+
+    python -m tracing traces.jsonl            # latest trace, critical path
+    python -m tracing traces.jsonl --all      # one line per trace
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "duration_ms": round(self.duration_ms, 3)}
+
+
+class JsonlExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_CURRENT: ContextVar[Optional[Span]] = ContextVar("agentfoundry_span", default=None)
+_EXPORTER: Optional[JsonlExporter] = None
+_CONFIG_LOCK = threading.Lock()
+_HOOK_REGISTERED = False
+
+
+def enabled() -> bool:
+    return _EXPORTER is not None
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _finish(span: Span):
+    span.end = span.end or time.time()
+    exporter = _EXPORTER
+    if exporter is not None:
+        exporter.export(span)
+
+
+def start_span(name: str, kind: str = "internal", trace_id: Optional[str] = None,
+               parent_id: Optional[str] = None, **attrs) -> Span:
+    """Create a span under the current one (or under ``parent_id`` in ``trace_id``)."""
+    parent = _CURRENT.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else new_trace_id()
+        parent_id = parent_id or (parent.span_id if parent else None)
+    return Span(name=name, kind=kind, trace_id=trace_id, parent_id=parent_id, attrs=attrs)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", trace_id: Optional[str] = None,
+         parent_id: Optional[str] = None, **attrs) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a span; yields ``None`` when tracing is off."""
+    if _EXPORTER is None:
+        yield None
+        return
+    s = start_span(name, kind, trace_id, parent_id, **attrs)
+    token = _CURRENT.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _CURRENT.reset(token)
+        _finish(s)
+
+
+def record_span(name: str, kind: str, start: float, end: float, trace_id: Optional[str] = None,
+                parent_id: Optional[str] = None, **attrs):
+    """Export a span whose timing is already known (e.g. time a message sat in a queue)."""
+    if _EXPORTER is None:
+        return
+    s = start_span(name, kind, trace_id, parent_id, **attrs)
+    s.start, s.end = start, end
+    _finish(s)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain LLM, tool, retriever and chain runs into spans."""
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str, **attrs):
+        if _EXPORTER is None:
+            return
+        with self._lock:
+            parent = self._runs.get(parent_run_id)
+        if parent is not None:
+            s = start_span(name, kind, trace_id=parent[0].trace_id, parent_id=parent[0].span_id, **attrs)
+        else:
+            s = start_span(name, kind, **attrs)
+        token = _CURRENT.set(s)
+        with self._lock:
+            self._runs[run_id] = (s, token)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attrs):
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        s, token = entry
+        s.attrs.update(attrs)
+        if error is not None:
+            s.error = f"{type(error).__name__}: {error}"
+        try:
+            _CURRENT.reset(token)
+        except ValueError:
+            pass  # ended in another context (async); the span itself is still correct
+        _finish(s)
+
+    @staticmethod
+    def _name(serialized: Optional[dict], kwargs: dict, default: str) -> str:
+        return kwargs.get("name") or (serialized or {}).get("name") or default
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        chars = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chat_model"), "llm", prompt_chars=chars)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        chars = sum(len(p) for p in prompts)
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "llm", prompt_chars=chars)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage: Dict[str, int] = {}
+        for batch in response.generations:
+            for gen in batch:
+                meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens", "total_tokens"):
+                    if key in meta:
+                        usage[key] = usage.get(key, 0) + meta[key]
+        self._end(run_id, **usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "tool"), "tool", input_chars=len(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "retriever"), "retriever")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        # Only top-level chains (agent executors, QA chains); inner runnables are noise.
+        if parent_run_id is None:
+            self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+_HANDLER = TracingCallbackHandler()
+
+
+def configure(path: Optional[str]):
+    """Start exporting spans to ``path`` (JSON lines); ``None`` or "" turns tracing off."""
+    global _EXPORTER, _HOOK_REGISTERED
+    with _CONFIG_LOCK:
+        if _EXPORTER is not None:
+            _EXPORTER.close()
+            _EXPORTER = None
+        if not path:
+            return
+        _EXPORTER = JsonlExporter(path)
+        if not _HOOK_REGISTERED:
+            from langchain_core.tracers.context import register_configure_hook
+
+            # A default value makes the handler visible from every thread.
+            register_configure_hook(ContextVar("agentfoundry_tracer", default=_HANDLER), inheritable=True)
+            _HOOK_REGISTERED = True
+
+
+# ---- summary CLI ---------------------------------------------------------
+
+def load_spans(path: str) -> Dict[str, List[dict]]:
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                s = json.loads(line)
+                traces[s["trace_id"]].append(s)
+    return traces
+
+
+def critical_path(spans: List[dict]) -> List[tuple]:
+    """``(depth, span)`` pairs on the critical path of a trace.
+
+    At every level the path ends with the child that finished last, preceded by
+    the child that finished last before that one started, and so on; each of
+    those children is expanded the same way.
+    """
+    children: Dict[Optional[str], List[dict]] = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        children[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+
+    def expand(node: dict, depth: int) -> List[tuple]:
+        out = [(depth, node)]
+        kids = children.get(node["span_id"], [])
+        chain = []
+        current = max(kids, key=lambda s: s["end"]) if kids else None
+        while current is not None:
+            chain.append(current)
+            before = [k for k in kids if k["end"] <= current["start"]]
+            current = max(before, key=lambda s: s["end"]) if before else None
+        for child in reversed(chain):
+            out += expand(child, depth + 1)
+        return out
+
+    roots = children[None]
+    if not roots:
+        return []
+    return expand(max(roots, key=lambda s: s["end"] - s["start"]), 0)
+
+
+def summarize(spans: List[dict]) -> str:
+    start = min(s["start"] for s in spans)
+    end = max(s["end"] for s in spans)
+    by_kind: Dict[str, float] = defaultdict(float)
+    tokens = 0
+    for s in spans:
+        by_kind[s["kind"]] += s["duration_ms"]
+        tokens += s["attrs"].get("total_tokens", 0)
+    lines = [
+        f"trace {spans[0]['trace_id']}: {(end - start) * 1000:.1f} ms wall, {len(spans)} spans, {tokens} tokens",
+        "time by kind (summed, overlapping): " + ", ".join(
+            f"{k}={v:.1f}ms" for k, v in sorted(by_kind.items(), key=lambda kv: -kv[1])
+        ),
+        "critical path:",
+    ]
+    for depth, s in critical_path(spans):
+        offset = (s["start"] - start) * 1000
+        extra = f" error={s['error']}" if s.get("error") else ""
+        lines.append(f"  {'  ' * depth}{s['name']} [{s['kind']}] +{offset:.1f}ms {s['duration_ms']:.1f}ms{extra}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a trace file written with TRACE_FILE.")
+    parser.add_argument("path")
+    parser.add_argument("--trace", help="trace ID (default: the most recent)")
+    parser.add_argument("--all", action="store_true", help="one line per trace")
+    args = parser.parse_args(argv)
+    traces = load_spans(args.path)
+    if not traces:
+        print("no spans")
+        return
+    if args.all:
+        for trace_id, spans in sorted(traces.items(), key=lambda kv: min(s["start"] for s in kv[1])):
+            wall = (max(s["end"] for s in spans) - min(s["start"] for s in spans)) * 1000
+            root = min(spans, key=lambda s: s["start"])
+            print(f"{trace_id}  {wall:9.1f} ms  {len(spans):4d} spans  {root['name']}")
+        return
+    trace_id = args.trace or max(traces, key=lambda t: max(s["end"] for s in traces[t]))
+    print(summarize(traces[trace_id]))
+
+
+configure(os.getenv("TRACE_FILE", ""))
+
+if __name__ == "__main__":
+    main()